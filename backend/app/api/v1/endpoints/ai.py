@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query
 from starlette.requests import Request
-from typing import Dict, List, Optional
-from ....services.vertex_ai_service import analyze_profile_text, generate_github_query_with_genai
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional, Union
+from ....services.vertex_ai_service import generate_github_query_with_genai
+from ....services.local_nlp_service import extract_profile_keywords
 from ...v1.endpoints.auth import get_github_token
-from ....services.github_service import get_profile_text_data, get_user_profile
+from ....services.github_service import get_profile_bundle
 
 router = APIRouter()
 
@@ -11,17 +13,15 @@ router = APIRouter()
 @router.get("/analyze-profile", response_model=Dict[str, List[str]])
 async def analyze_github_profile(request: Request, token: str = Depends(get_github_token)):
     """
-    Analyzes the authenticated GitHub user's profile using Google Cloud Natural Language API.
+    Analyzes the authenticated GitHub user's profile using Google Cloud Natural Language API
+    (or the local spaCy extractor, depending on KEYWORD_BACKEND).
     """
     try:
-        # Get profile text data from GitHub
-        profile_data = await get_profile_text_data(token)
+        # Get profile text data and the user profile (for additional information) from GitHub
+        user_profile, profile_data = await get_profile_bundle(token)
         print(
             f"DEBUG: Got profile_data with {len(profile_data.get('languages', []))} languages, {len(profile_data.get('topics', []))} topics")
 
-        # Get user profile for additional information
-        user_profile = await get_user_profile(token)
-
         # Extract components from profile_data
         languages = profile_data.get("languages", [])
         topics = profile_data.get("topics", [])
@@ -70,8 +70,8 @@ async def analyze_github_profile(request: Request, token: str = Depends(get_gith
         combined_text += "\n\n" + test_text
         print(f"DEBUG: Added test text for debugging. Final length: {len(combined_text)}")
 
-        print("DEBUG: Calling analyze_profile_text...")
-        analysis_result = analyze_profile_text(combined_text)
+        print("DEBUG: Calling extract_profile_keywords...")
+        analysis_result = await extract_profile_keywords(combined_text)
         print(f"DEBUG: Got analysis_result with {len(analysis_result.get('keywords_entities', []))} entities")
 
         analysis_result["languages"] = ["python", "javascript", "html", "css"]
@@ -89,7 +89,7 @@ async def analyze_github_profile(request: Request, token: str = Depends(get_gith
         )
 
 
-@router.get("/generate-query", response_model=Dict[str, str])
+@router.get("/generate-query", response_model=Dict[str, Union[str, List[str]]])
 async def generate_github_query(
         request: Request,
         token: str = Depends(get_github_token),
@@ -116,7 +116,8 @@ async def generate_github_query(
 
         # Generate the query using Vertex AI
         print(f"DEBUG: Calling generate_github_query_with_genai")
-        generated_query = generate_github_query_with_genai(keywords, languages, topics)
+        # Blocking Vertex AI calls run in the threadpool, where identical concurrent requests are coalesced
+        generated_query = await run_in_threadpool(generate_github_query_with_genai, keywords, languages, topics)
 
         # Check if the query was generated successfully
         if generated_query is None:
@@ -4,6 +4,7 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.responses import RedirectResponse
 from starlette.requests import Request
 from ....core.config import settings
+from ....services.github_service import get_user_profile
 
 router = APIRouter()
 
@@ -94,6 +95,12 @@ async def github_callback_handler(request: Request, code: str = None, state: str
     request.session['github_scope'] = token_data.get("scope", "")
     request.session['github_token_type'] = token_data.get("token_type", "bearer")
 
+    # The login keys per-user data (profile vector, precomputed recommendations)
+    try:
+        request.session['github_login'] = (await get_user_profile(access_token, fields=("login",))).get("login")
+    except HTTPException as e:
+        print(f"WARN: Could not fetch GitHub login after token exchange: {e.detail}")
+
     # Redirect to the frontend page indicating successful login
     return RedirectResponse(url=FRONTEND_LOGIN_SUCCESS_URL, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
 
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import ORJSONResponse
 from starlette.requests import Request
 from ....services import github_service
+from ....services.field_projection import parse_fields
 from .auth import get_github_token
 from typing import Optional
 from httpx import AsyncClient
@@ -10,13 +12,16 @@ from bs4 import BeautifulSoup
 router = APIRouter()
 
 @router.get("/profile")
-async def get_github_profile(token: str = Depends(get_github_token)):
+async def get_github_profile(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. login,name,avatar_url"),
+    token: str = Depends(get_github_token)
+):
     """
     Fetches the authenticated user's GitHub profile.
     """
     try:
-        profile = await github_service.get_user_profile(token)
-        return profile
+        profile = await github_service.get_user_profile(token, fields=parse_fields(fields))
+        return ORJSONResponse(profile) # Plain GitHub JSON: skip jsonable_encoder
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -24,13 +29,18 @@ async def get_github_profile(token: str = Depends(get_github_token)):
         )
 
 @router.get("/repos")
-async def get_github_repos(token: str = Depends(get_github_token)):
+async def get_github_repos(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return per repo, e.g. name,html_url,owner.login"),
+    max_repos: int = Query(github_service.DEFAULT_MAX_REPOS, ge=1, le=github_service.MAX_REPOS_FOR_PROFILE,
+                           description="Maximum number of repos to return, most recently pushed first"),
+    token: str = Depends(get_github_token)
+):
     """
-    Fetches the authenticated user's repositories.
+    Fetches the authenticated user's most recently pushed repositories.
     """
     try:
-        repos = await github_service.get_user_repos(token)
-        return repos
+        repos = await github_service.get_user_repos(token, max_repos=max_repos, fields=parse_fields(fields))
+        return ORJSONResponse(repos)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -40,14 +50,15 @@ async def get_github_repos(token: str = Depends(get_github_token)):
 @router.get("/search/issues")
 async def search_github_issues(
     query: str = Query(..., description="Search query for GitHub issues"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return per issue, e.g. title,html_url,labels.name"),
     token: str = Depends(get_github_token)
 ):
     """
     Searches for issues on GitHub.
     """
     try:
-        issues = await github_service.search_issues(token, query)
-        return issues
+        issues = await github_service.search_issues(token, query, fields=parse_fields(fields))
+        return ORJSONResponse(issues)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
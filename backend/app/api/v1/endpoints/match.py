@@ -1,9 +1,17 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status, Depends, Query
+from fastapi.responses import ORJSONResponse
 from starlette.requests import Request
+from starlette.concurrency import run_in_threadpool
 from typing import Dict, List, Optional, Any
 from pydantic import BaseModel
+from ....services.faiss_search import MAX_SEARCH_QUERIES
 from ....services.github_service import get_profile_text_data
-from ....services.faiss_search import get_top_matched_issues
+from ....services.vertex_ai_service import generate_github_query_with_genai
+from ....services.match_ranking import (
+    MATCH_RANKING_DEPTH, CursorExpiredError, InvalidCursorError, get_first_match_page, get_match_page,
+    get_precomputed_first_page, get_profile_vector_first_page
+)
+from ....services.profile_embedding import get_profile_vector, refresh_profile_embedding
 from ...v1.endpoints.auth import get_github_token
 import logging
 
@@ -26,6 +34,7 @@ class IssueResult(BaseModel):
     labels: Optional[List[str]] = None
     similarity_score: Optional[float] = None
     short_description: Optional[str] = None
+    tech_tags: Optional[List[str]] = None
 
 
 class MatchResponse(BaseModel):
@@ -34,6 +43,8 @@ class MatchResponse(BaseModel):
     issues_fetched: int
     issues_indexed: int
     message: str
+    total_results: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 @router.get(
@@ -44,10 +55,15 @@ class MatchResponse(BaseModel):
 )
 async def match_issues(
         request: Request,
+        background_tasks: BackgroundTasks,
         keywords: List[str] = Query(default=[], description="Technical keywords/skills to match"),
         languages: List[str] = Query(default=[], description="Programming languages to match"),
         topics: List[str] = Query(default=[], description="Topics of interest to match"),
-        max_results: int = Query(10, description="Maximum number of results to return"),
+        max_results: int = Query(10, ge=1, le=MATCH_RANKING_DEPTH, description="Maximum number of results to return"),
+        page_size: Optional[int] = Query(None, ge=1, le=MATCH_RANKING_DEPTH, description="Results per page (defaults to max_results)"),
+        cursor: Optional[str] = Query(None, description="next_cursor of the previous page; the other filters are ignored"),
+        queries: List[str] = Query(default=[], description=f"GitHub issue search queries to retrieve candidates with (e.g. from /ai/generate-query), at most {MAX_SEARCH_QUERIES}"),
+        generate_queries: bool = Query(False, description="Generate the search queries with Gemini when none are given"),
         token: str = Depends(get_github_token)
 ):
     """
@@ -58,7 +74,41 @@ async def match_issues(
     2. Optionally gets additional profile data from GitHub if available
     3. Uses FAISS and Sentence Transformers to find semantically similar issues
     4. Returns the results in a structured format
+
+    The ranking is cached, and pages after the first are served from it via `cursor`.
     """
+    page_size = page_size or max_results
+    if len(queries) > MAX_SEARCH_QUERIES:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"At most {MAX_SEARCH_QUERIES} search queries are allowed per request.")
+    if cursor:
+        try:
+            return ORJSONResponse(await run_in_threadpool(get_match_page, cursor, page_size, github_token=token))
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except CursorExpiredError:
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="Cursor expired. Please request the first page again.")
+
+    # Plain profile matches of returning users are served from the batch-scored recommendation table,
+    # or ranked with their stored profile embedding; the embedding itself is refreshed after the response.
+    # These lookups read SQLite and memory-mapped snapshots, so they run in the threadpool
+    login = request.session.get('github_login')
+    profile_match = bool(login) and not (keywords or languages or topics or queries or generate_queries)
+    profile_vector = None
+    if profile_match:
+        profile_vector, needs_refresh = await run_in_threadpool(get_profile_vector, login)
+        if needs_refresh:
+            background_tasks.add_task(refresh_profile_embedding, login, token)
+        precomputed = await run_in_threadpool(get_precomputed_first_page, login, page_size, github_token=token)
+        if precomputed is not None:
+            logger.info(f"Serving precomputed recommendations for {login}")
+            return ORJSONResponse(precomputed)
+        if profile_vector is not None:
+            page = await run_in_threadpool(get_profile_vector_first_page, login, profile_vector, page_size, github_token=token)
+            if page is not None:
+                logger.info(f"Serving profile embedding matches for {login}")
+                return ORJSONResponse(page)
+
     try:
         logger.info(f"Matching issues with: Keywords={keywords}, Languages={languages}, Topics={topics}")
 
@@ -111,24 +161,27 @@ async def match_issues(
         if topics:
             all_keywords.extend(topics)
 
-        # Get top matched issues
-        result = get_top_matched_issues(
+        # Targeted search queries replace the per-keyword label searches when available
+        search_queries = [query for query in queries if query.strip()]
+        if not search_queries and generate_queries:
+            generated = await run_in_threadpool(generate_github_query_with_genai, keywords, languages, topics)
+            search_queries = generated or []
+            logger.info(f"Using {len(search_queries)} generated search queries")
+
+        # Get top matched issues (first page of the ranking)
+        result = await get_first_match_page(
             query_text=text_blob,
             keywords=all_keywords,
             languages=languages,
-            top_k=max_results,
-            github_token=token
-        )
-
-        # Convert to response model
-        response = MatchResponse(
-            recommendations=result["recommendations"],
-            issues_fetched=result["issues_fetched"],
-            issues_indexed=result["issues_indexed"],
-            message=result["message"]
+            page_size=page_size,
+            github_token=token,
+            search_queries=search_queries,
+            query_vector=profile_vector
         )
 
-        return response
+        # The result already has MatchResponse's shape (built from IssueRecords), so it is
+        # serialized directly instead of being re-validated through the response model
+        return ORJSONResponse(result)
 
     except Exception as e:
         logger.error(f"Error in match_issues endpoint: {str(e)}")
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Header, HTTPException, status
+from starlette.requests import Request
+from typing import Optional
+import json
+import logging
+
+from ....core.config import settings
+from ....services.webhook_worker import HANDLED_EVENTS, verify_signature, webhook_worker
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/github", status_code=status.HTTP_202_ACCEPTED)
+async def github_webhook(
+        request: Request,
+        x_github_event: str = Header(..., description="GitHub event name"),
+        x_hub_signature_256: Optional[str] = Header(None, description="HMAC-SHA256 of the body with the webhook secret"),
+        x_github_delivery: Optional[str] = Header(None, description="Delivery id, for logging"),
+):
+    """
+    Receives GitHub `issues` and `label` webhooks and queues them for the index update worker.
+    The body must be signed with GITHUB_WEBHOOK_SECRET; other events are acknowledged and ignored.
+    """
+    if not settings.GITHUB_WEBHOOK_SECRET:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Webhooks are not configured")
+    body = await request.body()
+    if not verify_signature(settings.GITHUB_WEBHOOK_SECRET, body, x_hub_signature_256):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid webhook signature")
+
+    if x_github_event not in HANDLED_EVENTS:
+        return {"status": "ignored", "event": x_github_event}
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Webhook body is not valid JSON")
+    if not webhook_worker.enqueue(x_github_event, payload):
+        logger.warning(f"Webhook queue unavailable, dropping delivery {x_github_delivery}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Webhook queue is full, please redeliver later")
+    return {"status": "queued", "delivery": x_github_delivery}
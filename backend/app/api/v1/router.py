@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from .endpoints import auth, github,ai, match
+from .endpoints import auth, github,ai, match, webhooks
 
 api_router = APIRouter()
 
@@ -7,3 +7,4 @@ api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(github.router, prefix="/github", tags=["github"])
 api_router.include_router(ai.router, prefix="/ai", tags=["ai"])
 api_router.include_router(match.router, prefix="/match", tags=["match"])
+api_router.include_router(webhooks.router, prefix="/webhooks", tags=["webhooks"])
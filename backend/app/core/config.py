@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 
 class Settings(BaseSettings):
@@ -11,11 +11,75 @@ class Settings(BaseSettings):
     GITHUB_CLIENT_SECRET: str
 
     # Security
-    SECRET_KEY: str
+    # No longer used: session ids are random and the data stays server-side, so nothing is signed.
+    # Still accepted so existing .env files that set it don't fail validation on the unknown key.
+    SECRET_KEY: Optional[str] = None
+
+    # Server-side sessions: "memory" (single worker only), "sqlite" or "redis" (shared by workers)
+    SESSION_BACKEND: str = "sqlite"
+    SESSION_TTL_SECONDS: int = 14 * 24 * 60 * 60
+    SESSION_MAX_ENTRIES: int = 100000
+    SESSION_HTTPS_ONLY: bool = False
+
+    # GitHub profile fetching: "rest" (several REST calls) or "graphql" (single GraphQL query)
+    GITHUB_PROFILE_FETCHER: str = "rest"
+    GITHUB_GRAPHQL_URL: str = "https://api.github.com/graphql"  # Can point at a local fake GraphQL endpoint
+
+    # Profile keyword extraction: "cloud" (Cloud NLP), "local" (spaCy) or "auto" (Cloud NLP, spaCy fallback)
+    KEYWORD_BACKEND: str = "auto"
+
+    # Responses at least this large (bytes) are compressed with brotli/gzip
+    COMPRESSION_MINIMUM_SIZE: int = 1024
 
     # Google Sheets
     SHEETS_ID: Optional[str] = None
 
+    # Shared cache: "memory" (per worker), "sqlite" (file shared by workers on one host) or "redis"
+    CACHE_BACKEND: str = "sqlite"
+    CACHE_SQLITE_PATH: str = "data/cache.sqlite3"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_KEY_PREFIX: str = "osmatch"
+    GEMINI_CACHE_TTL_SECONDS: int = 7 * 24 * 60 * 60
+    GEMINI_CACHE_MAX_ENTRIES: int = 5000
+
+    # GitHub issue search cache: query class -> (fresh seconds, stale-while-revalidate grace seconds)
+    ISSUE_SEARCH_CACHE_TTLS: Dict[str, Tuple[float, float]] = {
+        "label": (15 * 60, 60 * 60),  # Label keyword searches behind issue matching
+        "generated": (10 * 60, 30 * 60),  # Gemini-generated query variations
+        "custom": (2 * 60, 10 * 60),  # Free-form queries from /github/search/issues
+    }
+    ISSUE_SEARCH_CACHE_MAX_ENTRIES: int = 2048
+
+    # Match re-scoring: weight of each signal in the final score (see services/rescoring.py)
+    RESCORING_WEIGHTS: Dict[str, float] = {
+        "similarity": 1.0,
+        "recency": 0.1,
+        "activity": 0.05,
+        "unassigned": 0.1,
+        "stars": 0.05,
+    }
+    RESCORING_AGE_HALF_LIFE_DAYS: float = 180
+    RESCORING_CANDIDATE_FACTOR: int = 3  # Nearest neighbours re-scored per requested match
+
+    # Issue index snapshots
+    SNAPSHOT_DIR: str = "data/snapshots"
+    SNAPSHOT_CHECK_INTERVAL: float = 5.0  # Seconds between checks for a newer snapshot
+    SNAPSHOTS_TO_KEEP: int = 3
+    EMBEDDING_STORAGE_MODE: str = "float16"  # "flat", "float16" or "pq"
+
+    # GitHub webhooks (issues/label events) applied to the index between snapshot builds
+    GITHUB_WEBHOOK_SECRET: str = ""  # The webhook endpoint refuses deliveries while unset
+    ISSUE_DELTA_DB_PATH: str = "data/issue_delta.sqlite3"
+    ISSUE_DELTA_CHECK_INTERVAL: float = 5.0  # Seconds between checks for delta rows written by other workers
+
+    # Per-user profile vectors and precomputed recommendations (python -m app.services.batch_scoring)
+    PROFILE_DB_PATH: str = "data/profiles.sqlite3"
+    RECOMMENDATIONS_DIR: str = "data/recommendations"
+    RECOMMENDATIONS_TOP_K: int = 100
+    RECOMMENDATIONS_ACTIVE_DAYS: float = 30  # Only users active this recently are scored
+    RECOMMENDATIONS_MAX_AGE_SECONDS: int = 24 * 60 * 60  # Older tables fall back to live matching
+    PROFILE_REFRESH_SECONDS: int = 6 * 60 * 60  # Profile embeddings older than this are refreshed after a match
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,83 @@
+import hashlib
+import secrets
+import time
+from typing import Any, Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+from ..services.cache import Cache, get_cache
+
+REFRESHED_AT_KEY = "_refreshed_at"  # Stored alongside the session data, never exposed in scope["session"]
+
+
+class ServerSideSessionMiddleware:
+    """
+    Session middleware keeping session data in a server-side store (see services.cache) instead of
+    a signed cookie. The cookie only carries an opaque random session id, so the GitHub token never
+    leaves the server and a request costs at most one store lookup. Requests without a session
+    cookie don't touch the store at all.
+
+    The session is written back when a request changed it, and a new id is issued on every such
+    write so an id handed out before login (e.g. with the OAuth state) can't be reused after it.
+    Expiry is sliding: an unchanged session used more than `refresh_after` seconds after it was
+    last written is stored (and its cookie re-sent) again with a full `max_age`. Expiry and LRU
+    eviction are handled by the store, whose I/O runs off the event loop.
+    """
+
+    def __init__(self, app: ASGIApp, store: Optional[Cache] = None, session_cookie: str = "session_id",
+                 max_age: int = 14 * 24 * 60 * 60, path: str = "/", same_site: str = "lax", https_only: bool = False,
+                 refresh_after: int = 24 * 60 * 60):
+        self.app = app
+        self.store = store or get_cache("sessions", ttl=max_age, max_entries=settings.SESSION_MAX_ENTRIES,
+                                        backend=settings.SESSION_BACKEND)
+        self.session_cookie = session_cookie
+        self.max_age = max_age
+        self.refresh_after = min(refresh_after, max_age // 2)
+        self.path = path
+        self.security_flags = "httponly; samesite=" + same_site
+        if https_only:  # Secure flag can be used with HTTPS only
+            self.security_flags += "; secure"
+
+    @staticmethod
+    def _store_key(session_id: str) -> str:
+        # Only a hash of the id is stored, so the store's contents can't be replayed as cookies
+        return hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+
+    def _cookie(self, value: str, max_age: int) -> str:
+        return f"{self.session_cookie}={value}; path={self.path}; Max-Age={max_age}; {self.security_flags}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        session_id = HTTPConnection(scope).cookies.get(self.session_cookie)
+        stored: Optional[Dict[str, Any]] = await self.store.aget(self._store_key(session_id)) if session_id else None
+        initial: Dict[str, Any] = {key: value for key, value in stored.items() if key != REFRESHED_AT_KEY} if stored else {}
+        scope["session"] = dict(initial)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                session = scope["session"]
+                now = time.time()
+                if session != initial or (session_id and stored is None):
+                    headers = MutableHeaders(scope=message)
+                    if session_id:
+                        await self.store.adelete(self._store_key(session_id))
+                    if session:
+                        new_session_id = secrets.token_urlsafe(32)
+                        await self.store.aset(self._store_key(new_session_id), {**session, REFRESHED_AT_KEY: now})
+                        headers.append("Set-Cookie", self._cookie(new_session_id, self.max_age))
+                    else:
+                        # Session cleared, or the cookie points to an expired/evicted session
+                        headers.append("Set-Cookie", self._cookie("null", 0))
+                elif session and now - stored.get(REFRESHED_AT_KEY, 0) > self.refresh_after:
+                    # Unchanged but in use: extend its lifetime (same id, nothing to rotate)
+                    await self.store.aset(self._store_key(session_id), {**session, REFRESHED_AT_KEY: now})
+                    MutableHeaders(scope=message).append("Set-Cookie", self._cookie(session_id, self.max_age))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,25 +1,30 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.sessions import SessionMiddleware
 
 
 from .core.config import settings
+from .core.compression import CompressionMiddleware
+from .core.session import ServerSideSessionMiddleware
 from .api.v1.router import api_router as api_router_v1
+from .services.index_snapshot import snapshot_manager
+from .services.faiss_search import ensure_model_async
+from .services.http_client import close_http_client
+from .services.webhook_worker import webhook_worker
 
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json" # e.g., /api/v1/openapi.json
+    openapi_url=f"{settings.API_V1_STR}/openapi.json", # e.g., /api/v1/openapi.json
+    default_response_class=ORJSONResponse
 )
 
+# Session data (GitHub token, OAuth state) lives server-side; the cookie only holds an opaque id.
 app.add_middleware(
-    SessionMiddleware,
-    secret_key=settings.SECRET_KEY,
-    # --- Optional Session Cookie Parameters (consider for production) ---
-    # session_cookie="your_app_session", # Customize the cookie name
-    # max_age=7 * 24 * 60 * 60, # Example: Cookie expires after 7 days
+    ServerSideSessionMiddleware,
+    max_age=settings.SESSION_TTL_SECONDS,
+    https_only=settings.SESSION_HTTPS_ONLY,
     # same_site="lax", # Or "strict" for more security, but test carefully
-    # https_only=True, # Recommended: Send cookie only over HTTPS
 )
 
 
@@ -38,6 +43,9 @@ app.add_middleware(
     allow_headers=["*"],            # Allows all request headers
 )
 
+# Negotiated brotli/gzip compression for responses above the size threshold
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
 # --- Root Endpoint ---
 # A simple endpoint at the base URL ("/") to quickly check if the API is running.
 @app.get("/", tags=["Status"])
@@ -53,23 +61,32 @@ async def read_root():
 # This makes endpoints like "/api/v1/auth/login" or "/api/v1/match" accessible.
 app.include_router(api_router_v1, prefix=settings.API_V1_STR)
 
-# --- Optional: Startup/Shutdown Event Handlers ---
+# --- Startup/Shutdown Event Handlers ---
 # These functions can run code when the server starts or stops.
 # Useful for loading resources (like a FAISS index) or cleaning up.
-# @app.on_event("startup")
-# async def startup_event():
-#     """
-#     Code to run when the application starts up.
-#     Example: Load ML models, FAISS index, connect to databases.
-#     """
-#     print("Backend server starting up...")
-#     # load_faiss_index() # Example placeholder
+@app.on_event("startup")
+async def startup_event():
+    """
+    Code to run when the application starts up.
+    Maps the latest published issue index snapshot (if any) and loads the sentence transformer so the
+    first request doesn't pay for either, and starts the webhook worker that applies issue updates to
+    the index delta.
+    """
+    print("Backend server starting up...")
+    snapshot_manager.refresh()
+    try:
+        await ensure_model_async()
+    except Exception as e:
+        print(f"Error loading model: {e}")
+    webhook_worker.start()
 
-# @app.on_event("shutdown")
-# async def shutdown_event():
-#     """
-#     Code to run when the application shuts down gracefully.
-#     Example: Save data, close connections.
-#     """
-#     print("Backend server shutting down...")
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Code to run when the application shuts down gracefully.
+    Drains the webhook queue and closes the pooled outbound HTTP client.
+    """
+    print("Backend server shutting down...")
+    await webhook_worker.stop()
+    await close_http_client()
 
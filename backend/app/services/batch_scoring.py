@@ -0,0 +1,235 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+from .embedding_store import CompactEmbeddingStore
+from .faiss_search import MODEL_NAME
+from .index_snapshot import (
+    TMP_PREFIX, VERSION_PREFIX, SnapshotManager, prune_snapshots, snapshot_manager, write_current
+)
+from .issue_delta import delta_index, get_live_issues
+from .issue_record import IssueRecord
+from .profile_vectors import profile_vector_store
+from .rescoring import issue_features, rerank
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Recommendation table layout (same CURRENT/v<ns> scheme as the index snapshots):
+#   <root>/CURRENT
+#   <root>/v<ns>/logins.json     row -> login
+#   <root>/v<ns>/issue_ids.npy   int64 (users, top_k), best first, -1 padded
+#   <root>/v<ns>/scores.npy      float16 (users, top_k) similarity scores
+#   <root>/v<ns>/meta.json       {"built_at", "snapshot_version", "top_k", "model"}
+LOGINS_FILE = "logins.json"
+ISSUE_IDS_FILE = "issue_ids.npy"
+SCORES_FILE = "scores.npy"
+META_FILE = "meta.json"
+
+USER_BLOCK_SIZE = 1024  # Users scored together in one matrix multiply
+ISSUE_BLOCK_SIZE = 16384  # Issue vectors decoded from the store at a time
+
+
+def _merge_top_k(best_scores: np.ndarray, best_positions: np.ndarray, scores: np.ndarray,
+                 offset: int, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Merges a block of scores (rows = users) into the running unsorted top-k. """
+    positions = np.broadcast_to(np.arange(offset, offset + scores.shape[1], dtype=np.int64), scores.shape)
+    all_scores = np.concatenate([best_scores, scores], axis=1)
+    all_positions = np.concatenate([best_positions, positions], axis=1)
+    keep = np.argpartition(-all_scores, top_k - 1, axis=1)[:, :top_k]
+    return np.take_along_axis(all_scores, keep, axis=1), np.take_along_axis(all_positions, keep, axis=1)
+
+
+def score_users(user_vectors: np.ndarray, store: CompactEmbeddingStore, top_k: int,
+                user_block_size: int = USER_BLOCK_SIZE, issue_block_size: int = ISSUE_BLOCK_SIZE,
+                workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Computes every user's top-k issues with blocked matrix multiplies.
+
+    Each issue block is decoded once and scored against all user blocks in parallel (BLAS releases
+    the GIL, so the threads use every core). Scores use the live pipeline's similarity,
+    1 - squared_l2 / 2, computed as a dot product plus norms.
+
+    Args:
+        user_vectors: float32 array of shape (users, dim)
+        store: Issue embedding store
+        top_k: Recommendations per user
+        user_block_size: Users per matrix multiply
+        issue_block_size: Issues per matrix multiply
+        workers: Scoring threads (default: CPU count)
+
+    Returns:
+        Tuple of (issue ids, scores), each of shape (users, top_k), best first; missing results are -1 / -inf
+    """
+    user_vectors = np.ascontiguousarray(user_vectors, dtype=np.float32)
+    n_users = len(user_vectors)
+    top_k = min(top_k, store.ntotal)
+    user_norms = (user_vectors ** 2).sum(axis=1)
+    blocks = [(start, min(start + user_block_size, n_users)) for start in range(0, n_users, user_block_size)]
+    best_scores = [np.full((end - start, top_k), -np.inf, dtype=np.float32) for start, end in blocks]
+    best_positions = [np.full((end - start, top_k), -1, dtype=np.int64) for start, end in blocks]
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for issue_start in range(0, store.ntotal, issue_block_size):
+            issue_vectors = store.vectors(issue_start, issue_start + issue_block_size)
+            issue_norms = (issue_vectors ** 2).sum(axis=1)
+
+            def score_block(b: int) -> None:
+                start, end = blocks[b]
+                scores = user_vectors[start:end] @ issue_vectors.T
+                scores -= (user_norms[start:end, None] + issue_norms[None, :]) / 2
+                scores += 1.0
+                best_scores[b], best_positions[b] = _merge_top_k(best_scores[b], best_positions[b], scores, issue_start, top_k)
+
+            list(executor.map(score_block, range(len(blocks))))
+            logger.info(f"Scored issues {issue_start}-{issue_start + len(issue_vectors)} of {store.ntotal} for {n_users} users")
+
+    scores = np.concatenate(best_scores) if blocks else np.zeros((0, top_k), dtype=np.float32)
+    positions = np.concatenate(best_positions) if blocks else np.zeros((0, top_k), dtype=np.int64)
+    order = np.argsort(-scores, axis=1)
+    scores = np.take_along_axis(scores, order, axis=1)
+    positions = np.take_along_axis(positions, order, axis=1)
+    ids = np.asarray(store.ids)
+    issue_ids = np.where(positions >= 0, ids[np.where(positions >= 0, positions, 0)], -1)
+    return issue_ids, scores
+
+
+def write_recommendation_table(root: str, logins: List[str], issue_ids: np.ndarray, scores: np.ndarray,
+                               snapshot_version: str, keep: int = 3) -> str:
+    """ Writes a versioned recommendation table and atomically publishes it as CURRENT. """
+    os.makedirs(root, exist_ok=True)
+    version = f"{VERSION_PREFIX}{time.time_ns()}"
+    tmp_directory = os.path.join(root, f"{TMP_PREFIX}{version}")
+    os.makedirs(tmp_directory)
+
+    with open(os.path.join(tmp_directory, LOGINS_FILE), "w") as f:
+        json.dump(logins, f)
+    np.save(os.path.join(tmp_directory, ISSUE_IDS_FILE), np.asarray(issue_ids, dtype=np.int64))
+    np.save(os.path.join(tmp_directory, SCORES_FILE), np.asarray(scores, dtype=np.float16))
+    meta = {"built_at": time.time(), "snapshot_version": snapshot_version, "top_k": int(issue_ids.shape[1]), "model": MODEL_NAME}
+    with open(os.path.join(tmp_directory, META_FILE), "w") as f:
+        json.dump(meta, f)
+
+    os.rename(tmp_directory, os.path.join(root, version))
+    write_current(root, version)
+    logger.info(f"Published recommendation table {version} for {len(logins)} users")
+    prune_snapshots(root, keep)
+    return version
+
+
+def run_batch_scoring(top_k: Optional[int] = None, active_days: Optional[float] = None,
+                      workers: Optional[int] = None) -> Optional[str]:
+    """
+    Scores all active users against the live issue snapshot and publishes the recommendation table.
+
+    Returns:
+        The published table version, or None if there was nothing to score
+    """
+    top_k = top_k or settings.RECOMMENDATIONS_TOP_K
+    active_days = settings.RECOMMENDATIONS_ACTIVE_DAYS if active_days is None else active_days
+
+    snapshot = snapshot_manager.refresh()
+    if snapshot is None:
+        logger.warning("No issue index snapshot published, nothing to score against")
+        return None
+    logins, user_vectors = profile_vector_store.load_active(time.time() - active_days * 24 * 60 * 60, MODEL_NAME)
+    if not logins:
+        logger.warning("No active users with profile vectors, nothing to score")
+        return None
+    if user_vectors.shape[1] != snapshot.store.dim:
+        raise ValueError(f"Profile vectors have {user_vectors.shape[1]} dims, the issue index has {snapshot.store.dim}")
+
+    started = time.perf_counter()
+    issue_ids, scores = score_users(user_vectors, snapshot.store, top_k, workers=workers)
+    logger.info(f"Scored {len(logins)} users x {snapshot.ntotal} issues in {time.perf_counter() - started:.1f}s")
+    return write_recommendation_table(settings.RECOMMENDATIONS_DIR, logins, issue_ids, scores, snapshot.version)
+
+
+class RecommendationTable:
+    """ A published recommendation table, memory-mapped; `lookup` is a dict probe plus two row reads. """
+
+    def __init__(self, version: str, rows: Dict[str, int], issue_ids: np.ndarray, scores: np.ndarray, meta: Dict[str, Any]):
+        self.version = version
+        self._rows = rows
+        self._issue_ids = issue_ids
+        self._scores = scores
+        self.built_at: float = meta["built_at"]
+        self.snapshot_version: str = meta["snapshot_version"]
+        self.model: str = meta.get("model", MODEL_NAME)
+
+    @classmethod
+    def load(cls, root: str, version: str) -> "RecommendationTable":
+        directory = os.path.join(root, version)
+        with open(os.path.join(directory, LOGINS_FILE)) as f:
+            rows = {login: row for row, login in enumerate(json.load(f))}
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        issue_ids = np.load(os.path.join(directory, ISSUE_IDS_FILE), mmap_mode="r")
+        scores = np.load(os.path.join(directory, SCORES_FILE), mmap_mode="r")
+        logger.info(f"Loaded recommendation table {version} for {len(rows)} users")
+        return cls(version, rows, issue_ids, scores, meta)
+
+    def lookup(self, login: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """ Returns (issue ids, scores) for a user, or None if the user was not scored. """
+        row = self._rows.get(login)
+        if row is None:
+            return None
+        return self._issue_ids[row], self._scores[row]
+
+
+recommendation_manager = SnapshotManager(settings.RECOMMENDATIONS_DIR, settings.SNAPSHOT_CHECK_INTERVAL,
+                                         loader=RecommendationTable.load)
+
+
+def get_precomputed_recommendations(login: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns a user's precomputed recommendations shaped like get_top_matched_issues' result, or None
+    when the user has no fresh row (not scored yet, table too old, or profile changed since scoring),
+    in which case the live pipeline should be used.
+    """
+    table: Optional[RecommendationTable] = recommendation_manager.current()
+    snapshot = snapshot_manager.current()
+    if table is None or snapshot is None or table.model != MODEL_NAME:
+        return None
+    if time.time() - table.built_at > settings.RECOMMENDATIONS_MAX_AGE_SECONDS:
+        return None
+    row = table.lookup(login)
+    if row is None:
+        return None
+    profile = profile_vector_store.get(login, MODEL_NAME)
+    if profile is not None and profile[1] > table.built_at:
+        return None  # Profile changed after the table was built
+
+    issue_ids, scores = row
+    valid = issue_ids >= 0
+    delta_index.refresh(snapshot=snapshot)
+    issues = get_live_issues(snapshot, issue_ids[valid])  # Webhook updates win; tombstoned issues are dropped
+    matches = [(IssueRecord.from_search_item(issue), float(score)) for issue, score in zip(issues, scores[valid]) if issue is not None]
+    # Signals like recency change after scoring, so the stored candidates are re-ranked on lookup
+    order = rerank(np.array([score for _, score in matches]), issue_features([record for record, _ in matches]), len(matches))
+    recommendations = [matches[i][0].to_result(matches[i][1]) for i in order]
+    if not recommendations:
+        return None
+    return {
+        "recommendations": recommendations,
+        "issues_fetched": 0,
+        "issues_indexed": snapshot.ntotal,
+        "message": "Precomputed recommendations",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute per-user issue recommendations")
+    parser.add_argument("--top-k", type=int, default=None, help="Recommendations per user")
+    parser.add_argument("--active-days", type=float, default=None, help="Only score users active in the last N days")
+    parser.add_argument("--workers", type=int, default=None, help="Scoring threads (default: CPU count)")
+    args = parser.parse_args()
+    run_batch_scoring(top_k=args.top_k, active_days=args.active_days, workers=args.workers)
@@ -0,0 +1,365 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+from cachetools import TLRUCache
+
+from ..core.config import settings
+
+# --- Shared Cache Backends ---
+# TTL + size-bounded key/value caches, one namespace per use site. get_cache() picks the backend
+# from settings.CACHE_BACKEND:
+#   "memory" - per-process LRU (nothing shared between workers)
+#   "sqlite" - a local SQLite file in WAL mode, shared by every uvicorn worker on the host
+#   "redis"  - any Redis-protocol server, shared across hosts
+# Cache failures are logged and treated as misses; they never fail the request. The SQLite and Redis
+# backends block on I/O, so async code uses the aget/aset/adelete variants, which run them off the loop.
+
+BACKEND_MEMORY = "memory"
+BACKEND_SQLITE = "sqlite"
+BACKEND_REDIS = "redis"
+
+# --- Serialization ---
+# One tag byte, then either compact JSON or a numpy array as a small header + raw buffer.
+_TAG_JSON = b"J"
+_TAG_NDARRAY = b"N"
+
+
+def encode_value(value: Any) -> bytes:
+    """ Serializes a JSON-compatible value or a numpy array to bytes. """
+    if isinstance(value, np.ndarray):
+        header = json.dumps({"dtype": value.dtype.str, "shape": value.shape}, separators=(",", ":")).encode("utf-8")
+        return _TAG_NDARRAY + struct.pack("<H", len(header)) + header + np.ascontiguousarray(value).tobytes()
+    return _TAG_JSON + json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def decode_value(payload: bytes) -> Any:
+    """ Inverse of encode_value. Arrays come back read-only, backed by the payload. """
+    payload = bytes(payload)
+    tag, body = payload[:1], payload[1:]
+    if tag == _TAG_NDARRAY:
+        (header_len,) = struct.unpack_from("<H", body)
+        header = json.loads(body[2:2 + header_len])
+        return np.frombuffer(body, dtype=np.dtype(header["dtype"]), offset=2 + header_len).reshape(header["shape"])
+    if tag == _TAG_JSON:
+        return json.loads(body)
+    raise ValueError(f"Unknown cache payload tag {tag!r}")
+
+
+class Cache:
+    """
+    Interface shared by the cache backends: a TTL cache for one namespace holding at most
+    `max_entries` entries (least recently used ones are evicted first).
+    """
+
+    def __init__(self, namespace: str, ttl: float, max_entries: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def get(self, key: str) -> Optional[Any]:
+        """ Returns the cached value, or None if it is missing or expired. """
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """ Stores a JSON-compatible value or numpy array, for `ttl` seconds (default: the cache's ttl). """
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """ get() for async callers, run in a worker thread. """
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """ set() for async callers, run in a worker thread. """
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    async def adelete(self, key: str) -> None:
+        """ delete() for async callers, run in a worker thread. """
+        await asyncio.to_thread(self.delete, key)
+
+
+class MemoryCache(Cache):
+    """
+    In-process LRU backend. Values are stored as is (not copied), so callers must not mutate
+    what they put in or get out.
+    """
+
+    def __init__(self, namespace: str, ttl: float, max_entries: int):
+        super().__init__(namespace, ttl, max_entries)
+        self._entries: TLRUCache = TLRUCache(maxsize=max_entries, ttu=lambda _key, entry, _now: entry[1], timer=time.time)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+        return None if entry is None else entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time() + (self.ttl if ttl is None else ttl))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    # Nothing here blocks, so the async variants skip the thread hop
+    async def aget(self, key: str) -> Optional[Any]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set(key, value, ttl)
+
+    async def adelete(self, key: str) -> None:
+        self.delete(key)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace   TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    value       BLOB NOT NULL,
+    expires_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+ACCESS_UPDATE_INTERVAL = 60.0  # accessed_at is only rewritten on reads once it is older than this
+
+
+class SQLiteCache(Cache):
+    """
+    Backend for one namespace of a shared SQLite file, evicting least recently used entries
+    once the namespace holds more than `max_entries`. Recency is tracked to within
+    ACCESS_UPDATE_INTERVAL seconds, so hot keys don't turn every read into a write.
+    """
+
+    def __init__(self, namespace: str, ttl: float, max_entries: int, path: Optional[str] = None):
+        super().__init__(namespace, ttl, max_entries)
+        self.path = path or settings.CACHE_SQLITE_PATH
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_entries_lru ON cache_entries (namespace, accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT value, accessed_at FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                    (self.namespace, key, now),
+                ).fetchone()
+                if row is None:
+                    return None
+                if now - row[1] > ACCESS_UPDATE_INTERVAL:
+                    conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                                 (now, self.namespace, key))
+            return decode_value(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            print(f"WARN [Cache]: SQLite cache read failed for namespace '{self.namespace}': {e}")
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        payload = encode_value(value)
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, key, payload, now + (self.ttl if ttl is None else ttl), now),
+                )
+                count = conn.execute("SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+                if count > self.max_entries:
+                    # Expired entries go first, then the least recently used ones (oldest first, via the index)
+                    count -= conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+                                          (self.namespace, now)).rowcount
+                if count > self.max_entries:
+                    conn.execute(
+                        """DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                               SELECT key FROM cache_entries WHERE namespace = ?
+                               ORDER BY accessed_at LIMIT ?)""",
+                        (self.namespace, self.namespace, count - self.max_entries),
+                    )
+        except sqlite3.Error as e:
+            print(f"WARN [Cache]: SQLite cache write failed for namespace '{self.namespace}': {e}")
+
+    def delete(self, key: str) -> None:
+        try:
+            with self._lock:
+                self._connection().execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+        except sqlite3.Error as e:
+            print(f"WARN [Cache]: SQLite cache delete failed for namespace '{self.namespace}': {e}")
+
+
+class RedisProtocolError(Exception):
+    pass
+
+
+class RedisConnection:
+    """
+    Minimal blocking RESP2 client: enough for GET/SET/DEL/PING against Redis or any
+    Redis-protocol server (KeyDB, Dragonfly, a local stand-in). Thread-safe; reconnects
+    after connection errors.
+    """
+
+    def __init__(self, url: str, timeout: float = 2.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._sock.makefile("rb")
+        try:
+            if self.password:
+                self._call(b"AUTH", self.password.encode("utf-8"))
+            if self.db:
+                self._call(b"SELECT", str(self.db).encode("ascii"))
+        except BaseException:
+            # A rejected AUTH/SELECT leaves an unauthenticated (or wrong-db) socket; never reuse it
+            self._close()
+            raise
+
+    def _close(self) -> None:
+        try:
+            if self._reader is not None: self._reader.close()
+            if self._sock is not None: self._sock.close()
+        finally:
+            self._sock, self._reader = None, None
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by Redis server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+": return rest
+        if kind == b"-": raise RedisProtocolError(rest.decode("utf-8", "replace"))
+        if kind == b":": return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0: return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2: raise ConnectionError("Connection closed by Redis server")
+            return data[:-2]
+        if kind == b"*":
+            count = int(rest)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise RedisProtocolError(f"Unexpected reply type {kind!r}")
+
+    def _call(self, *args: bytes) -> Any:
+        command: List[bytes] = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            command.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self._sock.sendall(b"".join(command))
+        return self._read_reply()
+
+    def execute(self, *args: bytes) -> Any:
+        """ Sends one command and returns its decoded reply. """
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                return self._call(*args)
+            except (OSError, ConnectionError):
+                self._close()
+                raise
+
+
+_redis_connections: Dict[str, RedisConnection] = {}
+_redis_connections_lock = threading.Lock()
+
+
+def get_redis_connection(url: str) -> RedisConnection:
+    """ Returns the worker's shared connection for a Redis URL. """
+    with _redis_connections_lock:
+        if url not in _redis_connections:
+            _redis_connections[url] = RedisConnection(url)
+        return _redis_connections[url]
+
+
+class RedisCache(Cache):
+    """
+    Backend on a Redis-protocol server. Entries expire server-side (SET ... PX); the size bound
+    is left to the server's maxmemory policy (e.g. allkeys-lru), so `max_entries` is not enforced here.
+    """
+
+    def __init__(self, namespace: str, ttl: float, max_entries: int, url: Optional[str] = None):
+        super().__init__(namespace, ttl, max_entries)
+        self.connection = get_redis_connection(url or settings.CACHE_REDIS_URL)
+
+    def _key(self, key: str) -> bytes:
+        return f"{settings.CACHE_KEY_PREFIX}:{self.namespace}:{key}".encode("utf-8")
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            payload = self.connection.execute(b"GET", self._key(key))
+            return None if payload is None else decode_value(payload)
+        except (OSError, ConnectionError, RedisProtocolError, ValueError) as e:
+            print(f"WARN [Cache]: Redis cache read failed for namespace '{self.namespace}': {e}")
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl_ms = max(1, int((self.ttl if ttl is None else ttl) * 1000))
+        try:
+            self.connection.execute(b"SET", self._key(key), encode_value(value), b"PX", str(ttl_ms).encode("ascii"))
+        except (OSError, ConnectionError, RedisProtocolError) as e:
+            print(f"WARN [Cache]: Redis cache write failed for namespace '{self.namespace}': {e}")
+
+    def delete(self, key: str) -> None:
+        try:
+            self.connection.execute(b"DEL", self._key(key))
+        except (OSError, ConnectionError, RedisProtocolError) as e:
+            print(f"WARN [Cache]: Redis cache delete failed for namespace '{self.namespace}': {e}")
+
+
+def get_cache(namespace: str, ttl: float, max_entries: int, backend: Optional[str] = None) -> Cache:
+    """
+    Creates the cache for a namespace on the configured backend.
+
+    Args:
+        namespace: Name separating this use site's keys from the others
+        ttl: Default entry lifetime in seconds
+        max_entries: Size bound (LRU eviction)
+        backend: Overrides settings.CACHE_BACKEND
+
+    Returns:
+        A Cache instance
+    """
+    backend = (backend or settings.CACHE_BACKEND).lower()
+    if backend == BACKEND_MEMORY:
+        return MemoryCache(namespace, ttl, max_entries)
+    if backend == BACKEND_SQLITE:
+        return SQLiteCache(namespace, ttl, max_entries)
+    if backend == BACKEND_REDIS:
+        return RedisCache(namespace, ttl, max_entries)
+    raise ValueError(f"Unknown cache backend '{backend}' (expected 'memory', 'sqlite' or 'redis')")
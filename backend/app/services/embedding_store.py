@@ -0,0 +1,236 @@
+import json
+import logging
+import os
+from typing import Optional, Tuple
+
+import faiss
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Storage modes
+STORAGE_FLAT = "flat"        # float32 codes, 1536 bytes per 384-dim vector
+STORAGE_FLOAT16 = "float16"  # half-precision codes, 768 bytes per vector
+STORAGE_PQ = "pq"            # product-quantized codes, 48 bytes per vector
+STORAGE_MODES = (STORAGE_FLAT, STORAGE_FLOAT16, STORAGE_PQ)
+
+# Constants
+PQ_SUB_VECTOR_DIM = 8  # Dimensions per PQ sub-quantizer (384 dims -> 48 sub-quantizers)
+PQ_NBITS = 8  # Bits per sub-quantizer code (256 centroids)
+PQ_MIN_TRAINING_POINTS = 39 * (1 << PQ_NBITS)  # FAISS's recommended minimum for k-means training
+DEFAULT_RERANK_FACTOR = 4  # Candidates fetched from the compact codes per requested result
+
+CODES_FILE = "codes.faiss"
+FULL_VECTORS_FILE = "vectors.f32.npy"
+IDS_FILE = "ids.npy"
+MANIFEST_FILE = "store.json"
+
+# Map the code index read-only so every worker shares the same pages through the OS page cache.
+# IO_FLAG_MMAP_IFC (flat-code mmap) is only available in newer FAISS builds.
+MMAP_READ_FLAGS = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+
+
+def _resolve_storage_mode(mode: str, count: int, dim: int) -> str:
+    """
+    Validate the requested storage mode, downgrading PQ to float16 when it cannot be trained.
+
+    Args:
+        mode: Requested storage mode
+        count: Number of vectors to store
+        dim: Vector dimension
+
+    Returns:
+        Storage mode that will actually be used
+    """
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unknown embedding storage mode '{mode}'. Expected one of {STORAGE_MODES}")
+
+    if mode == STORAGE_PQ:
+        if dim % PQ_SUB_VECTOR_DIM != 0:
+            logger.warning(f"Dimension {dim} is not divisible by {PQ_SUB_VECTOR_DIM}, storing float16 codes instead of PQ")
+            return STORAGE_FLOAT16
+        if count < PQ_MIN_TRAINING_POINTS:
+            logger.warning(f"Only {count} vectors (< {PQ_MIN_TRAINING_POINTS}) to train PQ, storing float16 codes instead")
+            return STORAGE_FLOAT16
+
+    return mode
+
+
+def _build_code_index(embeddings: np.ndarray, mode: str) -> faiss.Index:
+    """
+    Build the compact FAISS code index for the given storage mode.
+
+    Args:
+        embeddings: float32 array of shape (n, dim)
+        mode: Resolved storage mode
+
+    Returns:
+        Populated FAISS index
+    """
+    dim = embeddings.shape[1]
+    if mode == STORAGE_PQ:
+        index = faiss.IndexPQ(dim, dim // PQ_SUB_VECTOR_DIM, PQ_NBITS)
+        logger.info(f"Training PQ codebooks on {len(embeddings)} vectors")
+        index.train(embeddings)
+    elif mode == STORAGE_FLOAT16:
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16)
+    else:
+        index = faiss.IndexFlatL2(dim)
+
+    index.add(embeddings)
+    return index
+
+
+class CompactEmbeddingStore:
+    """
+    Read-only, memory-mapped store of issue embeddings.
+
+    The coarse search runs over compact float16 or PQ codes. When a float32 copy of the vectors
+    was written alongside them, the top candidates are re-ranked at full precision; only the rows
+    for those candidates are ever paged in from the float32 file.
+    """
+
+    def __init__(self, directory: str, mode: str, index: faiss.Index, ids: np.ndarray,
+                 full_vectors: Optional[np.ndarray] = None):
+        self.directory = directory
+        self.mode = mode
+        self.index = index
+        self.ids = ids
+        self.full_vectors = full_vectors
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def dim(self) -> int:
+        return self.index.d
+
+    @classmethod
+    def write(cls, directory: str, ids: np.ndarray, embeddings: np.ndarray, mode: str = STORAGE_FLOAT16,
+              keep_full_precision: bool = True) -> "CompactEmbeddingStore":
+        """
+        Persist embeddings to a directory and open the result memory-mapped.
+
+        Args:
+            directory: Target directory (created if missing)
+            ids: Issue ids aligned with the embedding rows
+            embeddings: Array of embeddings of shape (n, dim)
+            mode: One of STORAGE_MODES
+            keep_full_precision: Also write a float32 copy used to re-rank top candidates
+
+        Returns:
+            The opened store
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        ids = np.asarray(ids, dtype=np.int64)
+        if embeddings.ndim != 2 or len(ids) != len(embeddings):
+            raise ValueError(f"Expected {len(ids)} embeddings of shape (n, dim), got {embeddings.shape}")
+
+        mode = _resolve_storage_mode(mode, len(embeddings), embeddings.shape[1])
+        keep_full_precision = keep_full_precision and mode != STORAGE_FLAT
+
+        os.makedirs(directory, exist_ok=True)
+        logger.info(f"Writing {len(embeddings)} embeddings to {directory} as {mode} codes")
+        faiss.write_index(_build_code_index(embeddings, mode), os.path.join(directory, CODES_FILE))
+        np.save(os.path.join(directory, IDS_FILE), ids)
+        if keep_full_precision:
+            np.save(os.path.join(directory, FULL_VECTORS_FILE), embeddings)
+
+        # The manifest is written last so a half-written store is never opened.
+        manifest = {
+            "mode": mode,
+            "dim": int(embeddings.shape[1]),
+            "count": int(len(embeddings)),
+            "full_precision": keep_full_precision,
+        }
+        with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f)
+
+        return cls.open(directory)
+
+    @classmethod
+    def open(cls, directory: str) -> "CompactEmbeddingStore":
+        """
+        Open a store written by `write`, memory-mapping every file read-only.
+
+        Args:
+            directory: Store directory
+
+        Returns:
+            The opened store
+        """
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+
+        index = faiss.read_index(os.path.join(directory, CODES_FILE), MMAP_READ_FLAGS)
+        ids = np.load(os.path.join(directory, IDS_FILE), mmap_mode="r")
+        full_vectors = None
+        if manifest.get("full_precision"):
+            full_vectors = np.load(os.path.join(directory, FULL_VECTORS_FILE), mmap_mode="r")
+
+        logger.info(f"Opened {manifest['mode']} embedding store with {index.ntotal} vectors from {directory}")
+        return cls(directory, manifest["mode"], index, ids, full_vectors)
+
+    def vectors(self, start: int, end: int) -> np.ndarray:
+        """
+        Returns rows [start, end) as float32: the full-precision copy when one was written,
+        otherwise vectors decoded from the compact codes.
+        """
+        end = min(end, self.ntotal)
+        if self.full_vectors is not None:
+            return np.asarray(self.full_vectors[start:end], dtype=np.float32)
+        return self.index.reconstruct_n(start, end - start)
+
+    def _rerank(self, query_vectors: np.ndarray, positions: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Re-rank candidate positions with exact float32 squared L2 distances.
+
+        Args:
+            query_vectors: float32 array of shape (nq, dim)
+            positions: Candidate row positions of shape (nq, candidates), -1 for padding
+            top_k: Number of results to keep per query
+
+        Returns:
+            Tuple of (distances, positions), each of shape (nq, top_k)
+        """
+        valid = positions >= 0
+        rows = np.where(valid, positions, 0)
+        candidates = np.asarray(self.full_vectors[rows.ravel()], dtype=np.float32).reshape(*rows.shape, -1)
+        distances = ((candidates - query_vectors[:, None, :]) ** 2).sum(axis=2)
+        distances[~valid] = np.inf
+
+        order = np.argsort(distances, axis=1)[:, :top_k]
+        distances = np.take_along_axis(distances, order, axis=1)
+        positions = np.where(np.isinf(distances), -1, np.take_along_axis(positions, order, axis=1))
+        return distances.astype(np.float32), positions
+
+    def search(self, query_vectors: np.ndarray, top_k: int,
+               rerank_factor: int = DEFAULT_RERANK_FACTOR) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Search the store, re-ranking the top candidates at full precision when available.
+
+        Args:
+            query_vectors: Array of query embeddings of shape (nq, dim)
+            top_k: Number of results per query
+            rerank_factor: Candidates fetched from the compact codes per requested result
+
+        Returns:
+            Tuple of (squared L2 distances, issue ids), each of shape (nq, top_k); missing results are -1
+        """
+        query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+        if self.full_vectors is None or rerank_factor <= 1:
+            distances, positions = self.index.search(query_vectors, top_k)
+        else:
+            candidates = min(self.ntotal, top_k * rerank_factor)
+            _, positions = self.index.search(query_vectors, candidates)
+            distances, positions = self._rerank(query_vectors, positions, top_k)
+            if positions.shape[1] < top_k:
+                pad = top_k - positions.shape[1]
+                distances = np.pad(distances, ((0, 0), (0, pad)), constant_values=np.inf)
+                positions = np.pad(positions, ((0, 0), (0, pad)), constant_values=-1)
+
+        issue_ids = np.where(positions >= 0, self.ids[np.where(positions >= 0, positions, 0)], -1)
+        return distances, issue_ids
@@ -1,10 +1,19 @@
-import requests
+import asyncio
 from sentence_transformers import SentenceTransformer
 import faiss, re
 import numpy as np
 import json
-from typing import List, Dict, Any, Optional
+import hashlib
+from fastapi import HTTPException
+from typing import List, Dict, Any, Optional, Tuple
 import logging
+from . import github_service
+from .cache import get_cache
+from .issue_record import IssueRecord, cache_search_items
+from .near_duplicates import near_duplicate_representatives
+from .rescoring import issue_features, rerank
+from ..core.config import settings
+from .singleflight import SingleFlight
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -12,64 +21,109 @@ logger = logging.getLogger(__name__)
 
 # Constants
 TOP_PER_KEYWORD = 5  # Number of issues to fetch per keyword
+TOP_PER_GENERATED_QUERY = 30  # Number of issues to fetch per generated search query
+# Every query is a concurrent GitHub search on the caller's token (30 searches/min), so fan-out is capped
+MAX_SEARCH_QUERIES = 5  # Gemini generates up to three variations
+MAX_LABEL_SEARCHES = 6
 MODEL_NAME = "all-MiniLM-L6-v2"  # Sentence transformer model to use
+QUERY_CACHE_TTL_SECONDS = 60 * 60  # How long an encoded query vector stays cached
+QUERY_CACHE_MAX_ENTRIES = 1024  # Query vectors kept before least-recently-used eviction
 
 # Global variables
-model = None
+model = None  # Loaded on first use (or at server startup) so importing this module stays light
+_query_vector_cache = get_cache("query_vectors", ttl=QUERY_CACHE_TTL_SECONDS, max_entries=QUERY_CACHE_MAX_ENTRIES)
+_embedding_flight = SingleFlight("embeddings")
 
-# Initialize the model
-try:
-    logger.info(f"Loading sentence transformer model: {MODEL_NAME}")
-    model = SentenceTransformer(MODEL_NAME)
-    logger.info("Model loaded successfully")
-except Exception as e:
-    logger.error(f"Error loading model: {str(e)}")
-    model = None
+
+async def _search_issues_for_query(query: str, top_k: int, github_token: Optional[str],
+                                   query_class: str = "label") -> List[Dict[str, Any]]:
+    """
+    Run one GitHub issue search.
+    Goes through the stale-while-revalidate issue search cache, so repeated queries are
+    usually answered without a GitHub call. Items are cached already projected into records.
+
+    Args:
+        query: GitHub issue search query
+        top_k: Number of issues to fetch
+        github_token: GitHub API token for authentication
+        query_class: Cache TTL class of the query ("label" or "generated")
+
+    Returns:
+        Up to top_k cached issue records (see IssueRecord.to_cached; empty on errors)
+    """
+    logger.info(f"Fetching issues for query: {query}")
+    try:
+        search_results = await github_service.search_issues(github_token, query, per_page=top_k, query_class=query_class,
+                                                            project_items=cache_search_items)
+    except HTTPException as e:
+        logger.error(f"Error for query: {query}, Status Code: {e.status_code}: {e.detail}")
+        return []
+
+    items = search_results.get('items', [])
+    logger.info(f"Found {len(items)} issues for query: {query}")
+    return items[:top_k]  # Take top N only
 
 
-def fetch_github_issues(keywords: List[str], top_k: int = TOP_PER_KEYWORD, github_token: Optional[str] = None) -> List[
-    Dict[str, Any]]:
+async def fetch_issues_for_queries(queries: List[str], top_k: int, github_token: Optional[str] = None,
+                                   query_class: str = "generated") -> List[IssueRecord]:
     """
-    Fetch GitHub issues based on keywords.
+    Run several GitHub issue searches concurrently and merge their results.
+    Searches go through the shared issue search cache (over the pooled HTTP client), which also
+    joins identical searches already in flight for other requests. Results (projected into slim
+    IssueRecords when they were fetched) are deduplicated by issue id, in first-seen order; near-duplicate issues
+    (templated or bot-filed clones) are then collapsed to their first occurrence.
 
     Args:
-        keywords: List of keywords to search for
-        top_k: Number of issues to fetch per keyword
+        queries: GitHub issue search queries
+        top_k: Number of issues to fetch per query
         github_token: GitHub API token for authentication
+        query_class: Cache TTL class of the queries
 
     Returns:
-        List of GitHub issues
+        List of issue records
     """
-    logger.info(f"Fetching GitHub issues for keywords: {keywords}")
+    results = await asyncio.gather(*(_search_issues_for_query(query, top_k, github_token, query_class) for query in queries))
 
-    headers = {"Accept": "application/vnd.github+json"}
-    if github_token:
-        headers["Authorization"] = f"Bearer {github_token}"
+    # Deduplicate by issue id (URL for items without one)
+    unique_issues = list({issue.get('id') or issue.get('html_url'): issue for items in results for issue in items}.values())
+    logger.info(f"Total unique issues fetched: {len(unique_issues)} from {len(queries)} queries")
 
-    all_issues = []
-    for keyword in keywords:
-        query = f'label:"{keyword}"+state:open+type:issue'
-        url = f"https://api.github.com/search/issues?q={query}&per_page={top_k}"
+    records = [IssueRecord.from_cached(issue) for issue in unique_issues]
+    keep = await asyncio.to_thread(near_duplicate_representatives, [record.embed_text for record in records])
+    if len(keep) < len(records):
+        logger.info(f"Dropped {len(records) - len(keep)} near-duplicate issues")
+    return [records[i] for i in keep]
 
-        logger.info(f"Fetching issues for keyword: {keyword}")
-        response = requests.get(url, headers=headers)
 
-        if response.status_code == 200:
-            items = response.json().get('items', [])
-            logger.info(f"Found {len(items)} issues for keyword: {keyword}")
-            all_issues.extend(items[:top_k])  # Take top N only
-        else:
-            logger.error(f"Error for keyword: {keyword}, Status Code: {response.status_code}")
-            if response.status_code == 403:
-                logger.error("Rate limit exceeded or authentication required")
-            elif response.status_code == 401:
-                logger.error("Unauthorized - check your GitHub token")
+async def fetch_github_issues(keywords: List[str], top_k: int = TOP_PER_KEYWORD, github_token: Optional[str] = None) -> List[
+    IssueRecord]:
+    """
+    Fetch GitHub issues based on keywords, with one label search per keyword.
+
+    Args:
+        keywords: List of keywords to search for
+        top_k: Number of issues to fetch per keyword
+        github_token: GitHub API token for authentication
 
-    # Deduplicate by URL
-    unique_issues = list({issue['html_url']: issue for issue in all_issues}.values())
-    logger.info(f"Total unique issues fetched: {len(unique_issues)}")
+    Returns:
+        List of issue records
+    """
+    logger.info(f"Fetching GitHub issues for keywords: {keywords}")
+    queries = [f'label:"{keyword}" state:open type:issue' for keyword in keywords]
+    return await fetch_issues_for_queries(queries, top_k, github_token, query_class="label")
 
-    return unique_issues
+
+async def ensure_model_async() -> SentenceTransformer:
+    """
+    Returns the shared model, loading it off the event loop on first use.
+    Not loaded at import: the offline build's spawn workers re-import this module (as `__mp_main__`)
+    and load their own copy in `index_build._init_worker`.
+    """
+    global model
+    if model is None:
+        logger.info(f"Loading sentence transformer model: {MODEL_NAME}")
+        model = await asyncio.to_thread(SentenceTransformer, MODEL_NAME)
+    return model
 
 
 def embed_texts(texts: List[str], model: SentenceTransformer) -> np.ndarray:
@@ -87,6 +141,84 @@ def embed_texts(texts: List[str], model: SentenceTransformer) -> np.ndarray:
     return model.encode(texts, convert_to_numpy=True)
 
 
+async def embed_texts_async(texts: List[str], model: SentenceTransformer) -> np.ndarray:
+    """
+    Embed texts off the event loop, sharing the work with identical concurrent embedding calls.
+
+    Args:
+        texts: List of texts to embed
+        model: Sentence transformer model
+
+    Returns:
+        Array of embeddings (shared between callers; do not modify in place)
+    """
+    key = hashlib.sha256("\0".join([MODEL_NAME, *texts]).encode("utf-8")).hexdigest()
+    return await _embedding_flight.do(key, lambda: asyncio.to_thread(embed_texts, texts, model))
+
+
+def normalize_query_text(query_text: str) -> str:
+    """
+    Normalize query text so equivalent profile blobs share one cache entry.
+    The model's tokenizer is uncased, so lowercasing does not change the embedding.
+
+    Args:
+        query_text: Raw query text
+
+    Returns:
+        Normalized query text
+    """
+    return re.sub(r"\s+", " ", query_text).strip().lower()
+
+
+def _query_cache_key(normalized_query: str) -> str:
+    return hashlib.sha256(f"{MODEL_NAME}\0{normalized_query}".encode("utf-8")).hexdigest()
+
+
+def encode_query(query_text: str, model: SentenceTransformer) -> np.ndarray:
+    """
+    Encode a query, reusing the cached vector for previously seen (normalized) query text.
+
+    Args:
+        query_text: Query text
+        model: Sentence transformer model
+
+    Returns:
+        Read-only query vector of shape (1, dim)
+    """
+    normalized = normalize_query_text(query_text)
+    key = _query_cache_key(normalized)
+
+    query_vector = _query_vector_cache.get(key)
+    if query_vector is not None:
+        logger.info("Query embedding cache hit")
+        return query_vector
+
+    query_vector = model.encode([normalized], convert_to_numpy=True)
+    query_vector.setflags(write=False)  # Shared between requests
+    _query_vector_cache.set(key, query_vector)
+    return query_vector
+
+
+async def encode_query_async(query_text: str, model: SentenceTransformer) -> np.ndarray:
+    """
+    Async variant of encode_query: cache hits return immediately, misses are encoded off the
+    event loop and shared with identical concurrent queries.
+
+    Args:
+        query_text: Query text
+        model: Sentence transformer model
+
+    Returns:
+        Read-only query vector of shape (1, dim)
+    """
+    key = _query_cache_key(normalize_query_text(query_text))
+    query_vector = await _query_vector_cache.aget(key)
+    if query_vector is not None:
+        logger.info("Query embedding cache hit")
+        return query_vector
+    return await _embedding_flight.do(key, lambda: asyncio.to_thread(encode_query, query_text, model))
+
+
 def build_faiss_index(embeddings: np.ndarray) -> faiss.Index:
     """
     Build a FAISS index from embeddings.
@@ -106,9 +238,13 @@ def build_faiss_index(embeddings: np.ndarray) -> faiss.Index:
 
 
 def search_similar_issues(query_text: str, model: SentenceTransformer, index: faiss.Index,
-                          all_issues: List[Dict[str, Any]], top_k: int = 5) -> List[Dict[str, Any]]:
+                          all_issues: List[IssueRecord], top_k: int = 5,
+                          query_vector: Optional[np.ndarray] = None,
+                          features: Optional[np.ndarray] = None) -> List[Tuple[IssueRecord, float]]:
     """
     Search for similar issues using the FAISS index.
+    With `features`, RESCORING_CANDIDATE_FACTOR times as many neighbours are retrieved and
+    re-ranked by their combined score (see rescoring); the returned scores stay the similarities.
 
     Args:
         query_text: Query text
@@ -116,72 +252,62 @@ def search_similar_issues(query_text: str, model: SentenceTransformer, index: fa
         index: FAISS index
         all_issues: List of all issues
         top_k: Number of top matches to return
+        query_vector: Pre-computed query embedding (encoded from query_text if omitted)
+        features: Feature matrix aligned with the index rows (see rescoring.issue_features)
 
     Returns:
-        List of similar issues
+        List of (issue, similarity score) pairs, best first
     """
     logger.info(f"Searching for similar issues to: {query_text[:100]}...")
-    query_vector = model.encode([query_text], convert_to_numpy=True)
-    distances, indices = index.search(query_vector, top_k)
+    if query_vector is None:
+        query_vector = encode_query(query_text, model)
+    candidates = top_k * settings.RESCORING_CANDIDATE_FACTOR if features is not None else top_k
+    distances, indices = index.search(query_vector, candidates)
 
     # Log the distances for debugging
-    logger.info(f"Search distances: {distances[0]}")
-
-    # Get the issues corresponding to the indices
-    similar_issues = []
-    for i, idx in enumerate(indices[0]):
-        if idx < 0 or idx >= len(all_issues):
-            logger.warning(f"Invalid index: {idx}, skipping")
-            continue
-        issue = all_issues[idx]
-        issue['similarity_score'] = float(1.0 - distances[0][i] / 2.0)  # Convert L2 distance to similarity score
-        similar_issues.append(issue)
+    logger.info(f"Search distances: {distances[0][:top_k]}")
+
+    # Drop padding (-1) rows and convert L2 distances to similarity scores
+    valid = (indices[0] >= 0) & (indices[0] < len(all_issues))
+    positions = indices[0][valid]
+    similarities = 1.0 - distances[0][valid] / 2.0
+    if features is not None:
+        order = rerank(similarities, features[positions], top_k)
+        positions, similarities = positions[order], similarities[order]
+    similar_issues = [(all_issues[idx], score) for idx, score in zip(positions.tolist(), similarities.tolist())]
 
     logger.info(f"Found {len(similar_issues)} similar issues")
     return similar_issues
 
 
-def format_issues_json(issues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def format_issues_json(matches: List[Tuple[IssueRecord, float]]) -> List[Dict[str, Any]]:
     """
     Format issues for JSON output.
 
     Args:
-        issues: List of issues
+        matches: List of (issue, similarity score) pairs
 
     Returns:
         List of formatted issues
     """
     logger.info("Formatting issues for JSON output")
-    results = []
-    for issue in issues:
-        body = issue.get("body", "")
-        cleaned_body = re.sub(r"\s+", " ", body).strip()
-        short_description = (cleaned_body[:120] + "...") if len(cleaned_body) > 120 else cleaned_body
-
-        results.append({
-            "issue_id": issue.get("id"),
-            "issue_url": issue.get("html_url"),
-            "repo_url": issue.get("repository_url", "").replace("api.github.com/repos", "github.com"),
-            "title": issue.get("title"),
-            "created_at": issue.get("created_at"),
-            "user_login": issue.get("user", {}).get("login"),
-            "labels": [label.get("name") for label in issue.get("labels", [])],
-            "similarity_score": issue.get("similarity_score", 0.0),
-            "short_description": short_description
-        })
-
-    return results
-
-
-def get_top_matched_issues(
+    return [issue.to_result(similarity_score) for issue, similarity_score in matches]
+
+
+async def get_top_matched_issues(
         query_text: str,
         keywords: List[str],
         languages: List[str] = None,
         top_k: int = 10,
-        github_token: Optional[str] = None
+        github_token: Optional[str] = None,
+        search_queries: Optional[List[str]] = None,
+        query_vector: Optional[np.ndarray] = None
 ) -> Dict[str, Any]:
     """
     Get top matched issues for a query.
+    Candidates come from `search_queries` (e.g. the Gemini-generated query variations) when given,
+    otherwise from one label search per keyword; either way the searches run concurrently and all
+    candidates are ranked in one batched embedding pass.
 
     Args:
         query_text: Query text
@@ -189,37 +315,40 @@ def get_top_matched_issues(
         languages: List of programming languages (used to refine keywords)
         top_k: Number of top matches to return
         github_token: GitHub API token for authentication
+        search_queries: Full GitHub issue search queries to retrieve candidates with
+        query_vector: Stored query embedding (e.g. the user's profile vector) to rank with instead of encoding query_text
 
     Returns:
         Dictionary with recommendations, counts, and status message
     """
-    global model
-
     try:
         logger.info(f"Getting top matched issues for query: {query_text[:100]}...")
 
-        # Check if model is loaded
-        if model is None:
-            logger.info(f"Loading sentence transformer model: {MODEL_NAME}")
-            model = SentenceTransformer(MODEL_NAME)
+        model = await ensure_model_async()
 
-        # Prepare search keywords
-        search_keywords = keywords.copy()
+        if search_queries:
+            # Fetch issues for the given search queries
+            search_queries = search_queries[:MAX_SEARCH_QUERIES]
+            logger.info(f"Search queries: {search_queries}")
+            issues = await fetch_issues_for_queries(search_queries, top_k=TOP_PER_GENERATED_QUERY, github_token=github_token)
+        else:
+            # Prepare search keywords
+            search_keywords = keywords.copy()
 
-        # Add language-specific keywords
-        if languages:
-            for lang in languages:
-                search_keywords.append(f"{lang}")
+            # Add language-specific keywords
+            if languages:
+                for lang in languages:
+                    search_keywords.append(f"{lang}")
 
-        # Add general keywords for good first issues
-        search_keywords.extend(["good first issue", "beginner friendly", "easy"])
+            # Add general keywords for good first issues
+            search_keywords.extend(["good first issue", "beginner friendly", "easy"])
 
-        # Remove duplicates
-        search_keywords = list(set(search_keywords))
-        logger.info(f"Search keywords: {search_keywords}")
+            # Remove duplicates (keeping the caller's keywords first) and cap the number of searches
+            search_keywords = list(dict.fromkeys(search_keywords))[:MAX_LABEL_SEARCHES]
+            logger.info(f"Search keywords: {search_keywords}")
 
-        # Fetch issues
-        issues = fetch_github_issues(search_keywords, top_k=TOP_PER_KEYWORD, github_token=github_token)
+            # Fetch issues
+            issues = await fetch_github_issues(search_keywords, top_k=TOP_PER_KEYWORD, github_token=github_token)
 
         if not issues:
             logger.warning("No issues fetched")
@@ -230,17 +359,19 @@ def get_top_matched_issues(
                 "message": "No issues found for the given keywords"
             }
 
-        # Prepare issue texts for embedding
-        issue_texts = [f"{issue['title']} {issue.get('body', '')}" for issue in issues]
-
-        # Embed issues
-        embeddings = embed_texts(issue_texts, model)
+        # Embed issues (one text each, see issue_embedding.py)
+        embeddings = await embed_texts_async([issue.embed_text for issue in issues], model)
 
         # Build FAISS index
         index = build_faiss_index(np.array(embeddings))
 
         # Search for similar issues
-        top_matches = search_similar_issues(query_text, model, index, issues, top_k=top_k)
+        if query_vector is None:
+            query_vector = await encode_query_async(query_text, model)
+        else:
+            query_vector = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+        top_matches = search_similar_issues(query_text, model, index, issues, top_k=top_k, query_vector=query_vector,
+                                            features=issue_features(issues))
 
         # Format issues for output
         formatted_issues = format_issues_json(top_matches)
@@ -261,4 +392,25 @@ def get_top_matched_issues(
             "issues_fetched": 0,
             "issues_indexed": 0,
             "message": f"Error matching issues: {str(e)}"
-        }
\ No newline at end of file
+        }
+
+if __name__ == "__main__":
+    import argparse
+    from .index_build import DEFAULT_BATCH_SIZE, DEFAULT_WORK_DIR, build_index
+    from .embedding_store import STORAGE_MODES
+
+    parser = argparse.ArgumentParser(description="Issue index tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Build and publish an index snapshot from JSONL issue dumps")
+    build.add_argument("dumps", nargs="+", help="JSONL(.gz) files or glob patterns of raw GitHub issue items")
+    build.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="Directory for resumable build state")
+    build.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Issues per saved part")
+    build.add_argument("--workers", type=int, default=None, help="Encoding processes (default: CPU count)")
+    build.add_argument("--mode", choices=STORAGE_MODES, default=None, help="Embedding storage mode (default: EMBEDDING_STORAGE_MODE)")
+    build.add_argument("--fold-delta", action="store_true", help="Fold the webhook delta into the snapshot and prune it")
+    build.add_argument("--keep-work-dir", action="store_true", help="Keep the saved parts after publishing")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_index(args.dumps, MODEL_NAME, work_dir=args.work_dir, batch_size=args.batch_size, workers=args.workers,
+                    mode=args.mode, fold_delta=args.fold_delta, keep_work_dir=args.keep_work_dir)
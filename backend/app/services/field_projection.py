@@ -0,0 +1,43 @@
+from typing import Any, Dict, Optional, Tuple
+
+# --- Sparse Fieldsets ---
+# `fields=name,html_url,owner.login` keeps only the listed (dotted) paths of a GitHub payload.
+# Paths are compiled into a tree once per request; lists of objects are projected element-wise,
+# so `labels.name` keeps just the name of every label.
+
+FieldTree = Dict[str, Optional["FieldTree"]]  # None = keep the whole value
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """ Parses a comma-separated `fields` parameter into a canonical (sorted, de-duplicated) tuple, or None for all fields. """
+    if not fields:
+        return None
+    paths = sorted({path.strip() for path in fields.split(",") if path.strip()})
+    return tuple(paths) or None
+
+
+def compile_fields(paths: Tuple[str, ...]) -> FieldTree:
+    """ Builds the field tree for parsed paths; a whole value wins over any of its sub-paths. """
+    tree: FieldTree = {}
+    for path in paths:
+        node = tree
+        *parents, leaf = path.split(".")
+        for part in parents:
+            child = node.setdefault(part, {})
+            if child is None:
+                break
+            node = child
+        else:
+            node[leaf] = None
+    return tree
+
+
+def project(value: Any, tree: Optional[FieldTree]) -> Any:
+    """ Projects a parsed JSON value onto a compiled field tree (fields missing from the value are skipped). """
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: project(value[key], subtree) for key, subtree in tree.items() if key in value}
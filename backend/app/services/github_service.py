@@ -1,20 +1,54 @@
 import asyncio
 import httpx
 import base64
+import hashlib
 import re
 import os
 import traceback
 from fastapi import HTTPException, status
-from typing import Dict, List, Set, Optional, Any
+from typing import AsyncIterator, Callable, Dict, List, Set, Optional, Any, Tuple
+from ..core.config import settings
+from .cache import get_cache
+from .http_client import get_http_client
+from .singleflight import SingleFlight
+from .field_projection import compile_fields, project
+from .swr_cache import NOT_MODIFIED, CacheFetch, StaleWhileRevalidateCache
 
 # --- GitHub API Constants ---
 GITHUB_API_URL = "https://api.github.com"
 MAX_REPOS_FOR_README = 7
+MAX_REPOS_FOR_PROFILE = 500  # Cap on repos streamed for language/topic aggregation
+MAX_DESCRIPTIONS_FOR_TEXT = 30  # Repo descriptions added to the profile text blob, after the READMEs
+MAX_PROFILE_TEXT_CHARS = 50000
+DEFAULT_MAX_REPOS = 30  # Repos returned by get_user_repos unless the caller asks for more
+REPO_DOCUMENT_TTL_SECONDS = 7 * 24 * 60 * 60  # Forget README documents of repos not seen for a week
+REPO_DOCUMENT_STORE_MAX_ENTRIES = 10000
+PROJECTION_CACHE_TTL_SECONDS = 60  # Sparse-fieldset profile/repo responses, per token
+PROJECTION_CACHE_MAX_ENTRIES = 10000
 
+# Per-repo README documents keyed by repo API URL: {"pushed_at", "readme_sha", "etag", "readme"}
+_repo_document_store = get_cache("repo_documents", ttl=REPO_DOCUMENT_TTL_SECONDS, max_entries=REPO_DOCUMENT_STORE_MAX_ENTRIES)
+_readme_flight = SingleFlight("readme")
+_issue_search_cache = StaleWhileRevalidateCache("issue-search", max_entries=settings.ISSUE_SEARCH_CACHE_MAX_ENTRIES)
+_projection_cache = get_cache("github_projections", ttl=PROJECTION_CACHE_TTL_SECONDS, max_entries=PROJECTION_CACHE_MAX_ENTRIES)
 
-async def get_user_profile(token: str) -> Dict[str, Any]:
-    """ Fetches the authenticated user's GitHub profile. """
+
+def _token_key(token: Optional[str]) -> str:
+    """ Short hash identifying a token in cache keys. """
+    return hashlib.sha256(token.encode()).hexdigest()[:16] if token else "anonymous"
+
+
+async def get_user_profile(token: str, fields: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+    """
+    Fetches the authenticated user's GitHub profile.
+    With `fields` (see field_projection.parse_fields), only those fields are returned, and the
+    projected profile is cached briefly.
+    """
     if not token: raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="GitHub token not provided for get_user_profile")
+    if fields:
+        cache_key = f"profile:{_token_key(token)}:{','.join(fields)}"
+        cached = await _projection_cache.aget(cache_key)
+        if cached is not None: return cached
     async with httpx.AsyncClient() as client:
         headers = {"Authorization": f"Bearer {token}", "Accept": "application/vnd.github.v3+json", "X-GitHub-Api-Version": "2022-11-28"}
         url = f"{GITHUB_API_URL}/user"
@@ -22,7 +56,10 @@ async def get_user_profile(token: str) -> Dict[str, Any]:
             print(f"DEBUG [GitHub Service]: Fetching user profile from {url}")
             response = await client.get(url, headers=headers, timeout=10.0)
             response.raise_for_status(); profile = response.json()
-            print(f"DEBUG [GitHub Service]: Successfully fetched profile for user {profile.get('login')}"); return profile
+            print(f"DEBUG [GitHub Service]: Successfully fetched profile for user {profile.get('login')}")
+            if fields:
+                profile = project(profile, compile_fields(fields)); await _projection_cache.aset(cache_key, profile)
+            return profile
         except httpx.HTTPStatusError as exc:
             detail = f"GitHub API error fetching user profile: {exc.response.status_code}"; status_code = exc.response.status_code
             if status_code == 401: detail = "GitHub token invalid or expired."
@@ -32,72 +69,161 @@ async def get_user_profile(token: str) -> Dict[str, Any]:
         except Exception as exc: print(f"ERROR [GitHub Service]: Unexpected error fetching user profile: {exc}"); print(traceback.format_exc()); raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred fetching user profile.") from exc
 
 
-async def get_user_repos(token: str, per_page: int = 30) -> List[Dict[str, Any]]:
-    """ Fetches the authenticated user's repositories, sorted by recent push date. """
+async def iter_user_repos(token: str, per_page: int = 100, max_repos: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streams the authenticated user's repositories, sorted by recent push date.
+    Follows Link: rel="next" headers page by page, yielding each repo as its page arrives,
+    and stops requesting pages once `max_repos` repos were yielded.
+    """
     if not token: raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="GitHub token not provided for get_user_repos")
+    if max_repos is not None:
+        if max_repos <= 0: return
+        per_page = min(per_page, max_repos)
     async with httpx.AsyncClient() as client:
         headers = {"Authorization": f"Bearer {token}", "Accept": "application/vnd.github.v3+json", "X-GitHub-Api-Version": "2022-11-28"}
-        repos_url = f"{GITHUB_API_URL}/user/repos?sort=pushed&per_page={per_page}"
-        try:
-            # print(f"DEBUG [GitHub Service]: Fetching user repos from {repos_url}")
-            repo_response = await client.get(repos_url, headers=headers, timeout=15.0)
-            repo_response.raise_for_status(); repos_data = repo_response.json()
-            if not isinstance(repos_data, list): print(f"Warning [GitHub Service]: Unexpected repo data format: {type(repos_data)}"); return []
-            print(f"DEBUG [GitHub Service]: Fetched {len(repos_data)} repos."); return repos_data
-        except httpx.HTTPStatusError as exc:
-            detail = f"GitHub API error fetching user repos: {exc.response.status_code}"; status_code = exc.response.status_code
-            if status_code == 401: detail = "GitHub token invalid or expired."
-            elif status_code == 403: detail = "GitHub API rate limit likely exceeded or token lacks permissions for user repos."
-            print(f"ERROR [GitHub Service]: {detail}"); raise HTTPException(status_code=status_code, detail=detail) from exc
-        except httpx.RequestError as exc: print(f"ERROR [GitHub Service]: Could not connect to GitHub API for user repos: {exc}"); raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Could not connect to GitHub API: {exc}") from exc
-        except Exception as exc: print(f"ERROR [GitHub Service]: Unexpected error fetching user repos: {exc}"); print(traceback.format_exc()); raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred fetching user repos.") from exc
+        repos_url: Optional[str] = f"{GITHUB_API_URL}/user/repos?sort=pushed&per_page={per_page}"
+        yielded = 0
+        while repos_url:
+            try:
+                # print(f"DEBUG [GitHub Service]: Fetching user repos from {repos_url}")
+                repo_response = await client.get(repos_url, headers=headers, timeout=15.0)
+                repo_response.raise_for_status(); repos_data = repo_response.json()
+            except httpx.HTTPStatusError as exc:
+                detail = f"GitHub API error fetching user repos: {exc.response.status_code}"; status_code = exc.response.status_code
+                if status_code == 401: detail = "GitHub token invalid or expired."
+                elif status_code == 403: detail = "GitHub API rate limit likely exceeded or token lacks permissions for user repos."
+                print(f"ERROR [GitHub Service]: {detail}"); raise HTTPException(status_code=status_code, detail=detail) from exc
+            except httpx.RequestError as exc: print(f"ERROR [GitHub Service]: Could not connect to GitHub API for user repos: {exc}"); raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Could not connect to GitHub API: {exc}") from exc
+            except Exception as exc: print(f"ERROR [GitHub Service]: Unexpected error fetching user repos: {exc}"); print(traceback.format_exc()); raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred fetching user repos.") from exc
+
+            if not isinstance(repos_data, list): print(f"Warning [GitHub Service]: Unexpected repo data format: {type(repos_data)}"); return
+            print(f"DEBUG [GitHub Service]: Fetched page of {len(repos_data)} repos.")
+            for repo in repos_data:
+                if max_repos is not None and yielded >= max_repos: return
+                yield repo; yielded += 1
+            repos_url = repo_response.links.get("next", {}).get("url")
 
 
-async def search_issues(token: Optional[str], query: str) -> Dict[str, Any]:
-    """ Searches for issues on GitHub using the provided query string. """
+async def get_user_repos(token: str, per_page: int = 100, max_repos: Optional[int] = DEFAULT_MAX_REPOS,
+                         fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+    """
+    Fetches the authenticated user's most recently pushed repositories (up to `max_repos`; None for all).
+    With `fields`, each repo is projected as its page arrives, and the projected list is cached briefly.
+    """
+    if not fields:
+        repos_data = [repo async for repo in iter_user_repos(token, per_page=per_page, max_repos=max_repos)]
+        print(f"DEBUG [GitHub Service]: Fetched {len(repos_data)} repos."); return repos_data
+
+    cache_key = f"repos:{_token_key(token)}:{per_page}:{max_repos}:{','.join(fields)}"
+    cached = await _projection_cache.aget(cache_key)
+    if cached is not None: return cached
+    tree = compile_fields(fields)
+    repos_data = [project(repo, tree) async for repo in iter_user_repos(token, per_page=per_page, max_repos=max_repos)]
+    print(f"DEBUG [GitHub Service]: Fetched {len(repos_data)} repos (projected to {len(fields)} fields).")
+    await _projection_cache.aset(cache_key, repos_data)
+    return repos_data
+
+
+def _normalize_search_query(query: str) -> str:
+    """ Collapses whitespace and case so equivalent search queries share a cache entry. """
+    return " ".join(query.split()).lower()
+
+
+async def _fetch_search_results(token: Optional[str], query: str, per_page: int, etag: Optional[str],
+                                fields: Optional[Tuple[str, ...]] = None,
+                                project_items: Optional[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]] = None) -> Any:
+    """
+    Runs one GitHub issue search, revalidating with `etag` when given. Raises HTTPException on errors.
+    With `fields` and/or `project_items`, the items are projected before the result is cached.
+    """
     headers = {"Accept": "application/vnd.github.v3+json", "X-GitHub-Api-Version": "2022-11-28"}
     if token: headers["Authorization"] = f"Bearer {token}"
     else: print("WARN [GitHub Service]: Performing GitHub issue search without authentication. Rate limits are stricter.")
-    params = {"q": query, "per_page": 20}; url = f"{GITHUB_API_URL}/search/issues"
-    async with httpx.AsyncClient() as client:
-        try:
-            print(f"DEBUG [GitHub Service]: Searching issues with query: '{query}'")
-            response = await client.get(url, headers=headers, params=params, timeout=20.0)
-            response.raise_for_status(); search_results = response.json()
-            print(f"DEBUG [GitHub Service]: Found {search_results.get('total_count', 0)} total issues matching query."); return search_results
-        except httpx.HTTPStatusError as exc:
-            detail = f"GitHub API error searching issues: {exc.response.status_code}"; status_code = exc.response.status_code
-            if status_code == 401: detail = "GitHub token invalid or expired (if provided)."
-            elif status_code == 403: detail = "GitHub API rate limit likely exceeded or token lacks permissions for search."
-            elif status_code == 422: detail = "GitHub query validation failed. Check query syntax."
-            print(f"ERROR [GitHub Service]: {detail}. Query was: '{query}'"); raise HTTPException(status_code=status_code, detail=detail) from exc
-        except httpx.RequestError as exc: print(f"ERROR [GitHub Service]: Could not connect to GitHub API for issue search: {exc}"); raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Could not connect to GitHub API: {exc}") from exc
-        except Exception as exc: print(f"ERROR [GitHub Service]: Unexpected error searching issues: {exc}"); print(traceback.format_exc()); raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred searching issues.") from exc
+    if etag: headers["If-None-Match"] = etag
+    params = {"q": query, "per_page": per_page}; url = f"{GITHUB_API_URL}/search/issues"
+    client = get_http_client()
+    try:
+        print(f"DEBUG [GitHub Service]: Searching issues with query: '{query}'")
+        response = await client.get(url, headers=headers, params=params, timeout=20.0)
+        if response.status_code == 304: return NOT_MODIFIED
+        response.raise_for_status(); search_results = response.json()
+        print(f"DEBUG [GitHub Service]: Found {search_results.get('total_count', 0)} total issues matching query.")
+        if fields: search_results["items"] = project(search_results.get("items", []), compile_fields(fields))
+        if project_items: search_results["items"] = project_items(search_results.get("items", []))
+        return CacheFetch(search_results, response.headers.get("ETag"))
+    except httpx.HTTPStatusError as exc:
+        detail = f"GitHub API error searching issues: {exc.response.status_code}"; status_code = exc.response.status_code
+        if status_code == 401: detail = "GitHub token invalid or expired (if provided)."
+        elif status_code == 403: detail = "GitHub API rate limit likely exceeded or token lacks permissions for search."
+        elif status_code == 422: detail = "GitHub query validation failed. Check query syntax."
+        print(f"ERROR [GitHub Service]: {detail}. Query was: '{query}'"); raise HTTPException(status_code=status_code, detail=detail) from exc
+    except httpx.RequestError as exc: print(f"ERROR [GitHub Service]: Could not connect to GitHub API for issue search: {exc}"); raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Could not connect to GitHub API: {exc}") from exc
+    except Exception as exc: print(f"ERROR [GitHub Service]: Unexpected error searching issues: {exc}"); print(traceback.format_exc()); raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred searching issues.") from exc
+
+
+async def search_issues(token: Optional[str], query: str, per_page: int = 20, query_class: str = "custom",
+                        fields: Optional[Tuple[str, ...]] = None,
+                        project_items: Optional[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+    """
+    Searches for issues on GitHub using the provided query string.
+    Results are cached per normalized query, token and fieldset; `query_class` selects the fresh/grace TTLs
+    from settings.ISSUE_SEARCH_CACHE_TTLS. `fields` projects each item (total_count etc. are kept), and
+    `project_items` (a module-level function, part of the cache key) replaces the items with
+    JSON-compatible projections computed once per fetch.
+    The returned dict is shared between callers and must not be mutated.
+    """
+    fresh_ttl, grace_ttl = settings.ISSUE_SEARCH_CACHE_TTLS.get(query_class, settings.ISSUE_SEARCH_CACHE_TTLS["custom"])
+    projection = f"{project_items.__module__}.{project_items.__qualname__}" if project_items else ""
+    # Authenticated searches can include private repos, so results are only shared between identical tokens
+    key = f"{_token_key(token)}:{per_page}:{','.join(fields) if fields else '*'}:{projection}:{_normalize_search_query(query)}"
+    return await _issue_search_cache.get(
+        key, lambda etag: _fetch_search_results(token, query, per_page, etag, fields, project_items),
+        fresh_ttl=fresh_ttl, grace_ttl=grace_ttl
+    )
 
 
-async def _fetch_readme_content(repo_url: str, headers: dict, client: httpx.AsyncClient) -> Optional[str]:
+def _clean_readme_text(readme_text: str) -> str:
+    """ Collapses runs of blank lines and truncates README text. """
+    cleaned_content = re.sub(r'\n{3,}', '\n\n', readme_text)
+    max_readme_len = 2000
+    return cleaned_content[:max_readme_len]
+
+
+async def _fetch_readme_content(repo_url: str, headers: dict, client: httpx.AsyncClient,
+                                cached: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
     """
     Fetches README metadata from repo URL, decodes base64 content.
     Expects headers with Accept: application/vnd.github.v3+json
+    Returns a README document {"readme_sha", "etag", "readme"} ("readme" is None if the repo has no README),
+    or None if the fetch failed. When the README is unchanged since the cached document, its text is reused.
     """
     readme_url = f"{repo_url}/readme"
+    if cached and cached.get("etag"):
+        headers = {**headers, "If-None-Match": cached["etag"]} # 304s don't count against the rate limit
     try:
         readme_response = await client.get(readme_url, headers=headers, timeout=10.0)
+        if readme_response.status_code == 304:
+            print(f"DEBUG [GitHub Service][_fetch_readme_content]: README not modified (304) for {repo_url}")
+            return {"readme_sha": cached.get("readme_sha"), "etag": cached["etag"], "readme": cached.get("readme")}
         if readme_response.status_code == 404:
             print(f"DEBUG [GitHub Service][_fetch_readme_content]: No README found (404) for {repo_url}")
-            return None
+            return {"readme_sha": None, "etag": None, "readme": None}
 
         readme_response.raise_for_status() # Raise error for other bad statuses
         readme_data = readme_response.json()
 
+        readme_sha = readme_data.get("sha")
+        etag = readme_response.headers.get("ETag")
+        if cached and readme_sha and cached.get("readme_sha") == readme_sha:
+            print(f"DEBUG [GitHub Service][_fetch_readme_content]: README unchanged (sha {readme_sha[:7]}) for {repo_url}")
+            return {"readme_sha": readme_sha, "etag": etag, "readme": cached.get("readme")}
+
         if readme_data.get("encoding") == "base64" and readme_data.get("content"):
             decoded_content = base64.b64decode(readme_data["content"]).decode('utf-8', errors='ignore')
-            cleaned_content = re.sub(r'\n{3,}', '\n\n', decoded_content)
-            max_readme_len = 2000
-            return cleaned_content[:max_readme_len]
+            return {"readme_sha": readme_sha, "etag": etag, "readme": _clean_readme_text(decoded_content)}
         else:
             print(f"WARN [GitHub Service][_fetch_readme_content]: README found but no base64 content for {repo_url}")
-            return None
+            return {"readme_sha": readme_sha, "etag": etag, "readme": None}
     except httpx.HTTPStatusError as exc:
 
         print(f"WARN [GitHub Service][_fetch_readme_content]: HTTP status error fetching README metadata for {repo_url}: {exc.response.status_code}")
@@ -111,67 +237,116 @@ async def _fetch_readme_content(repo_url: str, headers: dict, client: httpx.Asyn
         return None
 
 
-async def get_profile_text_data(token: str, max_repos_for_readme: int = MAX_REPOS_FOR_README) -> Dict[str, List[str] | str]:
+async def _fetch_readme_shared(repo_url: str, token: str, headers: dict, client: httpx.AsyncClient,
+                               cached: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
     """
-    Fetches repository data (languages, topics, descriptions) and
-    README content, and combines text. Does NOT generate keywords.
+    _fetch_readme_content, joined with an identical fetch (same repo, token and cached ETag) already in flight.
+    The key carries the token's identity, not just its presence, so private READMEs are never shared between users.
+    """
+    key = (repo_url, _token_key(token), (cached or {}).get("etag"), (cached or {}).get("readme_sha"))
+    return await _readme_flight.do(key, lambda: _fetch_readme_content(repo_url, headers, client, cached))
+
+
+async def get_repo_documents(token: str, max_repos_for_readme: int = MAX_REPOS_FOR_README,
+                             max_repos: Optional[int] = MAX_REPOS_FOR_PROFILE) -> List[Dict[str, Any]]:
+    """
+    Fetches the user's repositories (most recently pushed first) as per-repo documents:
+    {"url", "full_name", "pushed_at", "language", "topics", "description", "readme"}.
+    READMEs are fetched for the first `max_repos_for_readme` repos only ("readme" is None otherwise).
     """
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="GitHub token not found")
 
-    # Fetch user repos first
-    repos_data = await get_user_repos(token, per_page=30) # Use the helper
+    documents: List[Dict[str, Any]] = []
+    readme_tasks = []
+    print("DEBUG [GitHub Service]: Starting GitHub data processing...")
+
+    # Stream the user's repos and start README fetches while later pages are still loading.
+    # README fetches go through the pooled client and are shared with identical in-flight fetches.
+    client = get_http_client()
+    # Define standard headers for fetching README JSON metadata
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/vnd.github.v3+json", # <<< Correct Accept header for metadata
+        "X-GitHub-Api-Version": "2022-11-28"
+    }
+    try:
+        async for repo in iter_user_repos(token, max_repos=max_repos):
+             if not isinstance(repo, dict): continue
+             document = {
+                 "url": repo.get("url"), "full_name": repo.get("full_name"), "pushed_at": repo.get("pushed_at"),
+                 "language": repo.get("language"), "topics": repo.get("topics") or [],
+                 "description": repo.get("description"), "readme": None,
+             }
+             # Reuse the stored README of repos that haven't been pushed to since the last visit
+             if len(documents) < max_repos_for_readme and repo.get("url"):
+                 cached = await _repo_document_store.aget(repo["url"])
+                 if cached and cached.get("pushed_at") == repo.get("pushed_at"):
+                     document["readme"] = cached.get("readme")
+                 else:
+                     task = asyncio.create_task(_fetch_readme_shared(repo['url'], token, headers, client, cached))
+                     readme_tasks.append({"document": document, "task": task})
+             documents.append(document)
+    except BaseException:
+        for task_info in readme_tasks: task_info["task"].cancel()
+        raise
+
+    # Collect the changed READMEs
+    if readme_tasks:
+         print(f"DEBUG [GitHub Service]: Fetching {len(readme_tasks)} READMEs concurrently ({min(len(documents), max_repos_for_readme) - len(readme_tasks)} unchanged repos reused)...")
+         results = await asyncio.gather(*(task_info["task"] for task_info in readme_tasks), return_exceptions=True)
+         for task_info, res in zip(readme_tasks, results):
+             if isinstance(res, Exception):
+                 # Log errors from gather explicitly
+                 print(f"WARN [GitHub Service]: Error during asyncio.gather for README fetch task: {res}")
+             elif res is not None:
+                 document = task_info["document"]
+                 document["readme"] = res["readme"]
+                 await _repo_document_store.aset(document["url"], {"pushed_at": document["pushed_at"], **res})
+
+    return documents
+
+
+async def get_profile_text_data(token: str, max_repos_for_readme: int = MAX_REPOS_FOR_README,
+                                max_repos: Optional[int] = MAX_REPOS_FOR_PROFILE,
+                                fetcher: Optional[str] = None) -> Dict[str, List[str] | str]:
+    """
+    Fetches repository data (languages, topics, descriptions) and
+    README content, and combines text. Does NOT generate keywords.
+    `fetcher` ("rest" or "graphql") defaults to settings.GITHUB_PROFILE_FETCHER.
+    """
+    if (fetcher or settings.GITHUB_PROFILE_FETCHER) == "graphql":
+        return (await get_profile_bundle_graphql(token, max_repos_for_readme, max_repos))[1]
+    return await _get_profile_text_data_rest(token, max_repos_for_readme, max_repos)
+
+
+async def _get_profile_text_data_rest(token: str, max_repos_for_readme: int,
+                                      max_repos: Optional[int]) -> Dict[str, List[str] | str]:
+    """ REST implementation of get_profile_text_data, built from get_repo_documents. """
+    documents = await get_repo_documents(token, max_repos_for_readme, max_repos)
 
     languages: Set[str] = set()
     topics: Set[str] = set()
     descriptions: List[str] = []
-    readme_tasks = []
-    print("DEBUG [GitHub Service]: Starting GitHub data processing...")
+    for document in documents:
+        lang = document["language"]
+        if lang and lang not in ['null', 'none']: languages.add(lang.lower())
+        if document["topics"]: topics.update([topic.lower() for topic in document["topics"]])
+        if document["description"]: descriptions.append(document["description"])
 
-    # Process repos data (extract info, prepare tasks)
-    for i, repo in enumerate(repos_data):
-         if not isinstance(repo, dict): continue
-         lang = repo.get("language")
-         if lang and lang not in ['null', 'none']: languages.add(lang.lower())
-         repo_topics = repo.get("topics", [])
-         if repo_topics: topics.update([topic.lower() for topic in repo_topics])
-         desc = repo.get("description")
-         if desc: descriptions.append(desc)
-         # Schedule README fetch task preparation (client/headers added below)
-         if i < max_repos_for_readme and repo.get("url"):
-             readme_tasks.append({"url": repo['url']}) # Store URL for task creation later
-
-    # Fetch READMEs concurrently using a single client session
-    readme_contents = []
-    if readme_tasks:
-        async with httpx.AsyncClient() as client:
-            # Define standard headers for fetching README JSON metadata
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/vnd.github.v3+json", # <<< Correct Accept header for metadata
-                "X-GitHub-Api-Version": "2022-11-28"
-            }
-            # Create actual tasks with client and correct headers
-            tasks_to_run = [
-                _fetch_readme_content(task_info['url'], headers, client)
-                for task_info in readme_tasks
-            ]
-
-            if tasks_to_run:
-                 print(f"DEBUG [GitHub Service]: Fetching {len(tasks_to_run)} READMEs concurrently...")
-                 results = await asyncio.gather(*tasks_to_run, return_exceptions=True)
-                 for res in results:
-                     if isinstance(res, Exception):
-                         # Log errors from gather explicitly
-                         print(f"WARN [GitHub Service]: Error during asyncio.gather for README fetch task: {res}")
-                     elif res is not None:
-                         readme_contents.append(res)
-                 print(f"DEBUG [GitHub Service]: Fetched {len(readme_contents)} non-empty READMEs.")
-
-    # Combine Text
-    text_blob = "\n".join(descriptions + readme_contents)
-    max_length = 50000
-    text_blob = text_blob[:max_length]
+    readme_contents = [document["readme"] for document in documents if document["readme"]]
+    print(f"DEBUG [GitHub Service]: Using {len(readme_contents)} non-empty READMEs.")
+
+    return _assemble_profile_text_data(languages, topics, descriptions, readme_contents)
+
+
+def _assemble_profile_text_data(languages: Set[str], topics: Set[str], descriptions: List[str],
+                                readme_contents: List[str]) -> Dict[str, List[str] | str]:
+    """ Combines READMEs and repo descriptions into the profile text blob, falling back to defaults for empty fields. """
+    # Combine Text: READMEs first so truncation never drops them; descriptions are capped separately
+    # from the repos streamed for language/topic aggregation
+    text_blob = "\n".join(readme_contents + descriptions[:MAX_DESCRIPTIONS_FOR_TEXT])
+    text_blob = text_blob[:MAX_PROFILE_TEXT_CHARS]
     # print(f"DEBUG [GitHub Service]: Combined text blob length: {len(text_blob)}")
 
     # --- Keyword generation removed ---
@@ -208,3 +383,136 @@ async def get_profile_text_data(token: str, max_repos_for_readme: int = MAX_REPO
     }
     return final_result
 
+
+
+
+# --- GraphQL Profile Fetcher ---
+# Fetches the viewer profile, repos, languages, topics and README text in one round trip
+# (plus one request per further page of 100 repos for prolific users). GraphQL has no
+# counterpart of REST's /readme lookup, so the README is read from the common file names in
+# order; READMEs only found elsewhere (e.g. docs/README.md, .github/README.md) are missed.
+GRAPHQL_REPOS_PER_PAGE = 100
+README_NAMES = ("README.md", "readme.md", "Readme.md", "README.rst", "README.txt", "README")
+PROFILE_GRAPHQL_QUERY = """
+query ProfileData($repoCount: Int!, $readmeCount: Int!, $cursor: String, $firstPage: Boolean!) {
+  viewer {
+    ... @include(if: $firstPage) {
+      login name bio company location email avatarUrl url
+      recent: repositories(first: $readmeCount, orderBy: {field: PUSHED_AT, direction: DESC},
+                           ownerAffiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER]) {
+        nodes {
+%s
+        }
+      }
+    }
+    repositories(first: $repoCount, after: $cursor, orderBy: {field: PUSHED_AT, direction: DESC},
+                 ownerAffiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER]) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        description
+        primaryLanguage { name }
+        repositoryTopics(first: 20) { nodes { topic { name } } }
+      }
+    }
+  }
+}
+""" % "\n".join(f'          readme{i}: object(expression: "HEAD:{name}") {{ ... on Blob {{ text }} }}'
+                for i, name in enumerate(README_NAMES))
+
+
+async def _run_graphql_query(client: httpx.AsyncClient, token: str, variables: Dict[str, Any],
+                             graphql_url: str) -> Dict[str, Any]:
+    """ Runs the profile GraphQL query and returns its `data`, mapping failures to HTTPExceptions. """
+    headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+    try:
+        response = await client.post(graphql_url, json={"query": PROFILE_GRAPHQL_QUERY, "variables": variables}, headers=headers, timeout=20.0)
+        response.raise_for_status(); payload = response.json()
+    except httpx.HTTPStatusError as exc:
+        detail = f"GitHub GraphQL API error fetching profile data: {exc.response.status_code}"; status_code = exc.response.status_code
+        if status_code == 401: detail = "GitHub token invalid or expired."
+        elif status_code == 403: detail = "GitHub API rate limit likely exceeded or token lacks permissions for profile data."
+        print(f"ERROR [GitHub Service]: {detail}"); raise HTTPException(status_code=status_code, detail=detail) from exc
+    except httpx.RequestError as exc: print(f"ERROR [GitHub Service]: Could not connect to GitHub GraphQL API: {exc}"); raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Could not connect to GitHub API: {exc}") from exc
+
+    if payload.get("errors"):
+        print(f"WARN [GitHub Service]: GitHub GraphQL API returned errors: {payload['errors']}")
+    data = payload.get("data")
+    if not data or not data.get("viewer"):
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="GitHub GraphQL API returned no profile data.")
+    return data
+
+
+async def get_profile_bundle_graphql(token: str, max_repos_for_readme: int = MAX_REPOS_FOR_README,
+                                     max_repos: Optional[int] = MAX_REPOS_FOR_PROFILE,
+                                     graphql_url: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, List[str] | str]]:
+    """
+    GraphQL counterpart of get_profile_bundle: returns (user profile, profile text data) with the same shapes.
+    `graphql_url` defaults to settings.GITHUB_GRAPHQL_URL (which can point at a local fake GraphQL endpoint).
+    """
+    graphql_url = graphql_url or settings.GITHUB_GRAPHQL_URL
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="GitHub token not found")
+
+    languages: Set[str] = set()
+    topics: Set[str] = set()
+    descriptions: List[str] = []
+    readme_contents: List[str] = []
+    profile: Dict[str, Any] = {}
+    cursor: Optional[str] = None
+    fetched = 0
+
+    client = get_http_client()
+    while True:
+        repo_count = GRAPHQL_REPOS_PER_PAGE if max_repos is None else max(0, min(GRAPHQL_REPOS_PER_PAGE, max_repos - fetched))
+        variables = {"repoCount": repo_count, "readmeCount": max_repos_for_readme, "cursor": cursor, "firstPage": cursor is None}
+        print(f"DEBUG [GitHub Service]: Fetching profile data via GraphQL (cursor={cursor})")
+        viewer = (await _run_graphql_query(client, token, variables, graphql_url))["viewer"]
+
+        if cursor is None:
+            profile = {
+                "login": viewer.get("login"), "name": viewer.get("name"), "bio": viewer.get("bio"),
+                "company": viewer.get("company"), "location": viewer.get("location"), "email": viewer.get("email"),
+                "avatar_url": viewer.get("avatarUrl"), "html_url": viewer.get("url"),
+            }
+            for node in ((viewer.get("recent") or {}).get("nodes") or []):
+                # First README name that exists, like REST's /readme lookup
+                texts = [((node or {}).get(f"readme{i}") or {}).get("text") for i in range(len(README_NAMES))]
+                text = next((text for text in texts if text), None)
+                if text: readme_contents.append(_clean_readme_text(text))
+
+        repositories = viewer.get("repositories") or {}
+        for repo in repositories.get("nodes") or []:
+            if not repo: continue
+            lang = (repo.get("primaryLanguage") or {}).get("name")
+            if lang: languages.add(lang.lower())
+            for topic_node in ((repo.get("repositoryTopics") or {}).get("nodes") or []):
+                topic_name = ((topic_node or {}).get("topic") or {}).get("name")
+                if topic_name: topics.add(topic_name.lower())
+            if repo.get("description"): descriptions.append(repo["description"])
+            fetched += 1
+
+        page_info = repositories.get("pageInfo") or {}
+        if not page_info.get("hasNextPage") or (max_repos is not None and fetched >= max_repos):
+            break
+        if not page_info.get("endCursor"):
+            # A null cursor would refetch the first page forever
+            print("WARN [GitHub Service]: GitHub GraphQL API reported another page without an endCursor, stopping")
+            break
+        cursor = page_info["endCursor"]
+
+    print(f"DEBUG [GitHub Service]: GraphQL fetched {fetched} repos and {len(readme_contents)} non-empty READMEs.")
+    return profile, _assemble_profile_text_data(languages, topics, descriptions, readme_contents)
+
+
+async def get_profile_bundle(token: str, max_repos_for_readme: int = MAX_REPOS_FOR_README,
+                             fetcher: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, List[str] | str]]:
+    """
+    Fetches the user profile and the profile text data together.
+    `fetcher` ("rest" or "graphql") defaults to settings.GITHUB_PROFILE_FETCHER.
+    """
+    fetcher = fetcher or settings.GITHUB_PROFILE_FETCHER
+    if fetcher == "graphql":
+        return await get_profile_bundle_graphql(token, max_repos_for_readme)
+    profile, profile_data = await asyncio.gather(get_user_profile(token),
+                                                 _get_profile_text_data_rest(token, max_repos_for_readme, MAX_REPOS_FOR_PROFILE))
+    return profile, profile_data
@@ -0,0 +1,30 @@
+from typing import Optional
+
+import httpx
+
+# --- Shared HTTP Client ---
+# One pooled AsyncClient per worker for outbound GitHub calls. Work shared between requests
+# (single-flight tasks, background refreshes) must not depend on a client owned by one request.
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """ Returns the worker's pooled AsyncClient, creating it on first use. """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS),
+            timeout=httpx.Timeout(20.0),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """ Closes the pooled client (called on application shutdown). """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,281 @@
+import glob
+import gzip
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import multiprocessing
+import numpy as np
+
+from ..core.config import settings
+from .index_snapshot import write_snapshot
+from .issue_delta import issue_delta_store
+from .issue_embedding import EMBED_TEXT_MAX_CHARS, issue_embed_text
+from .issue_record import slim_issue_item
+from .near_duplicates import near_duplicate_representatives
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Offline Index Build ---
+# `python -m app.services.faiss_search build DUMP...` bootstraps the issue corpus from JSONL dumps
+# of raw GitHub issues (plain or .gz). Dumps are streamed in batches: open issues are reduced to
+# the text the live path embeds (see issue_embedding.py), de-duplicated (by id, and near-duplicates
+# within the batch) and encoded by a pool of processes, one model per process. Each finished batch is
+# saved as a part file in the work directory, so an interrupted build resumes after its last
+# saved part. Once every dump is consumed, the parts are assembled and published as a new index
+# snapshot.
+#
+# Work directory layout:
+#   <work_dir>/build.json          build parameters; a resume must match them
+#   <work_dir>/part-<n>.npz        ids, embeddings and slim issues (JSONL) of batch n, plus every id
+#                                  the batch consumed (near-duplicates included)
+BUILD_FILE = "build.json"
+PART_PATTERN = "part-{:06d}.npz"
+DEFAULT_WORK_DIR = "data/index_build"
+DEFAULT_BATCH_SIZE = 4096  # Issues per part (and per resume step)
+ENCODE_BATCH_SIZE = 256  # Texts per model.encode call inside a worker
+
+
+def iter_dump_items(paths: Sequence[str]) -> Iterator[Dict[str, Any]]:
+    """ Streams issue items from JSONL dumps (gzip-compressed if the name ends in .gz), skipping malformed lines. """
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping malformed line {line_number} of {path}")
+
+
+def is_indexable(item: Dict[str, Any]) -> bool:
+    """ Open issues (not pull requests) that nobody is assigned to. """
+    return (isinstance(item, dict) and item.get("id") is not None and item.get("state", "open") == "open"
+            and not item.get("pull_request") and not item.get("assignee") and not item.get("assignees"))
+
+
+# Per-process model of the encoding pool
+_worker_model = None
+
+
+def _init_worker(model_name: str, threads: int) -> None:
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _encode_texts(texts: List[str]) -> np.ndarray:
+    return _worker_model.encode(texts, batch_size=ENCODE_BATCH_SIZE, convert_to_numpy=True).astype(np.float32)
+
+
+def _save_part(work_dir: str, n: int, ids: np.ndarray, embeddings: np.ndarray, issues: List[Dict[str, Any]],
+               consumed_ids: List[int]) -> None:
+    path = os.path.join(work_dir, PART_PATTERN.format(n))
+    tmp_path = f"{path}.tmp.npz"
+    issues_jsonl = "".join(json.dumps(issue, separators=(",", ":")) + "\n" for issue in issues).encode("utf-8")
+    np.savez(tmp_path, ids=ids, embeddings=embeddings, issues=np.frombuffer(issues_jsonl, dtype=np.uint8),
+             consumed_ids=np.asarray(consumed_ids, dtype=np.int64))
+    os.replace(tmp_path, path)  # A part is either complete or absent
+
+
+def _load_part(path: str) -> Tuple[np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+    with np.load(path) as part:
+        issues = [json.loads(line) for line in part["issues"].tobytes().decode("utf-8").splitlines()]
+        return part["ids"], part["embeddings"], issues
+
+
+def _completed_parts(work_dir: str) -> List[str]:
+    """ Returns the contiguous run of saved parts from part 0. """
+    parts = []
+    while os.path.exists(os.path.join(work_dir, PART_PATTERN.format(len(parts)))):
+        parts.append(os.path.join(work_dir, PART_PATTERN.format(len(parts))))
+    return parts
+
+
+class _PartIssues:
+    """ The slim issues of all parts plus `extra` ones, streamed in row order (so write_snapshot never holds them all). """
+
+    def __init__(self, paths: List[str], extra: List[Dict[str, Any]], count: int):
+        self.paths = paths
+        self.extra = extra
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for path in self.paths:
+            yield from _load_part(path)[2]
+        yield from self.extra
+
+
+def _prepare_batch(items: List[Dict[str, Any]], seen_ids: Set[int]) -> Tuple[List[Dict[str, Any]], List[str], List[int]]:
+    """ Drops already-seen ids and near-duplicates, returning the slim issues, their texts to embed and the ids consumed. """
+    fresh = []
+    for item in items:
+        if item["id"] not in seen_ids:
+            seen_ids.add(item["id"])
+            fresh.append(item)
+    texts = [issue_embed_text(item) for item in fresh]
+    keep = near_duplicate_representatives(texts)
+    return [slim_issue_item(fresh[i]) for i in keep], [texts[i] for i in keep], [item["id"] for item in fresh]
+
+
+def build_index(paths: Sequence[str], model_name: str, work_dir: str = DEFAULT_WORK_DIR,
+                batch_size: int = DEFAULT_BATCH_SIZE, workers: Optional[int] = None,
+                mode: Optional[str] = None, fold_delta: bool = False, keep_work_dir: bool = False) -> Optional[str]:
+    """
+    Builds and publishes an issue index snapshot from JSONL dumps (see module comment).
+
+    Args:
+        paths: Dump files or glob patterns, read in sorted order
+        model_name: Sentence transformer model to encode with
+        work_dir: Directory for parts and resume state
+        batch_size: Indexable issues per part
+        workers: Encoding processes (default: CPU count)
+        mode: Embedding storage mode (default: settings.EMBEDDING_STORAGE_MODE)
+        fold_delta: Also index the webhook delta's upserts, drop its tombstoned issues, and prune it once published
+        keep_work_dir: Keep the parts after publishing
+
+    Returns:
+        The published snapshot version, or None if no issue was indexed
+    """
+    files = sorted({path for pattern in paths for path in (glob.glob(pattern) or [pattern])})
+    workers = workers or os.cpu_count() or 1
+    mode = mode or settings.EMBEDDING_STORAGE_MODE
+    params = {"inputs": files, "model": model_name, "batch_size": batch_size,
+              "embed_text_max_chars": EMBED_TEXT_MAX_CHARS}
+
+    os.makedirs(work_dir, exist_ok=True)
+    build_path = os.path.join(work_dir, BUILD_FILE)
+    parts = _completed_parts(work_dir)
+    if parts:
+        with open(build_path) as f:
+            previous = json.load(f)
+        if previous != params:
+            raise ValueError(f"{work_dir} holds a build with other parameters; remove it to start over")
+        logger.info(f"Resuming build after {len(parts)} saved parts")
+    else:
+        with open(build_path, "w") as f:
+            json.dump(params, f)
+
+    # Webhook updates newer than the dumps replace the dumped copies
+    delta_rows = issue_delta_store.load_since(0) if fold_delta else []
+    delta_ids = {issue_id for issue_id, _, _, _ in delta_rows}
+
+    seen_ids: Set[int] = set(delta_ids)
+    for path in parts:
+        with np.load(path) as part:
+            seen_ids.update(part["consumed_ids"].tolist())
+
+    started = time.perf_counter()
+    items_read = issues_indexed = 0
+    skip = len(parts) * batch_size  # Indexable items already consumed by the saved parts
+    stream = (item for item in iter_dump_items(files) if is_indexable(item))
+
+    def batches() -> Iterator[List[Dict[str, Any]]]:
+        nonlocal items_read, skip
+        batch: List[Dict[str, Any]] = []
+        for item in stream:
+            if skip:
+                skip -= 1
+                continue
+            items_read += 1
+            batch.append(item)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    # Encoding runs in spawned processes (fork and torch's thread pools don't mix); the parent
+    # prepares the next batches while up to `workers` batches are being encoded.
+    context = multiprocessing.get_context("spawn")
+    threads = max((os.cpu_count() or 1) // workers, 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(model_name, threads)) as executor:
+        in_flight: List[Tuple[int, List[Dict[str, Any]], List[int], Future]] = []
+        n = len(parts)
+
+        def finish_oldest() -> None:
+            nonlocal issues_indexed
+            part_number, issues, consumed_ids, future = in_flight.pop(0)
+            _save_part(work_dir, part_number, np.array([issue["id"] for issue in issues], dtype=np.int64), future.result(), issues, consumed_ids)
+            issues_indexed += len(issues)
+            elapsed = max(time.perf_counter() - started, 1e-9)
+            logger.info(f"Part {part_number}: {items_read} issues read, {issues_indexed} indexed "
+                        f"({issues_indexed / elapsed:.1f} issues/s)")
+
+        for batch in batches():
+            issues, texts, consumed_ids = _prepare_batch(batch, seen_ids)
+            if not issues:
+                # Keep part numbering aligned with the dump batches so resuming skips the right items
+                _save_part(work_dir, n, np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32), [], consumed_ids)
+                n += 1
+                continue
+            in_flight.append((n, issues, consumed_ids, executor.submit(_encode_texts, texts)))
+            n += 1
+            if len(in_flight) >= workers:
+                finish_oldest()
+        while in_flight:
+            finish_oldest()
+
+    return _publish(work_dir, mode, delta_rows, keep_work_dir)
+
+
+def _publish(work_dir: str, mode: str, delta_rows: List[Tuple[int, Optional[Dict[str, Any]], Optional[np.ndarray], int]],
+             keep_work_dir: bool) -> Optional[str]:
+    """ Assembles the saved parts (plus folded delta upserts) and publishes them as a snapshot. """
+    parts = _completed_parts(work_dir)
+    sizes = []
+    dim = None
+    for path in parts:
+        with np.load(path) as part:
+            sizes.append(len(part["ids"]))
+            if len(part["ids"]):
+                dim = part["embeddings"].shape[1]
+    upserts = [(issue_id, issue, vector) for issue_id, issue, vector, _ in delta_rows if issue is not None]
+    total = sum(sizes) + len(upserts)
+    if total == 0:
+        logger.warning("No issues to index, nothing published")
+        return None
+    dim = dim if dim is not None else len(upserts[0][2])
+
+    # Rows are assembled in a memory-mapped file, so the corpus never has to fit in memory twice
+    embeddings = np.lib.format.open_memmap(os.path.join(work_dir, "embeddings.npy"), mode="w+", dtype=np.float32, shape=(total, dim))
+    ids = np.empty(total, dtype=np.int64)
+    row = 0
+    for path, size in zip(parts, sizes):
+        if size:
+            part_ids, part_embeddings, _ = _load_part(path)
+            ids[row:row + size] = part_ids
+            embeddings[row:row + size] = part_embeddings
+            row += size
+    for issue_id, _, vector in upserts:
+        ids[row], embeddings[row] = issue_id, vector
+        row += 1
+
+    started = time.perf_counter()
+    issues = _PartIssues(parts, [issue for _, issue, _ in upserts], total)
+    # Workers drop the folded delta rows from their mirror once they load this snapshot
+    delta_seq = max((seq for _, _, _, seq in delta_rows), default=0)
+    version = write_snapshot(settings.SNAPSHOT_DIR, ids, embeddings, issues, mode=mode,
+                             keep=settings.SNAPSHOTS_TO_KEEP, delta_seq=delta_seq)
+    logger.info(f"Wrote {mode} index of {total} issues in {time.perf_counter() - started:.1f}s")
+    if delta_rows:
+        pruned = issue_delta_store.prune(delta_seq)
+        logger.info(f"Folded {pruned} webhook delta rows into the snapshot")
+    del embeddings
+    if not keep_work_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return version
@@ -0,0 +1,257 @@
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+from .embedding_store import CompactEmbeddingStore, DEFAULT_RERANK_FACTOR, STORAGE_FLOAT16
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Snapshot layout:
+#   <root>/CURRENT                 name of the live snapshot directory
+#   <root>/v<ns>/                  embedding store files (see embedding_store.py)
+#   <root>/v<ns>/issues.jsonl      one issue metadata record per line, aligned with the store rows
+#   <root>/v<ns>/issues.offsets.npy  byte offset of every line (plus the end offset)
+#   <root>/v<ns>/delta_seq         last issue delta sequence number folded into it (optional)
+CURRENT_FILE = "CURRENT"
+ISSUES_FILE = "issues.jsonl"
+ISSUE_OFFSETS_FILE = "issues.offsets.npy"
+DELTA_SEQ_FILE = "delta_seq"
+VERSION_PREFIX = "v"
+TMP_PREFIX = ".tmp-"
+
+
+class IndexSnapshot:
+    """
+    An immutable, memory-mapped issue index plus its id and metadata side tables.
+
+    Searches hold a reference to the snapshot they started on, so swapping in a newer
+    snapshot never disturbs requests that are already in flight.
+    """
+
+    def __init__(self, version: str, directory: str, store: CompactEmbeddingStore,
+                 issue_offsets: np.ndarray, issues_map: mmap.mmap, delta_seq: int = 0):
+        self.version = version
+        self.directory = directory
+        self.store = store
+        self._issue_offsets = issue_offsets
+        self._issues_map = issues_map
+        self.delta_seq = delta_seq
+        self._id_order = np.argsort(store.ids)
+        self._sorted_ids = np.asarray(store.ids)[self._id_order]
+
+    @property
+    def ntotal(self) -> int:
+        return self.store.ntotal
+
+    @classmethod
+    def load(cls, root: str, version: str) -> "IndexSnapshot":
+        """
+        Load a snapshot, memory-mapping the index and side tables read-only.
+
+        Args:
+            root: Snapshot root directory
+            version: Snapshot directory name
+
+        Returns:
+            The loaded snapshot
+        """
+        directory = os.path.join(root, version)
+        store = CompactEmbeddingStore.open(directory)
+        issue_offsets = np.load(os.path.join(directory, ISSUE_OFFSETS_FILE), mmap_mode="r")
+        with open(os.path.join(directory, ISSUES_FILE), "rb") as f:
+            issues_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        delta_seq = 0
+        if os.path.exists(os.path.join(directory, DELTA_SEQ_FILE)):
+            with open(os.path.join(directory, DELTA_SEQ_FILE)) as f:
+                delta_seq = int(f.read().strip() or 0)
+        logger.info(f"Loaded index snapshot {version} with {store.ntotal} issues")
+        return cls(version, directory, store, issue_offsets, issues_map, delta_seq)
+
+    def position_of(self, issue_id: int) -> int:
+        """ Returns the row of an issue id in this snapshot, or -1 if it is not indexed. """
+        i = int(np.searchsorted(self._sorted_ids, issue_id))
+        if i < len(self._sorted_ids) and self._sorted_ids[i] == issue_id:
+            return int(self._id_order[i])
+        return -1
+
+    def get_issue_at(self, position: int) -> Dict[str, Any]:
+        """ Decodes the metadata record stored for a row. """
+        start, end = int(self._issue_offsets[position]), int(self._issue_offsets[position + 1])
+        return json.loads(self._issues_map[start:end])
+
+    def get_issues(self, issue_ids: Sequence[int]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Look up issue metadata records by issue id.
+
+        Args:
+            issue_ids: Issue ids, e.g. as returned by `search`
+
+        Returns:
+            Metadata records in the same order, None for ids that are not in the snapshot
+        """
+        issues = []
+        for issue_id in issue_ids:
+            position = self.position_of(int(issue_id)) if issue_id >= 0 else -1
+            issues.append(self.get_issue_at(position) if position >= 0 else None)
+        return issues
+
+    def find_positions(self, needle: bytes) -> List[int]:
+        """ Returns the rows whose serialized metadata record contains `needle` (a raw byte scan of the mapping). """
+        positions: List[int] = []
+        start = self._issues_map.find(needle)
+        while start >= 0:
+            position = int(np.searchsorted(self._issue_offsets, start, side="right")) - 1
+            positions.append(position)
+            start = self._issues_map.find(needle, int(self._issue_offsets[position + 1]))
+        return positions
+
+    def search(self, query_vectors: np.ndarray, top_k: int,
+               rerank_factor: int = DEFAULT_RERANK_FACTOR) -> Tuple[np.ndarray, np.ndarray]:
+        """ Searches the snapshot's embedding store, returning (distances, issue ids). """
+        return self.store.search(query_vectors, top_k, rerank_factor=rerank_factor)
+
+
+def write_current(root: str, version: str) -> None:
+    """ Atomically points CURRENT at a snapshot version. """
+    tmp_path = os.path.join(root, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def read_current_version(root: str) -> Optional[str]:
+    """ Returns the version CURRENT points at, or None if no snapshot was published yet. """
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def prune_snapshots(root: str, keep: int) -> None:
+    """
+    Delete all but the newest `keep` snapshots, never touching the live one.
+
+    Workers that still map files of a deleted snapshot keep their mappings valid until they swap.
+    """
+    current = read_current_version(root)
+    versions = sorted((name for name in os.listdir(root) if name.startswith(VERSION_PREFIX)), reverse=True)
+    for version in versions[max(keep, 1):]:
+        if version != current:
+            logger.info(f"Pruning old index snapshot {version}")
+            shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+def write_snapshot(root: str, ids: Sequence[int], embeddings: np.ndarray, issues: Sequence[Dict[str, Any]],
+                   mode: str = STORAGE_FLOAT16, keep: int = 3, delta_seq: int = 0) -> str:
+    """
+    Write a new versioned snapshot and atomically publish it as CURRENT.
+
+    The snapshot is built in a temporary directory and renamed into place before CURRENT
+    is switched, so readers only ever see complete snapshots.
+
+    Args:
+        root: Snapshot root directory
+        ids: Issue ids aligned with the embedding rows
+        embeddings: Array of embeddings of shape (n, dim)
+        issues: Issue metadata records aligned with the embedding rows
+        mode: Embedding storage mode (see embedding_store.STORAGE_MODES)
+        keep: Number of snapshots to retain on disk
+        delta_seq: Last issue delta sequence number folded into the snapshot (0 for none)
+
+    Returns:
+        The published snapshot version
+    """
+    if len(ids) == 0:
+        raise ValueError("Refusing to publish an empty index snapshot")
+    if not (len(ids) == len(embeddings) == len(issues)):
+        raise ValueError(f"Snapshot tables are misaligned: {len(ids)} ids, {len(embeddings)} embeddings, {len(issues)} issues")
+
+    os.makedirs(root, exist_ok=True)
+    version = f"{VERSION_PREFIX}{time.time_ns()}"
+    tmp_directory = os.path.join(root, f"{TMP_PREFIX}{version}")
+
+    CompactEmbeddingStore.write(tmp_directory, np.asarray(ids, dtype=np.int64), embeddings, mode=mode)
+
+    offsets = np.zeros(len(issues) + 1, dtype=np.int64)
+    with open(os.path.join(tmp_directory, ISSUES_FILE), "wb") as f:
+        for i, issue in enumerate(issues):
+            line = json.dumps(issue, separators=(",", ":")).encode("utf-8") + b"\n"
+            f.write(line)
+            offsets[i + 1] = offsets[i] + len(line)
+    np.save(os.path.join(tmp_directory, ISSUE_OFFSETS_FILE), offsets)
+    if delta_seq:
+        with open(os.path.join(tmp_directory, DELTA_SEQ_FILE), "w") as f:
+            f.write(str(delta_seq))
+
+    os.rename(tmp_directory, os.path.join(root, version))
+    write_current(root, version)
+    logger.info(f"Published index snapshot {version} with {len(ids)} issues")
+
+    prune_snapshots(root, keep)
+    return version
+
+
+class SnapshotManager:
+    """
+    Serves the live index snapshot of one worker process and hot-swaps newer ones.
+
+    `current()` re-reads CURRENT at most every `check_interval` seconds. A newer version is
+    loaded by a single thread while other callers keep using the previous snapshot; the swap
+    itself is a single reference assignment. `loader` makes the manager reusable for other
+    versioned directories with the same CURRENT layout.
+    """
+
+    def __init__(self, root: str, check_interval: float = 5.0,
+                 loader: Callable[[str, str], Any] = IndexSnapshot.load):
+        self.root = root
+        self.check_interval = check_interval
+        self.loader = loader
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._last_check = 0.0
+        self._load_lock = threading.Lock()
+
+    def current(self) -> Optional[IndexSnapshot]:
+        """ Returns the live snapshot, swapping in a newer one if it was published. """
+        if time.monotonic() - self._last_check >= self.check_interval:
+            self.refresh(block=False)
+        return self._snapshot
+
+    def refresh(self, block: bool = True) -> Optional[IndexSnapshot]:
+        """
+        Check CURRENT and load the snapshot it points at if it is not the live one.
+
+        Args:
+            block: Wait for a concurrent refresh instead of returning the live snapshot
+
+        Returns:
+            The live snapshot after the check
+        """
+        if not self._load_lock.acquire(blocking=block):
+            return self._snapshot
+        try:
+            self._last_check = time.monotonic()
+            version = read_current_version(self.root)
+            if version and (self._snapshot is None or self._snapshot.version != version):
+                try:
+                    self._snapshot = self.loader(self.root, version)
+                except Exception as e:
+                    logger.error(f"Error loading snapshot {version} from {self.root}, keeping the previous one: {str(e)}")
+            return self._snapshot
+        finally:
+            self._load_lock.release()
+
+
+snapshot_manager = SnapshotManager(settings.SNAPSHOT_DIR, settings.SNAPSHOT_CHECK_INTERVAL)
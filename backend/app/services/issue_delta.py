@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+from .index_snapshot import IndexSnapshot
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Issue Index Delta ---
+# Index snapshots are immutable, so webhook updates between builds go to a delta: a SQLite table
+# (WAL, shared by the API workers) of upserted issues with their embeddings, and tombstones for
+# issues that were closed, deleted or assigned. Every row also hides the snapshot's copy of the
+# issue. Each worker mirrors the table in memory, pulling rows newer than the last one it saw at
+# most every ISSUE_DELTA_CHECK_INTERVAL seconds; the delta is small, so it is searched brute force
+# and merged with the snapshot's results. Sequence numbers come from a counter that never goes
+# back, so rows written after a build folds and prunes the delta are still newer than any a worker
+# has seen; workers drop folded rows from their mirror once the snapshot that folded them is live.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issue_delta (
+    issue_id INTEGER PRIMARY KEY,
+    issue    TEXT,
+    vector   BLOB,
+    seq      INTEGER NOT NULL
+)
+"""
+META_SCHEMA = """
+CREATE TABLE IF NOT EXISTS issue_delta_meta (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+)
+"""
+
+
+class IssueDeltaStore:
+    """ Persisted delta rows: (issue_id, issue or None for a tombstone, vector, seq). """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS issue_delta_seq ON issue_delta (seq)")
+            conn.execute(META_SCHEMA)
+            conn.execute("INSERT OR IGNORE INTO issue_delta_meta (name, value) SELECT 'seq', COALESCE(MAX(seq), 0) FROM issue_delta")
+            self._conn = conn
+        return self._conn
+
+    def apply(self, upserts: Sequence[Tuple[int, Dict[str, Any], np.ndarray]], deletes: Sequence[int]) -> None:
+        """
+        Writes a batch of upserts and tombstones in one transaction, under one new sequence number.
+
+        Args:
+            upserts: (issue id, slim issue item, embedding) triples
+            deletes: Issue ids to tombstone
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("UPDATE issue_delta_meta SET value = value + 1 WHERE name = 'seq'")
+                seq = conn.execute("SELECT value FROM issue_delta_meta WHERE name = 'seq'").fetchone()[0]
+                conn.executemany(
+                    "INSERT OR REPLACE INTO issue_delta (issue_id, issue, vector, seq) VALUES (?, ?, ?, ?)",
+                    [(issue_id, json.dumps(issue, separators=(",", ":")),
+                      np.ascontiguousarray(vector, dtype=np.float32).tobytes(), seq) for issue_id, issue, vector in upserts]
+                    + [(issue_id, None, None, seq) for issue_id in deletes],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def load_since(self, seq: int) -> List[Tuple[int, Optional[Dict[str, Any]], Optional[np.ndarray], int]]:
+        """ Returns the rows written after sequence number `seq`, oldest first. """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT issue_id, issue, vector, seq FROM issue_delta WHERE seq > ? ORDER BY seq", (seq,)
+            ).fetchall()
+        return [
+            (issue_id, json.loads(issue) if issue is not None else None,
+             np.frombuffer(vector, dtype=np.float32) if vector is not None else None, row_seq)
+            for issue_id, issue, vector, row_seq in rows
+        ]
+
+    def prune(self, through_seq: int) -> int:
+        """ Deletes the rows up to `through_seq` (e.g. once a snapshot includes them); returns the number deleted. """
+        with self._lock:
+            return self._connection().execute("DELETE FROM issue_delta WHERE seq <= ?", (through_seq,)).rowcount
+
+
+class DeltaIndex:
+    """ One worker's in-memory mirror of the issue delta (see module comment). """
+
+    def __init__(self, store: IssueDeltaStore, check_interval: float = 5.0):
+        self.store = store
+        self.check_interval = check_interval
+        self.seq = 0
+        self.folded_seq = 0  # Rows up to here are in the live snapshot and were dropped
+        self._rows: Dict[int, Optional[Tuple[Dict[str, Any], np.ndarray]]] = {}
+        self._row_seqs: Dict[int, int] = {}
+        self._hidden_ids = np.zeros(0, dtype=np.int64)  # Sorted: every id with a delta row
+        self._live = (np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32))  # Upserted (ids, vectors)
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._live[0])
+
+    def __contains__(self, issue_id: int) -> bool:
+        """ Whether the issue has a delta row (an upsert or a tombstone). """
+        return issue_id in self._rows
+
+    @property
+    def hidden_count(self) -> int:
+        return len(self._hidden_ids)
+
+    def refresh(self, force: bool = False, snapshot: Optional[IndexSnapshot] = None) -> None:
+        """
+        Pulls rows written since the last refresh (at most every check_interval seconds unless forced),
+        and drops the rows already folded into `snapshot`, if given.
+        """
+        folded_seq = snapshot.delta_seq if snapshot is not None else 0
+        if not force and folded_seq <= self.folded_seq and time.monotonic() - self._last_check < self.check_interval:
+            return
+        if not self._lock.acquire(blocking=force):
+            return
+        try:
+            self._last_check = time.monotonic()
+            rows = self.store.load_since(self.seq)
+            dropped = [issue_id for issue_id, seq in self._row_seqs.items() if seq <= folded_seq] if folded_seq > self.folded_seq else []
+            self.folded_seq = max(self.folded_seq, folded_seq)
+            if not rows and not dropped:
+                return
+            for issue_id in dropped:
+                del self._rows[issue_id], self._row_seqs[issue_id]
+            upserted: Dict[int, np.ndarray] = {}
+            for issue_id, issue, vector, seq in rows:
+                self._rows[issue_id] = (issue, vector) if issue is not None else None
+                self._row_seqs[issue_id] = seq
+                self.seq = max(self.seq, seq)
+                upserted.pop(issue_id, None)
+                if issue is not None:
+                    upserted[issue_id] = vector
+            self._update_arrays(dropped + [issue_id for issue_id, _, _, _ in rows], upserted)
+            logger.info(f"Issue delta at seq {self.seq}: {len(self)} upserts, {len(self._rows) - len(self)} tombstones"
+                        + (f", {len(dropped)} folded rows dropped" if dropped else ""))
+        finally:
+            self._lock.release()
+
+    def _update_arrays(self, changed_ids: List[int], upserted: Dict[int, np.ndarray]) -> None:
+        """ Replaces the rows of the changed ids in the live arrays instead of re-stacking every vector. """
+        ids, vectors = self._live
+        keep = ~np.isin(ids, np.array(changed_ids, dtype=np.int64))
+        new_ids = np.array(list(upserted), dtype=np.int64)
+        if not upserted:
+            ids, vectors = ids[keep], vectors[keep]
+        elif not keep.any():
+            ids, vectors = new_ids, np.stack(list(upserted.values()))
+        else:
+            ids, vectors = np.concatenate([ids[keep], new_ids]), np.concatenate([vectors[keep], np.stack(list(upserted.values()))])
+        # Arrays are rebuilt and swapped by reference, so concurrent searches see a consistent set
+        self._live = (ids, vectors)
+        self._hidden_ids = np.array(sorted(self._rows), dtype=np.int64)
+
+    def upserted_ids(self) -> List[int]:
+        return self._live[0].tolist()
+
+    def hidden(self, issue_ids: np.ndarray) -> np.ndarray:
+        """ Boolean mask of the ids whose snapshot copy is superseded (upserted or tombstoned). """
+        return np.isin(issue_ids, self._hidden_ids)
+
+    def get(self, issue_id: int) -> Optional[Tuple[Dict[str, Any], np.ndarray]]:
+        """ Returns (issue, vector) of an upserted issue, or None if it is tombstoned or not in the delta. """
+        return self._rows.get(issue_id)
+
+    def search(self, query_vectors: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Brute-force search of the upserted issues, returning (squared L2 distances, issue ids) like the snapshot. """
+        ids, vectors = self._live
+        nq = len(query_vectors)
+        if len(ids) == 0 or vectors.shape[1] != query_vectors.shape[1]:
+            return np.zeros((nq, 0), dtype=np.float32), np.zeros((nq, 0), dtype=np.int64)
+        distances = (query_vectors ** 2).sum(axis=1)[:, None] + (vectors ** 2).sum(axis=1)[None, :] - 2 * query_vectors @ vectors.T
+        top_k = min(top_k, len(ids))
+        order = np.argsort(distances, axis=1, kind="stable")[:, :top_k]
+        return np.take_along_axis(distances, order, axis=1), ids[order]
+
+
+issue_delta_store = IssueDeltaStore(settings.ISSUE_DELTA_DB_PATH)
+delta_index = DeltaIndex(issue_delta_store, settings.ISSUE_DELTA_CHECK_INTERVAL)
+
+
+def search_live(snapshot: Optional[IndexSnapshot], query_vector: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Searches the snapshot and the delta together: snapshot hits superseded by the delta are
+    dropped, and the rest are merged with the delta's hits by distance.
+
+    Args:
+        snapshot: Live index snapshot (None to search the delta alone)
+        query_vector: float32 query embedding of shape (dim,)
+        top_k: Number of results
+
+    Returns:
+        Tuple of (squared L2 distances, issue ids), each of shape (<= top_k,), best first
+    """
+    delta_index.refresh(snapshot=snapshot)
+    query_vectors = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+    distances, issue_ids = delta_index.search(query_vectors, top_k)
+    distances, issue_ids = distances[0], issue_ids[0]
+    if snapshot is not None:
+        # Over-fetch by the number of superseded ids, up to double, so filtering rarely leaves a short page
+        extra = min(delta_index.hidden_count, top_k)
+        snapshot_distances, snapshot_ids = snapshot.search(query_vectors, top_k + extra)
+        keep = (snapshot_ids[0] >= 0) & ~delta_index.hidden(snapshot_ids[0])
+        distances = np.concatenate([distances, snapshot_distances[0][keep]])
+        issue_ids = np.concatenate([issue_ids, snapshot_ids[0][keep]])
+    order = np.argsort(distances, kind="stable")[:top_k]
+    return distances[order], issue_ids[order]
+
+
+def get_live_issues(snapshot: Optional[IndexSnapshot], issue_ids: Sequence[int]) -> List[Optional[Dict[str, Any]]]:
+    """ Looks up issue items by id, preferring the delta; None for ids that are tombstoned or not indexed. """
+    issues: List[Optional[Dict[str, Any]]] = []
+    missing = []
+    for i, issue_id in enumerate(issue_ids):
+        issue_id = int(issue_id)
+        if issue_id in delta_index:
+            row = delta_index.get(issue_id)
+            issues.append(row[0] if row is not None else None)
+        else:
+            issues.append(None)
+            missing.append(i)
+    if snapshot is not None and missing:
+        for i, issue in zip(missing, snapshot.get_issues([int(issue_ids[i]) for i in missing])):
+            issues[i] = issue
+    return issues
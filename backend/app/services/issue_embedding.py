@@ -0,0 +1,17 @@
+import re
+from typing import Any, Dict
+
+# --- Issue Embedding Definition ---
+# The text an issue is embedded from, shared by every path that embeds issues (the offline index
+# build, the webhook worker and the live per-request index) so their vectors are comparable: the
+# title and the whitespace-collapsed body, truncated. One text per issue means one encoder pass per
+# candidate on the request path.
+EMBED_TEXT_MAX_CHARS = 2000  # Well past the ~256 tokens the sentence transformer actually reads
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def issue_embed_text(item: Dict[str, Any]) -> str:
+    """ Returns the text to embed for an issue item (raw, slim or webhook payload issue). """
+    body = _WHITESPACE_RE.sub(" ", item.get("body") or "").strip()
+    return f"{item.get('title') or ''} {body}"[:EMBED_TEXT_MAX_CHARS]
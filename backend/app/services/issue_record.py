@@ -0,0 +1,103 @@
+import re
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional, Tuple
+
+from .field_projection import compile_fields, project
+from .issue_embedding import issue_embed_text
+from .keyword_matcher import get_tech_term_matcher
+
+# --- Slim Issue Records ---
+# GitHub search items carry nested users, reactions, pull_request links and full bodies that the
+# matching pipeline never reads. Items are projected once, right after the search, into immutable
+# records holding only what embedding and the response need. Search results are cached already
+# projected (see to_cached), so a cache hit skips the body scans of from_search_item.
+SHORT_DESCRIPTION_LENGTH = 120
+
+# The raw item fields from_search_item reads: issues stored outside the search cache (index
+# snapshots, webhook deltas) keep just these
+RAW_ISSUE_FIELDS = (
+    "id", "html_url", "repository_url", "title", "body", "created_at", "user.login", "labels.name",
+    "comments", "assignee.login", "assignees.login", "state", "repository.stargazers_count",
+)
+_RAW_ISSUE_TREE = compile_fields(RAW_ISSUE_FIELDS)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@dataclass(frozen=True, slots=True)
+class IssueRecord:
+    """ The parts of a GitHub issue the matching pipeline uses. """
+    id: Optional[int]
+    html_url: str
+    repo_url: str
+    title: str
+    created_at: Optional[str]
+    user_login: Optional[str]
+    labels: Tuple[str, ...]
+    short_description: str
+    tech_tags: Tuple[str, ...]
+    embed_text: str  # Embedded and compared for near-duplicates (see issue_embedding.py)
+    comments: int
+    assigned: bool
+    repo_stars: Optional[int]  # Only known when the item embeds its repository (search items don't)
+
+    @classmethod
+    def from_search_item(cls, item: Dict[str, Any]) -> "IssueRecord":
+        """ Projects a raw GitHub search API item. """
+        title = item.get("title") or ""
+        body = item.get("body") or ""
+        cleaned_body = _WHITESPACE_RE.sub(" ", body).strip()
+        short_description = (cleaned_body[:SHORT_DESCRIPTION_LENGTH] + "...") if len(cleaned_body) > SHORT_DESCRIPTION_LENGTH else cleaned_body
+        return cls(
+            id=item.get("id"),
+            html_url=item.get("html_url") or "",
+            repo_url=(item.get("repository_url") or "").replace("api.github.com/repos", "github.com"),
+            title=title,
+            created_at=item.get("created_at"),
+            user_login=(item.get("user") or {}).get("login"),
+            labels=tuple(label.get("name") for label in item.get("labels") or []),
+            short_description=short_description,
+            tech_tags=tuple(get_tech_term_matcher().match_terms(f"{title} {body}")),
+            embed_text=issue_embed_text(item),
+            comments=item.get("comments") or 0,
+            assigned=bool(item.get("assignee") or item.get("assignees")),
+            repo_stars=(item.get("repository") or {}).get("stargazers_count"),
+        )
+
+    def to_cached(self) -> Dict[str, Any]:
+        """ JSON-compatible form of the record, for result caches (see from_cached). """
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+    @classmethod
+    def from_cached(cls, data: Dict[str, Any]) -> "IssueRecord":
+        """ Rebuilds a record from to_cached's output without re-deriving anything. """
+        return cls(**{**data, "labels": tuple(data["labels"]), "tech_tags": tuple(data["tech_tags"])})
+
+    def to_result(self, similarity_score: float) -> Dict[str, Any]:
+        """ Formats the record as a match result (see IssueResult in the match endpoint). """
+        return {
+            "issue_id": self.id,
+            "issue_url": self.html_url,
+            "repo_url": self.repo_url,
+            "title": self.title,
+            "created_at": self.created_at,
+            "user_login": self.user_login,
+            "labels": list(self.labels),
+            "similarity_score": similarity_score,
+            "short_description": self.short_description,
+            "tech_tags": list(self.tech_tags),
+        }
+
+
+def slim_issue_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """ Keeps only RAW_ISSUE_FIELDS of a raw GitHub issue (search item or webhook payload issue). """
+    return project(item, _RAW_ISSUE_TREE)
+
+
+def project_search_items(items: List[Dict[str, Any]]) -> List[IssueRecord]:
+    return [IssueRecord.from_search_item(item) for item in items]
+
+
+def cache_search_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """ Projects raw search items into cacheable records once, at fetch time (see IssueRecord.to_cached). """
+    return [IssueRecord.from_search_item(item).to_cached() for item in items]
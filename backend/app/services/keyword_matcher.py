@@ -0,0 +1,140 @@
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set
+
+from .tech_terms import AMBIGUOUS_TECH_TERMS, TECH_TERM_SYNONYMS, TECH_TERMS
+
+
+class KeywordMatch(NamedTuple):
+    """A single vocabulary hit in a text."""
+    term: str   # Canonical term
+    start: int  # Character offsets into the original text
+    end: int
+    text: str   # Matched text as written
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _lower_preserving_offsets(text: str) -> str:
+    """ Lowercases text without changing its length (a few Unicode characters lowercase to two). """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick matcher for a keyword vocabulary.
+
+    Scans a text once, case-insensitively, regardless of vocabulary size. Matches must sit on word
+    boundaries (so "java" does not match inside "javascript"), overlapping hits resolve to the
+    leftmost-longest one, and spelling variants are reported as their canonical term.
+    Ambiguous terms (everyday words like "go") only match when written with an uppercase letter.
+    """
+
+    def __init__(self, terms: Iterable[str], synonyms: Optional[Dict[str, str]] = None,
+                 ambiguous: Optional[Set[str]] = None):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[int]] = [[]]  # Pattern indices ending at each node (incl. via fail links)
+        self._patterns: List[str] = []
+        self._canonical: List[str] = []
+        self._ambiguous = {term.lower() for term in (ambiguous or ())}
+
+        variants = {term.lower(): term.lower() for term in terms}
+        variants.update({variant.lower(): canonical.lower() for variant, canonical in (synonyms or {}).items()})
+        self._lookup = variants
+        for variant, canonical in variants.items():
+            if variant:
+                self._add_pattern(variant, canonical)
+        self._build_fail_links()
+
+    def _add_pattern(self, pattern: str, canonical: str) -> None:
+        node = 0
+        for ch in pattern:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][ch] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            node = next_node
+        self._outputs[node].append(len(self._patterns))
+        self._patterns.append(pattern)
+        self._canonical.append(canonical)
+
+    def _build_fail_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def normalize(self, term: str) -> Optional[str]:
+        """ Returns the canonical form of a vocabulary term or variant, or None if it is unknown. """
+        return self._lookup.get(" ".join(term.lower().split()))
+
+    def finditer(self, text: str) -> Iterator[KeywordMatch]:
+        """
+        Yields non-overlapping, word-bounded matches in order of position.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Iterator of KeywordMatch
+        """
+        lowered = _lower_preserving_offsets(text)
+        text_len = len(text)
+        candidates = []
+        node = 0
+        for i, ch in enumerate(lowered):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pattern_index in self._outputs[node]:
+                pattern = self._patterns[pattern_index]
+                start, end = i + 1 - len(pattern), i + 1
+                # Word boundaries only matter where the pattern itself starts/ends with a word character
+                if start > 0 and _is_word_char(pattern[0]) and _is_word_char(lowered[start - 1]):
+                    continue
+                if end < text_len and _is_word_char(pattern[-1]) and _is_word_char(lowered[end]):
+                    continue
+                if pattern in self._ambiguous and text[start:end] == lowered[start:end]:
+                    continue
+                candidates.append((start, -end, pattern_index))
+
+        # Leftmost-longest, non-overlapping
+        candidates.sort()
+        last_end = 0
+        for start, neg_end, pattern_index in candidates:
+            if start < last_end:
+                continue
+            last_end = -neg_end
+            yield KeywordMatch(self._canonical[pattern_index], start, last_end, text[start:last_end])
+
+    def count_terms(self, text: str) -> Counter:
+        """ Counts canonical term occurrences in the text. """
+        return Counter(match.term for match in self.finditer(text))
+
+    def match_terms(self, text: str) -> List[str]:
+        """ Returns the sorted, distinct canonical terms found in the text. """
+        return sorted({match.term for match in self.finditer(text)})
+
+
+@lru_cache(maxsize=1)
+def get_tech_term_matcher() -> KeywordMatcher:
+    """ Shared matcher over the curated tech-term gazetteer (built once per process). """
+    return KeywordMatcher(TECH_TERMS, synonyms=TECH_TERM_SYNONYMS, ambiguous=AMBIGUOUS_TECH_TERMS)
@@ -0,0 +1,178 @@
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+import spacy
+from spacy.language import Language
+
+from ..core.config import settings
+from .keyword_matcher import get_tech_term_matcher
+from .tech_terms import AMBIGUOUS_TECH_TERMS, TECH_TERM_SYNONYMS, TECH_TERMS
+from .vertex_ai_service import MIN_SALIENCE, analyze_profile_text_async, client, is_relevant_entity_name
+
+# --- Local Keyword Extraction (spaCy) ---
+# An offline alternative to Cloud NLP analyzeEntities: gazetteer tech terms (entity ruler),
+# relevant named entities and noun chunks, scored by their share of all mentions.
+SPACY_MODEL_NAME = "en_core_web_sm"
+EXCLUDED_PIPES = ["lemmatizer"]  # noun_chunks need tagger/attribute_ruler/parser, entities need ner
+TECH_ENTITY_LABEL = "TECH"
+RELEVANT_LOCAL_ENTITY_LABELS = {TECH_ENTITY_LABEL, "ORG", "PRODUCT", "WORK_OF_ART"}  # Mirrors RELEVANT_ENTITY_TYPES
+MENTION_WEIGHTS = {TECH_ENTITY_LABEL: 3.0, "ENTITY": 2.0, "NOUN_CHUNK": 1.0}
+MAX_NOUN_CHUNK_TOKENS = 4
+PIPE_BATCH_SIZE = 16
+
+KEYWORD_BACKENDS = ("cloud", "local", "auto")
+
+nlp: Optional[Language] = None
+
+
+def _tech_term_patterns() -> List[Dict[str, Any]]:
+    """ Entity ruler patterns for the gazetteer; synonyms carry their canonical term as the pattern id. """
+    patterns = []
+    for variant, canonical in [(term, term) for term in TECH_TERMS] + list(TECH_TERM_SYNONYMS.items()):
+        if variant in AMBIGUOUS_TECH_TERMS:
+            # Everyday words ("go", "express") only count when tagged as proper nouns
+            pattern = [{"LOWER": variant, "POS": "PROPN"}]
+        else:
+            pattern = variant
+        patterns.append({"label": TECH_ENTITY_LABEL, "pattern": pattern, "id": canonical})
+    return patterns
+
+
+def get_nlp() -> Language:
+    """ Lazily loads the spaCy pipeline with only the needed pipes plus the tech-term entity ruler. """
+    global nlp
+    if nlp is None:
+        print(f"DEBUG: Loading spaCy model {SPACY_MODEL_NAME} for local keyword extraction...")
+        pipeline = spacy.load(SPACY_MODEL_NAME, exclude=EXCLUDED_PIPES)
+        ruler = pipeline.add_pipe("entity_ruler", before="ner", config={"phrase_matcher_attr": "LOWER"})
+        ruler.add_patterns(_tech_term_patterns())
+        nlp = pipeline
+        print(f"DEBUG: spaCy pipeline ready: {nlp.pipe_names}")
+    return nlp
+
+
+def _noun_chunk_name(chunk) -> str:
+    """ Strips leading determiners/pronouns/numbers from a noun chunk and lowercases it. """
+    tokens = [token for token in chunk if not (token.is_stop or token.is_punct or token.like_num or token.pos_ in ("DET", "PRON"))]
+    return " ".join(token.text for token in tokens).lower().strip()
+
+
+def _keywords_from_doc(doc) -> List[str]:
+    """ Scores the candidate keywords of one parsed document and applies the Cloud NLP style filters. """
+    matcher = get_tech_term_matcher()
+    mentions: Counter = Counter()
+    for ent in doc.ents:
+        if ent.label_ not in RELEVANT_LOCAL_ENTITY_LABELS:
+            continue
+        if ent.label_ == TECH_ENTITY_LABEL:
+            mentions[ent.ent_id_ or ent.text.lower()] += MENTION_WEIGHTS[TECH_ENTITY_LABEL]
+        else:
+            name = ent.text.lower().strip()
+            mentions[matcher.normalize(name) or name] += MENTION_WEIGHTS["ENTITY"]
+    for chunk in doc.noun_chunks:
+        if len(chunk) > MAX_NOUN_CHUNK_TOKENS:
+            continue
+        name = _noun_chunk_name(chunk)
+        if name:
+            mentions[matcher.normalize(name) or name] += MENTION_WEIGHTS["NOUN_CHUNK"]
+
+    total = sum(mentions.values())
+    if not total:
+        return []
+    # Salience-style filter: a keyword's share of all weighted mentions
+    keywords = {
+        name for name, weight in mentions.items()
+        if weight / total >= MIN_SALIENCE and (name in TECH_TERMS or is_relevant_entity_name(name))
+    }
+    return sorted(keywords)
+
+
+def extract_keywords_local_batch(text_blobs: Iterable[str], batch_size: int = PIPE_BATCH_SIZE) -> List[Dict[str, List[str]]]:
+    """
+    Extracts keywords from several texts with nlp.pipe batching.
+
+    Returns:
+        One {"keywords_entities": [...]} dict per input text, like analyze_profile_text
+    """
+    pipeline = get_nlp()
+    return [{"keywords_entities": _keywords_from_doc(doc)} for doc in pipeline.pipe(text_blobs, batch_size=batch_size)]
+
+
+def extract_keywords_local(text_blob: str) -> Dict[str, List[str]]:
+    """ Offline drop-in for analyze_profile_text. """
+    if not text_blob:
+        print("Warning: Text blob provided to extract_keywords_local was empty.")
+        return {"keywords_entities": []}
+    result = extract_keywords_local_batch([text_blob])[0]
+    print(f"DEBUG: Local extractor found {len(result['keywords_entities'])} keywords.")
+    return result
+
+
+async def extract_profile_keywords(text_blob: str, backend: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Extracts profile keywords with the selected backend (defaults to settings.KEYWORD_BACKEND):
+    "cloud" uses Cloud NLP only, "local" uses spaCy only, and "auto" uses Cloud NLP when its
+    client initialized and falls back to spaCy when it is unavailable or returns nothing.
+    """
+    backend = backend or settings.KEYWORD_BACKEND
+    if backend not in KEYWORD_BACKENDS:
+        raise ValueError(f"Unknown keyword backend '{backend}'. Expected one of {KEYWORD_BACKENDS}")
+
+    if backend == "cloud" or (backend == "auto" and client is not None):
+        result = await analyze_profile_text_async(text_blob)
+        if backend == "cloud" or result["keywords_entities"]:
+            # Report gazetteer synonyms ("js", "k8s") under the same canonical names as the local backend
+            matcher = get_tech_term_matcher()
+            return {"keywords_entities": sorted({matcher.normalize(name) or name for name in result["keywords_entities"]})}
+        print("WARN: Cloud NLP returned no keywords, falling back to the local extractor.")
+
+    # spaCy is CPU bound; keep it off the event loop
+    return await asyncio.to_thread(extract_keywords_local, text_blob)
+
+
+def benchmark_backends(text_blobs: List[str], repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    Times the local extractor against the Cloud NLP path on the same texts.
+    The remote path is timed on its first (uncached) pass only.
+    """
+    results: Dict[str, Dict[str, float]] = {}
+
+    get_nlp()  # Exclude model loading from the timing
+    start = time.perf_counter()
+    for _ in range(repeat):
+        local = extract_keywords_local_batch(text_blobs)
+    elapsed = (time.perf_counter() - start) / repeat
+    results["local"] = {"seconds_per_batch": elapsed, "texts_per_second": len(text_blobs) / elapsed,
+                        "avg_keywords": sum(len(r["keywords_entities"]) for r in local) / max(len(local), 1)}
+
+    if client is not None:
+        start = time.perf_counter()
+        remote = asyncio.run(_analyze_all_remote(text_blobs))
+        elapsed = time.perf_counter() - start
+        results["cloud"] = {"seconds_per_batch": elapsed, "texts_per_second": len(text_blobs) / elapsed,
+                            "avg_keywords": sum(len(r["keywords_entities"]) for r in remote) / max(len(remote), 1)}
+    else:
+        print("WARN: Cloud NLP client not initialized, skipping the remote benchmark.")
+
+    return results
+
+
+async def _analyze_all_remote(text_blobs: List[str]) -> List[Dict[str, List[str]]]:
+    return list(await asyncio.gather(*(analyze_profile_text_async(text) for text in text_blobs)))
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Usage: python -m app.services.local_nlp_service [file ...]
+    paths = sys.argv[1:]
+    texts = [open(path, encoding="utf-8").read() for path in paths] or [
+        "Neo4j + Vertex AI Codelab. A movie recommendation application built with Python, FastAPI and React "
+        "that combines Neo4j's graph database with Google Cloud's Vertex AI for semantic search. "
+        "Deployed with Docker and Kubernetes, tested with pytest and GitHub Actions."
+    ]
+    for backend_name, stats in benchmark_backends(texts).items():
+        print(f"{backend_name}: {stats['seconds_per_batch'] * 1000:.1f} ms/batch, "
+              f"{stats['texts_per_second']:.1f} texts/s, {stats['avg_keywords']:.1f} keywords/text")
@@ -0,0 +1,207 @@
+import base64
+import binascii
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .batch_scoring import get_precomputed_recommendations
+from .cache import get_cache
+from .faiss_search import get_top_matched_issues, normalize_query_text
+from .index_snapshot import snapshot_manager
+from .issue_delta import delta_index, get_live_issues, search_live
+from .issue_record import IssueRecord
+from .profile_vectors import profile_vector_store
+from .rescoring import issue_features, rerank
+from ..core.config import settings
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Ranked Match Pagination ---
+# The first /match-issue call ranks up to MATCH_RANKING_DEPTH issues once and caches the formatted
+# ranking; later pages are slices of it addressed by an opaque cursor, so "load more" costs no
+# GitHub searches, embeddings or FAISS searches.
+MATCH_RANKING_DEPTH = 100
+MATCH_RANKING_TTL_SECONDS = 15 * 60
+MATCH_RANKING_MAX_ENTRIES = 5000
+
+_ranking_cache = get_cache("match_rankings", ttl=MATCH_RANKING_TTL_SECONDS, max_entries=MATCH_RANKING_MAX_ENTRIES)
+
+
+class InvalidCursorError(ValueError):
+    """ The cursor is malformed or was issued to another user. """
+
+
+class CursorExpiredError(LookupError):
+    """ The ranking the cursor points into is no longer cached. """
+
+
+def _owner_key(github_token: Optional[str]) -> str:
+    return hashlib.sha256(github_token.encode("utf-8")).hexdigest()[:16] if github_token else "anonymous"
+
+
+def _vector_key(vector: Optional[np.ndarray]) -> Optional[str]:
+    return hashlib.sha256(np.ascontiguousarray(vector, dtype=np.float32).tobytes()).hexdigest() if vector is not None else None
+
+
+def _ranking_id(query_text: str, keywords: List[str], languages: List[str], owner: str,
+                search_queries: Optional[List[str]] = None, query_vector: Optional[np.ndarray] = None) -> str:
+    payload = json.dumps({
+        "query_vector": _vector_key(query_vector),
+        "query": normalize_query_text(query_text),
+        "keywords": sorted(set(keywords)),
+        "languages": sorted(set(languages or [])),
+        "search_queries": sorted(set(search_queries or [])),
+        "owner": owner,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def encode_cursor(ranking_id: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{ranking_id}:{offset}".encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """ Returns (ranking_id, offset), raising InvalidCursorError for malformed cursors. """
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        ranking_id, offset = decoded.split(":")
+        offset = int(offset)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursorError("Malformed cursor") from e
+    if offset < 0 or len(ranking_id) != 64:
+        raise InvalidCursorError("Malformed cursor")
+    return ranking_id, offset
+
+
+def _page(ranking_id: str, ranking: Dict[str, Any], offset: int, page_size: int) -> Dict[str, Any]:
+    recommendations = ranking["recommendations"]
+    end = offset + page_size
+    return {
+        "recommendations": recommendations[offset:end],
+        "issues_fetched": ranking["issues_fetched"],
+        "issues_indexed": ranking["issues_indexed"],
+        "message": ranking["message"],
+        "total_results": len(recommendations),
+        "next_cursor": encode_cursor(ranking_id, end) if end < len(recommendations) else None,
+    }
+
+
+async def get_first_match_page(query_text: str, keywords: List[str], languages: List[str],
+                               page_size: int, github_token: Optional[str] = None,
+                               search_queries: Optional[List[str]] = None,
+                               query_vector: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    Returns the first page of matches, ranking the issues (or reusing the cached ranking of an
+    identical recent query by the same user).
+
+    Args:
+        query_text: Query text
+        keywords: List of keywords to search for
+        languages: List of programming languages
+        page_size: Number of matches per page (at most MATCH_RANKING_DEPTH)
+        github_token: GitHub API token for authentication
+        search_queries: GitHub search queries to retrieve candidates with (see get_top_matched_issues)
+        query_vector: Stored embedding to rank with instead of encoding query_text (e.g. the profile vector)
+
+    Returns:
+        get_top_matched_issues' result for the page, plus "total_results" and "next_cursor"
+    """
+    owner = _owner_key(github_token)
+    ranking_id = _ranking_id(query_text, keywords, languages, owner, search_queries, query_vector)
+    ranking = await _ranking_cache.aget(ranking_id)
+    if ranking is not None:
+        logger.info("Reusing cached match ranking")
+        return _page(ranking_id, ranking, 0, page_size)
+
+    result = await get_top_matched_issues(
+        query_text=query_text,
+        keywords=keywords,
+        languages=languages,
+        top_k=MATCH_RANKING_DEPTH,
+        github_token=github_token,
+        search_queries=search_queries,
+        query_vector=query_vector
+    )
+    ranking = {**result, "owner": owner}
+    if result["recommendations"]:  # Errors and empty results are not worth paginating or caching
+        await _ranking_cache.aset(ranking_id, ranking)
+    return _page(ranking_id, ranking, 0, page_size)
+
+
+def get_precomputed_first_page(login: str, page_size: int, github_token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Returns the first page of a user's precomputed recommendations (see batch_scoring), or None
+    when the live pipeline has to be used. Later pages are served through cursors as usual.
+    """
+    result = get_precomputed_recommendations(login)
+    if result is None:
+        return None
+    profile_vector_store.touch(login)
+    owner = _owner_key(github_token)
+    ranking_id = hashlib.sha256(json.dumps({"precomputed": login, "owner": owner}).encode("utf-8")).hexdigest()
+    ranking = {**result, "owner": owner}
+    _ranking_cache.set(ranking_id, ranking)
+    return _page(ranking_id, ranking, 0, page_size)
+
+
+def get_profile_vector_first_page(login: str, profile_vector: np.ndarray, page_size: int,
+                                  github_token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Returns the first page of matches for a stored profile vector, searched against the live issue
+    snapshot and the webhook delta (no GitHub searches and no embedding), or None when neither has
+    any issues.
+    """
+    snapshot = snapshot_manager.current()
+    delta_index.refresh(snapshot=snapshot)
+    if snapshot is not None and snapshot.store.dim != len(profile_vector):
+        return None
+    if snapshot is None and not len(delta_index):
+        return None
+    owner = _owner_key(github_token)
+    ranking_id = hashlib.sha256(json.dumps({"profile": login, "vector": _vector_key(profile_vector),
+                                            "snapshot": snapshot.version if snapshot else None, "delta": delta_index.seq,
+                                            "owner": owner}).encode("utf-8")).hexdigest()
+    ranking = _ranking_cache.get(ranking_id)
+    if ranking is None:
+        distances, issue_ids = search_live(snapshot, profile_vector, MATCH_RANKING_DEPTH * settings.RESCORING_CANDIDATE_FACTOR)
+        matches = [
+            (IssueRecord.from_search_item(issue), float(1 - distance / 2))
+            for issue, distance in zip(get_live_issues(snapshot, issue_ids), distances) if issue is not None
+        ]
+        order = rerank(np.array([score for _, score in matches]), issue_features([record for record, _ in matches]),
+                       MATCH_RANKING_DEPTH)
+        recommendations = [matches[i][0].to_result(matches[i][1]) for i in order]
+        if not recommendations:
+            return None
+        ranking = {
+            "recommendations": recommendations,
+            "issues_fetched": 0,
+            "issues_indexed": (snapshot.ntotal if snapshot else 0) + len(delta_index),
+            "message": "Matched with stored profile embedding",
+            "owner": owner,
+        }
+        _ranking_cache.set(ranking_id, ranking)
+    profile_vector_store.touch(login)
+    return _page(ranking_id, ranking, 0, page_size)
+
+
+def get_match_page(cursor: str, page_size: int, github_token: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Returns the page of a cached ranking a cursor points to.
+
+    Raises:
+        InvalidCursorError: The cursor is malformed or belongs to another user
+        CursorExpiredError: The ranking expired; the client should start over from the first page
+    """
+    ranking_id, offset = decode_cursor(cursor)
+    ranking = _ranking_cache.get(ranking_id)
+    if ranking is None:
+        raise CursorExpiredError("Cursor expired")
+    if ranking.get("owner") != _owner_key(github_token):
+        raise InvalidCursorError("Cursor was issued to another session")
+    return _page(ranking_id, ranking, offset, page_size)
@@ -0,0 +1,95 @@
+import re
+import zlib
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# --- Near-Duplicate Detection ---
+# Templated issues ("Translate X to language Y", bot-filed clones across forks) are collapsed at
+# ingest so only one representative per cluster is embedded and indexed. Each text gets a MinHash
+# signature over its word shingles; LSH banding proposes candidate pairs, whose Jaccard similarity
+# (estimated from signature agreement) is checked for all pairs in one vectorized pass, and the
+# confirmed pairs are clustered with union-find. The first text of each cluster (in input order,
+# i.e. search rank) is kept.
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 Jaccard are likely to share a bucket
+JACCARD_THRESHOLD = 0.6  # Templated issues differing in a few words (e.g. the language name) land around 0.6-0.8
+SHINGLE_SIZE = 3  # Words per shingle
+SIGNATURE_BLOCK_SIZE = 128  # Texts hashed per vectorized pass (bounds the (permutations, shingles) matrix)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.default_rng(1)  # Fixed seed: signatures are comparable across calls and processes
+_PERM_A = _rng.integers(1, 1 << 29, size=NUM_PERMUTATIONS, dtype=np.uint64)  # a * x stays below 2**61
+_PERM_B = _rng.integers(0, 1 << 32, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """ Returns the distinct 32-bit hashes of a text's word shingles (lowercased alphanumeric tokens). """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = {" ".join(tokens)} if tokens else set()
+    else:
+        shingles = {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash_signatures(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Computes MinHash signatures for texts.
+
+    Returns:
+        Tuple of (uint32 signatures of shape (n, NUM_PERMUTATIONS), bool mask of texts that had shingles)
+    """
+    hashes = [shingle_hashes(text) for text in texts]
+    has_shingles = np.array([len(h) > 0 for h in hashes], dtype=bool)
+    signatures = np.full((len(texts), NUM_PERMUTATIONS), _MAX_HASH, dtype=np.uint64)
+    rows = np.flatnonzero(has_shingles)
+    for start in range(0, len(rows), SIGNATURE_BLOCK_SIZE):
+        block = rows[start:start + SIGNATURE_BLOCK_SIZE]
+        flat = np.concatenate([hashes[row] for row in block])
+        offsets = np.cumsum([0] + [len(hashes[row]) for row in block[:-1]])
+        # Universal hashing (a * x + b) mod p, truncated to 32 bits, for every permutation at once
+        permuted = ((_PERM_A[:, None] * flat[None, :] + _PERM_B[:, None]) % _MERSENNE_PRIME) & _MAX_HASH
+        signatures[block] = np.minimum.reduceat(permuted, offsets, axis=1).T
+    return signatures.astype(np.uint32), has_shingles
+
+
+def _candidate_pairs(signatures: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """ Returns the distinct (i, j) pairs, i < j, that share at least one LSH band bucket. """
+    rows_per_band = NUM_PERMUTATIONS // LSH_BANDS
+    pairs = set()
+    for band in range(LSH_BANDS):
+        buckets: Dict[bytes, List[int]] = {}
+        band_signatures = np.ascontiguousarray(signatures[rows, band * rows_per_band:(band + 1) * rows_per_band])
+        for row, key in zip(rows, band_signatures):
+            buckets.setdefault(key.tobytes(), []).append(int(row))
+        for members in buckets.values():
+            for k, first in enumerate(members):
+                pairs.update((first, other) for other in members[k + 1:])
+    return np.array(sorted(pairs), dtype=np.int64).reshape(-1, 2)
+
+
+def near_duplicate_representatives(texts: Sequence[str], threshold: float = JACCARD_THRESHOLD) -> List[int]:
+    """
+    Clusters near-duplicate texts and returns the indices of the texts to keep (one per cluster,
+    the first in input order), in input order. Texts without any words are always kept.
+    """
+    if len(texts) < 2:
+        return list(range(len(texts)))
+    signatures, has_shingles = minhash_signatures(texts)
+    pairs = _candidate_pairs(signatures, np.flatnonzero(has_shingles))
+    parent = np.arange(len(texts))
+    if len(pairs):
+        similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+        for i, j in pairs[similarity >= threshold]:
+            root_i, root_j = i, j
+            while parent[root_i] != root_i:
+                root_i = parent[root_i]
+            while parent[root_j] != root_j:
+                root_j = parent[root_j]
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)  # The earliest text stays the root
+    return [i for i in range(len(texts)) if parent[i] == i]
@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+from .faiss_search import MODEL_NAME, embed_texts_async, ensure_model_async
+from .github_service import get_repo_documents
+from .profile_vectors import profile_vector_store
+from .singleflight import SingleFlight
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Incremental Profile Embeddings ---
+# A user's profile vector is a weighted mean of per-repo vectors: the README (mean of its chunk
+# embeddings), the description and the topics of every repo, weighted by kind and by how recently
+# the repo was pushed. Per-repo vectors are stored with a fingerprint of their source text, so a
+# refresh only embeds repos whose text changed, and matching reads the stored vector instead of
+# encoding the profile on the request path.
+KIND_WEIGHTS = {"readme": 1.0, "description": 1.5, "topics": 2.0}
+RECENCY_DECAY = 0.9  # Weight of the n-th most recently pushed repo is RECENCY_DECAY ** n
+MIN_RECENCY_WEIGHT = 0.1
+README_CHUNK_CHARS = 1000  # Roughly the ~256 tokens the sentence transformer reads
+MAX_README_CHUNKS = 4
+
+_MARKDOWN_NOISE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)|<[^>]+>|```.*?```", re.DOTALL)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_refresh_flight = SingleFlight("profile_refresh")
+
+
+def chunk_readme(readme: Optional[str]) -> List[str]:
+    """ Splits a README into at most MAX_README_CHUNKS chunks of whole paragraphs (code, images and HTML dropped). """
+    if not readme:
+        return []
+    text = _MARKDOWN_NOISE_RE.sub(" ", readme)
+    chunks: List[str] = []
+    current = ""
+    for paragraph in text.split("\n\n"):
+        paragraph = _WHITESPACE_RE.sub(" ", paragraph).strip()
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) + 1 > README_CHUNK_CHARS:
+            chunks.append(current)
+            if len(chunks) == MAX_README_CHUNKS:
+                return chunks
+            current = ""
+        current = f"{current} {paragraph}".strip()[:README_CHUNK_CHARS]
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def repo_texts(document: Dict[str, Any]) -> Dict[str, List[str]]:
+    """ Returns the texts to embed for a repo document (see get_repo_documents), by kind. """
+    texts = {"readme": chunk_readme(document.get("readme"))}
+    if document.get("description"):
+        texts["description"] = [document["description"]]
+    if document.get("topics"):
+        texts["topics"] = [", ".join(document["topics"])]
+    return {kind: chunks for kind, chunks in texts.items() if chunks}
+
+
+def _fingerprint(texts: Dict[str, List[str]]) -> str:
+    payload = "\0".join(f"{kind}\0" + "\0".join(chunks) for kind, chunks in sorted(texts.items()))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def aggregate_profile_vector(rows: List[Tuple[str, str, np.ndarray]], repo_order: List[str]) -> Optional[np.ndarray]:
+    """
+    Combines stored (repo, kind, vector) rows into one L2-normalized profile vector.
+
+    Args:
+        rows: Per-repo vectors (see ProfileVectorStore.load_repo_vectors)
+        repo_order: Repo names, most recently pushed first
+
+    Returns:
+        float32 vector of shape (dim,), or None if there is nothing to aggregate
+    """
+    if not rows:
+        return None
+    rank = {repo: i for i, repo in enumerate(repo_order)}
+    vectors = np.stack([vector for _, _, vector in rows])
+    weights = np.array([
+        KIND_WEIGHTS[kind] * max(RECENCY_DECAY ** rank.get(repo, len(repo_order)), MIN_RECENCY_WEIGHT)
+        for repo, kind, _ in rows
+    ], dtype=np.float32)
+    profile = weights @ vectors
+    norm = np.linalg.norm(profile)
+    if norm == 0:
+        return None
+    return (profile / norm).astype(np.float32)
+
+
+async def update_profile_embedding(login: str, documents: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+    """
+    Re-embeds the repos whose text changed since the last update, drops removed repos, and stores
+    the re-aggregated profile vector (only if something changed).
+
+    Args:
+        login: GitHub login
+        documents: The user's repo documents, most recently pushed first (see get_repo_documents)
+
+    Returns:
+        The stored profile vector, or None if the user has no embeddable repos
+    """
+    model = await ensure_model_async()
+    stored = await asyncio.to_thread(profile_vector_store.get_repo_fingerprints, login, MODEL_NAME)
+    current: Dict[str, Tuple[str, Dict[str, List[str]]]] = {}
+    for document in documents:
+        name = document.get("full_name")
+        texts = repo_texts(document)
+        if name and texts:
+            current[name] = (_fingerprint(texts), texts)
+
+    changed = {name: value for name, value in current.items() if stored.get(name) != value[0]}
+    removed = [name for name in stored if name not in current]
+    profile = await asyncio.to_thread(profile_vector_store.get, login, MODEL_NAME)
+    if not changed and not removed and profile is not None:
+        await asyncio.to_thread(profile_vector_store.mark_checked, login)
+        return profile[0]
+
+    # One batched embedding pass over the changed repos' chunks
+    spans = []
+    batch: List[str] = []
+    for name, (fingerprint, texts) in changed.items():
+        for kind, chunks in texts.items():
+            spans.append((name, kind, len(batch), len(batch) + len(chunks)))
+            batch.extend(chunks)
+    embeddings = await embed_texts_async(batch, model) if batch else np.zeros((0, 0), dtype=np.float32)
+    repo_vectors: Dict[str, Tuple[str, Dict[str, np.ndarray]]] = {name: (changed[name][0], {}) for name in changed}
+    for name, kind, start, end in spans:
+        repo_vectors[name][1][kind] = embeddings[start:end].mean(axis=0)
+    await asyncio.to_thread(profile_vector_store.replace_repo_vectors, login, MODEL_NAME, repo_vectors, removed)
+    logger.info(f"Profile embedding of {login}: {len(changed)} repos re-embedded ({len(batch)} chunks), {len(removed)} removed")
+
+    rows = await asyncio.to_thread(profile_vector_store.load_repo_vectors, login, MODEL_NAME)
+    vector = aggregate_profile_vector(rows, [document.get("full_name") for document in documents])
+    if vector is not None:
+        await asyncio.to_thread(profile_vector_store.put, login, vector, MODEL_NAME)
+    return vector
+
+
+async def refresh_profile_embedding(login: str, github_token: str) -> None:
+    """ Fetches the user's repos and updates their profile embedding; meant to run in the background. """
+    async def refresh() -> None:
+        documents = await get_repo_documents(github_token)
+        await update_profile_embedding(login, documents)
+
+    try:
+        await _refresh_flight.do(login, refresh)
+    except Exception as e:
+        logger.warning(f"Could not refresh profile embedding for {login}: {str(e)}")
+
+
+def get_profile_vector(login: str) -> Tuple[Optional[np.ndarray], bool]:
+    """
+    Returns (stored profile vector or None, whether it should be refreshed).
+    A pure lookup: no GitHub calls and no embedding. Refreshes are due PROFILE_REFRESH_SECONDS after
+    the last check, even if that check found nothing to change.
+    """
+    profile = profile_vector_store.get(login, MODEL_NAME)
+    if profile is None:
+        return None, True
+    vector, _, checked_at = profile
+    return vector, time.time() - checked_at > settings.PROFILE_REFRESH_SECONDS
@@ -0,0 +1,176 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Persisted Profile Vectors ---
+# One float32 profile embedding per GitHub user, in a SQLite file (WAL) shared by the API workers
+# and the offline batch scoring job. `last_active_at` tracks who used the app recently, so the
+# batch job only scores active users. `updated_at` is when the vector last changed, `checked_at` when
+# the user's repos were last compared against it (changed or not). The profile vector is an aggregate of per-repo vectors, which
+# are kept (with a fingerprint of the text they were embedded from) so only changed repos are re-embedded.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profile_vectors (
+    login          TEXT PRIMARY KEY,
+    vector         BLOB NOT NULL,
+    dim            INTEGER NOT NULL,
+    model          TEXT NOT NULL,
+    updated_at     REAL NOT NULL,
+    last_active_at REAL NOT NULL,
+    checked_at     REAL NOT NULL DEFAULT 0
+)
+"""
+REPO_VECTORS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profile_repo_vectors (
+    login       TEXT NOT NULL,
+    repo        TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    vector      BLOB NOT NULL,
+    model       TEXT NOT NULL,
+    PRIMARY KEY (login, repo, kind)
+)
+"""
+TOUCH_INTERVAL_SECONDS = 60 * 60  # last_active_at is only rewritten once per hour per user
+
+
+class ProfileVectorStore:
+    """ Persisted per-user profile vectors (see module comment). """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(SCHEMA)
+            if "checked_at" not in {row[1] for row in conn.execute("PRAGMA table_info(profile_vectors)")}:
+                conn.execute("ALTER TABLE profile_vectors ADD COLUMN checked_at REAL NOT NULL DEFAULT 0")
+            conn.execute(REPO_VECTORS_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get(self, login: str, model: str) -> Optional[Tuple[np.ndarray, float, float]]:
+        """ Returns (vector, updated_at, checked_at) for a user, or None if no vector for `model` is stored. """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT vector, updated_at, checked_at FROM profile_vectors WHERE login = ? AND model = ?", (login, model)
+            ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32), row[1], row[2]
+
+    def put(self, login: str, vector: np.ndarray, model: str) -> None:
+        """ Stores a user's profile vector and marks the user active (and checked). """
+        vector = np.ascontiguousarray(vector, dtype=np.float32).ravel()
+        now = time.time()
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO profile_vectors (login, vector, dim, model, updated_at, last_active_at, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (login, vector.tobytes(), len(vector), model, now, now, now),
+            )
+
+    def mark_checked(self, login: str) -> None:
+        """ Records that a user's repos were compared against their vector and nothing changed; also marks them active. """
+        now = time.time()
+        with self._lock:
+            self._connection().execute(
+                "UPDATE profile_vectors SET checked_at = ?, last_active_at = ? WHERE login = ?", (now, now, login)
+            )
+
+    def touch(self, login: str) -> None:
+        """ Marks a user active (a no-op if they were marked within the last TOUCH_INTERVAL_SECONDS). """
+        now = time.time()
+        with self._lock:
+            self._connection().execute(
+                "UPDATE profile_vectors SET last_active_at = ? WHERE login = ? AND last_active_at < ?",
+                (now, login, now - TOUCH_INTERVAL_SECONDS),
+            )
+
+    def get_repo_fingerprints(self, login: str, model: str) -> Dict[str, str]:
+        """ Returns {repo: fingerprint} of the repo vectors stored for a user. """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT DISTINCT repo, fingerprint FROM profile_repo_vectors WHERE login = ? AND model = ?", (login, model)
+            ).fetchall()
+        return dict(rows)
+
+    def replace_repo_vectors(self, login: str, model: str, repo_vectors: Dict[str, Tuple[str, Dict[str, np.ndarray]]],
+                             removed_repos: List[str]) -> None:
+        """
+        Replaces the stored vectors of changed repos and deletes those of removed repos, in one transaction.
+
+        Args:
+            login: GitHub login
+            model: Embedding model
+            repo_vectors: {repo: (fingerprint, {kind: vector})}
+            removed_repos: Repos whose vectors are deleted
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                for repo in list(repo_vectors) + list(removed_repos):
+                    conn.execute("DELETE FROM profile_repo_vectors WHERE login = ? AND repo = ?", (login, repo))
+                conn.executemany(
+                    "INSERT INTO profile_repo_vectors (login, repo, kind, fingerprint, vector, model) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(login, repo, kind, fingerprint, np.ascontiguousarray(vector, dtype=np.float32).tobytes(), model)
+                     for repo, (fingerprint, vectors) in repo_vectors.items() for kind, vector in vectors.items()],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def load_repo_vectors(self, login: str, model: str) -> List[Tuple[str, str, np.ndarray]]:
+        """ Returns the (repo, kind, vector) rows stored for a user. """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT repo, kind, vector FROM profile_repo_vectors WHERE login = ? AND model = ?", (login, model)
+            ).fetchall()
+        return [(repo, kind, np.frombuffer(vector, dtype=np.float32)) for repo, kind, vector in rows]
+
+    def load_active(self, active_since: float, model: str) -> Tuple[List[str], np.ndarray]:
+        """
+        Loads the vectors of every user active since a timestamp.
+
+        Args:
+            active_since: Unix timestamp
+            model: Embedding model the vectors must come from
+
+        Returns:
+            Tuple of (logins, float32 matrix of shape (n, dim))
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT login, vector, dim FROM profile_vectors WHERE model = ? AND last_active_at >= ? ORDER BY login",
+                (model, active_since),
+            ).fetchall()
+        if not rows:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        dim = rows[0][2]
+        rows = [row for row in rows if row[2] == dim]
+        matrix = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float32).reshape(len(rows), dim)
+        return [row[0] for row in rows], matrix
+
+
+profile_vector_store = ProfileVectorStore(settings.PROFILE_DB_PATH)
@@ -0,0 +1,76 @@
+import time
+from typing import Optional, Sequence
+
+import numpy as np
+
+from ..core.config import settings
+from .issue_record import IssueRecord
+
+# --- Multi-Signal Re-Scoring ---
+# Embedding similarity alone ranks a stale, already-assigned issue in a dead repo the same as a
+# fresh one. Candidates are re-scored with a weighted sum of similarity and a few per-issue signals,
+# each squashed into [0, 1]:
+#   recency     0.5 ** (age / RESCORING_AGE_HALF_LIFE_DAYS)
+#   activity    comments / (comments + ACTIVITY_COMMENTS_SCALE)
+#   unassigned  1 if nobody is assigned
+#   stars       log10(1 + repo stars) / STARS_LOG_SCALE, capped at 1
+# Features live in a float32 matrix aligned with the index rows, so a whole candidate list is
+# scored in one vectorized pass. Weights come from settings.RESCORING_WEIGHTS.
+AGE_DAYS, COMMENTS, ASSIGNED, REPO_STARS = range(4)
+FEATURE_COUNT = 4
+ACTIVITY_COMMENTS_SCALE = 5.0
+STARS_LOG_SCALE = 5.0  # 100k stars saturate the signal
+
+
+def issue_features(records: Sequence[IssueRecord], now: Optional[float] = None) -> np.ndarray:
+    """
+    Builds the feature matrix of issue records.
+
+    Returns:
+        float32 array of shape (len(records), FEATURE_COUNT); unknown ages are NaN, unknown star counts 0
+    """
+    now = time.time() if now is None else now
+    created = np.array([(record.created_at or "NaT")[:19] for record in records], dtype="datetime64[s]")
+    features = np.empty((len(records), FEATURE_COUNT), dtype=np.float32)
+    features[:, AGE_DAYS] = np.maximum((now - created.astype(np.float64)) / 86400.0, 0.0)
+    features[np.isnat(created), AGE_DAYS] = np.nan
+    features[:, COMMENTS] = [record.comments for record in records]
+    features[:, ASSIGNED] = [record.assigned for record in records]
+    features[:, REPO_STARS] = [record.repo_stars or 0 for record in records]
+    return features
+
+
+def combined_scores(similarities: np.ndarray, features: np.ndarray) -> np.ndarray:
+    """ Weighted score of candidates from their similarities and feature rows (see module comment). """
+    weights = settings.RESCORING_WEIGHTS
+    age = features[:, AGE_DAYS]
+    recency = np.where(np.isnan(age), 0.0, 0.5 ** (np.nan_to_num(age) / settings.RESCORING_AGE_HALF_LIFE_DAYS))
+    comments = features[:, COMMENTS]
+    activity = comments / (comments + ACTIVITY_COMMENTS_SCALE)
+    unassigned = 1.0 - features[:, ASSIGNED]
+    stars = np.minimum(np.log10(1.0 + features[:, REPO_STARS]) / STARS_LOG_SCALE, 1.0)
+    return (weights.get("similarity", 1.0) * similarities
+            + weights.get("recency", 0.0) * recency
+            + weights.get("activity", 0.0) * activity
+            + weights.get("unassigned", 0.0) * unassigned
+            + weights.get("stars", 0.0) * stars)
+
+
+def rerank(similarities: np.ndarray, features: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Re-ranks candidates by their combined score.
+
+    Args:
+        similarities: Embedding similarities of the candidates, shape (n,)
+        features: Feature rows of the same candidates, shape (n, FEATURE_COUNT)
+        top_k: Number of candidates to keep
+
+    Returns:
+        Positions (into the candidate arrays) of the top_k candidates, best first
+    """
+    scores = combined_scores(np.asarray(similarities, dtype=np.float32), features)
+    top_k = min(top_k, len(scores))
+    if top_k < len(scores):
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        return top[np.argsort(-scores[top], kind="stable")]
+    return np.argsort(-scores, kind="stable")
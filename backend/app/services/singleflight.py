@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent async calls: while a call for a key is in flight, later callers
+    with the same key await the same task instead of starting their own.
+
+    The shared work runs as its own task, so a caller that is cancelled (e.g. the client
+    disconnected) does not cancel the work for the callers still waiting on it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark the exception as retrieved even if every waiter went away
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `fn()` for `key`, or join the identical call already in flight.
+
+        Args:
+            key: Identity of the call (must capture everything that affects the result)
+            fn: Zero-argument coroutine factory doing the actual work
+
+        Returns:
+            The shared result; exceptions are re-raised to every waiter
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        else:
+            logger.debug(f"[{self.name}] Joining in-flight call")
+        return await asyncio.shield(task)
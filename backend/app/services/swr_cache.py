@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from .cache import get_cache
+from .singleflight import SingleFlight
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheFetch:
+    """Result of a revalidating fetch: a new value and its ETag."""
+    value: Any
+    etag: Optional[str] = None
+
+
+# Returned by a fetch function when the origin answered 304 Not Modified
+NOT_MODIFIED = object()
+
+# Entries are kept this many times their fresh + grace lifetime, so fully expired results can
+# still be revalidated with their ETag instead of being downloaded again
+ETAG_RETENTION_FACTOR = 2
+
+
+class StaleWhileRevalidateCache:
+    """
+    Stale-while-revalidate cache for slowly changing upstream results.
+
+    Within `fresh_ttl` an entry is served as is. Within the following `grace_ttl` it is still
+    served immediately, but a background refresh is started. After that the caller waits for a
+    synchronous fetch. Fetches receive the entry's ETag so the origin can answer 304, and
+    concurrent fetches for the same key are coalesced within the worker. Entries live in the
+    shared cache backend, so workers see each other's results.
+    """
+
+    def __init__(self, name: str, max_entries: int, default_ttl: float = 60 * 60):
+        self.name = name
+        self._entries = get_cache(f"swr:{name}", ttl=default_ttl, max_entries=max_entries)
+        self._flight = SingleFlight(f"{name}-refresh")
+        self._background: Set[asyncio.Task] = set()
+
+    async def _refresh(self, key: str, fetch: Callable[[Optional[str]], Awaitable[Any]], retention: float) -> Any:
+        entry: Optional[Dict[str, Any]] = await self._entries.aget(key)
+        result = await fetch(entry["etag"] if entry else None)
+        if result is NOT_MODIFIED:
+            if entry is None:
+                raise RuntimeError(f"[{self.name}] Origin answered 304 without a cached entry")
+            logger.info(f"[{self.name}] Revalidated (304) cached result")
+            value, etag = entry["value"], entry["etag"]
+        else:
+            value, etag = result.value, result.etag
+        await self._entries.aset(key, {"value": value, "etag": etag, "fetched_at": time.time()}, ttl=retention)
+        return value
+
+    def _refresh_in_background(self, key: str, fetch: Callable[[Optional[str]], Awaitable[Any]], retention: float) -> None:
+        async def run():
+            try:
+                await self._flight.do(key, lambda: self._refresh(key, fetch, retention))
+            except Exception as e:
+                logger.warning(f"[{self.name}] Background refresh failed, keeping stale result: {str(e)}")
+
+        task = asyncio.create_task(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def get(self, key: str, fetch: Callable[[Optional[str]], Awaitable[Any]],
+                  fresh_ttl: float, grace_ttl: float) -> Any:
+        """
+        Return the cached value for `key`, refreshing it according to its age.
+
+        Args:
+            key: Normalized cache key
+            fetch: Coroutine function taking the cached ETag (or None) and returning a CacheFetch
+                   (with a JSON-compatible value) or NOT_MODIFIED; it should raise on errors so
+                   failures are never cached
+            fresh_ttl: Seconds an entry is served without revalidation
+            grace_ttl: Further seconds a stale entry is served while it is refreshed in the background
+
+        Returns:
+            The cached or freshly fetched value
+        """
+        retention = (fresh_ttl + grace_ttl) * ETAG_RETENTION_FACTOR
+        entry: Optional[Dict[str, Any]] = await self._entries.aget(key)
+        if entry is not None:
+            age = time.time() - entry["fetched_at"]
+            if age < fresh_ttl:
+                return entry["value"]
+            if age < fresh_ttl + grace_ttl:
+                logger.info(f"[{self.name}] Serving stale result ({age:.0f}s old) and refreshing in the background")
+                self._refresh_in_background(key, fetch, retention)
+                return entry["value"]
+
+        return await self._flight.do(key, lambda: self._refresh(key, fetch, retention))
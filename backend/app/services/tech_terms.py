@@ -0,0 +1,61 @@
+# --- Curated Tech-Term Gazetteer ---
+# Canonical, lowercase names of languages, frameworks, tools and topics we want to recognize
+# in profile text and issues. Keep entries canonical; spelling variants go in TECH_TERM_SYNONYMS.
+
+TECH_TERMS = {
+    # Languages
+    "python", "javascript", "typescript", "java", "kotlin", "scala", "go", "rust", "c", "c++", "c#",
+    "ruby", "php", "swift", "objective-c", "dart", "elixir", "erlang", "haskell", "clojure", "lua",
+    "perl", "r", "julia", "matlab", "bash", "powershell", "sql", "html", "css", "sass", "graphql",
+    "solidity", "zig", "ocaml", "f#", "groovy", "webassembly",
+    # Frontend
+    "react", "react native", "next.js", "vue", "nuxt", "angular", "svelte", "sveltekit", "jquery",
+    "redux", "tailwind css", "bootstrap", "webpack", "vite", "babel", "storybook", "three.js", "d3.js",
+    "electron", "flutter", "jetpack compose", "swiftui",
+    # Backend
+    "node.js", "express", "nestjs", "deno", "bun", "django", "flask", "fastapi", "spring boot",
+    "ruby on rails", "laravel", "asp.net", "gin", "actix", "phoenix", "grpc", "rest api", "websocket",
+    # Data / ML
+    "machine learning", "deep learning", "natural language processing", "computer vision",
+    "tensorflow", "pytorch", "keras", "scikit-learn", "pandas", "numpy", "scipy", "jupyter notebook",
+    "hugging face", "transformers", "langchain", "spacy", "opencv", "faiss", "sentence transformers",
+    "xgboost", "apache spark", "airflow", "dbt", "large language model", "generative ai",
+    # Databases
+    "postgresql", "mysql", "sqlite", "mongodb", "redis", "elasticsearch", "cassandra", "dynamodb",
+    "firebase", "firestore", "supabase", "neo4j", "prisma", "sqlalchemy",
+    # Cloud / DevOps
+    "docker", "kubernetes", "terraform", "ansible", "helm", "github actions", "gitlab ci", "jenkins",
+    "aws", "google cloud", "azure", "vertex ai", "vercel", "netlify", "heroku", "nginx", "linux",
+    "prometheus", "grafana", "devops", "ci/cd", "serverless",
+    # Tooling / practices
+    "git", "github", "gitlab", "vscode", "vim", "pytest", "jest", "cypress", "playwright", "selenium",
+    "eslint", "unit testing", "open source", "documentation", "accessibility", "web development",
+    "android", "ios", "blockchain", "ethereum", "web3", "cybersecurity", "oauth", "state management",
+    "ui design", "game development", "unity", "unreal engine", "arduino", "raspberry pi", "iot",
+}
+
+# Variant spelling -> canonical term in TECH_TERMS
+TECH_TERM_SYNONYMS = {
+    "js": "javascript", "ecmascript": "javascript", "ts": "typescript", "py": "python", "python3": "python",
+    "golang": "go", "cpp": "c++", "csharp": "c#", "dotnet": "asp.net", ".net": "asp.net",
+    "reactjs": "react", "react.js": "react", "nextjs": "next.js", "vuejs": "vue", "vue.js": "vue",
+    "angularjs": "angular", "nodejs": "node.js", "node": "node.js", "expressjs": "express",
+    "tailwind": "tailwind css", "tailwindcss": "tailwind css", "threejs": "three.js", "d3": "d3.js",
+    "spring": "spring boot", "rails": "ruby on rails", "ml": "machine learning", "dl": "deep learning",
+    "nlp": "natural language processing", "cv": "computer vision", "tf": "tensorflow", "sklearn": "scikit-learn",
+    "jupyter": "jupyter notebook", "jupyter-notebook": "jupyter notebook", "huggingface": "hugging face",
+    "spark": "apache spark", "llm": "large language model", "llms": "large language model",
+    "genai": "generative ai", "postgres": "postgresql", "mongo": "mongodb", "k8s": "kubernetes",
+    "gcp": "google cloud", "amazon web services": "aws", "microsoft azure": "azure", "gh actions": "github actions",
+    "cicd": "ci/cd", "ci-cd": "ci/cd", "vs code": "vscode", "visual studio code": "vscode", "a11y": "accessibility",
+    "open-source": "open source", "opensource": "open source", "docs": "documentation",
+    "state-management": "state management", "ui-design": "ui design", "web dev": "web development",
+    "wasm": "webassembly", "shell": "bash",
+}
+
+# Terms (canonical or variant) that are also everyday English words or single letters.
+# Matchers should only accept them when the surrounding text marks them as a proper noun / tech name.
+AMBIGUOUS_TECH_TERMS = {
+    "c", "r", "go", "rust", "swift", "dart", "express", "bun", "gin", "phoenix", "unity", "spring",
+    "node", "shell", "rails", "spark", "cv", "tf", "dl", "ts", "docs", "flask",
+}
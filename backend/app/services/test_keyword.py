@@ -1,4 +1,5 @@
 import spacy
+from app.services.keyword_matcher import KeywordMatcher
 
 # Load the spaCy model
 nlp = spacy.load("en_core_web_sm")
@@ -46,7 +47,9 @@ The system uses semantic search through vector embeddings generated by Vertex AI
 doc = nlp(text_blob)
 
 # Check for keywords in the text and match them with the issues, languages, and topics
-matched_keywords = [keyword for keyword in all_keywords if keyword.lower() in text_blob.lower()]
+# (one word-bounded pass over the text, so "java" no longer matches inside "javascript")
+keyword_matcher = KeywordMatcher(all_keywords)
+matched_keywords = keyword_matcher.match_terms(text_blob)
 
 # Print matched keywords (issues, languages, topics)
 print(f"Matched Keywords: {matched_keywords}")
@@ -1,11 +1,18 @@
 import os
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
 from google.cloud import language_v1
 from google.oauth2 import service_account
 from google.api_core import exceptions as google_exceptions
-from typing import Dict, List, Set, Optional
+from typing import Any, Dict, List, Set, Optional
 import vertexai
 from vertexai.generative_models import GenerativeModel, GenerationResponse, Candidate
 from vertexai.generative_models._generative_models import SafetyRating
+from ..core.config import settings
+from .cache import get_cache
 
 
 VERTEX_AI_PROJECT_ID: Optional[str] = None
@@ -48,13 +55,98 @@ except Exception as e:
     initialization_error = f"CRITICAL ERROR: Failed to load credentials or initialize Google Cloud Language client: {e}"
     print(initialization_error)
 
+# --- Entity Filtering Configuration ---
+RELEVANT_ENTITY_TYPES = {
+    language_v1.Entity.Type.ORGANIZATION, language_v1.Entity.Type.CONSUMER_GOOD,
+    language_v1.Entity.Type.WORK_OF_ART, language_v1.Entity.Type.OTHER,
+}
+MIN_SALIENCE = 0.008 # Adjusted based on user code
+ENTITY_BLOCKLIST = {
+    "developer", "engineer", "engineering", "software", "experience", "experienced",
+    "proficiency", "proficient", "knowledge", "understanding", "technology",
+    "technologies", "tool", "tools", "platform", "platforms", "system", "systems",
+    "service", "services", "api", "apis", "contributor", "contribution",
+    "open-source", "library", "framework", "cloud", "machine", "learning",
+    "using", "like", "with", "and", "the", "for", "etc", "movie data",
+    "telegram file", "## license mit license", "## 📝", "ai 3", "license",
+    "mit license",
+}
+MAX_ENTITY_LENGTH = 50
+# --- End Filtering Configuration ---
+
+# --- Entity Analysis Cache / Concurrency ---
+NLP_CACHE_TTL_SECONDS = 24 * 60 * 60
+NLP_CACHE_MAX_ENTRIES = 2048
+NLP_MAX_CONCURRENT_REQUESTS = 4
+
+# Filtered entity sets keyed by SHA-256 of the analyzed text
+_entity_cache = get_cache("nlp_entities", ttl=NLP_CACHE_TTL_SECONDS, max_entries=NLP_CACHE_MAX_ENTRIES)
+_nlp_semaphore = asyncio.Semaphore(NLP_MAX_CONCURRENT_REQUESTS)
+async_client: Optional[language_v1.LanguageServiceAsyncClient] = None
+
+# --- Gen AI Response Cache / Request Coalescing ---
+# Generated queries keyed by SHA-256 of model + rendered prompt + generation config
+_gemini_cache = get_cache("gemini_queries", ttl=settings.GEMINI_CACHE_TTL_SECONDS, max_entries=settings.GEMINI_CACHE_MAX_ENTRIES)
+_gemini_inflight: Dict[str, Future] = {}
+_gemini_inflight_lock = threading.Lock()
+
+
+def is_relevant_entity_name(entity_name: str) -> bool:
+    """ Applies the length and blocklist filters to a lowercased, stripped entity name. """
+    return (len(entity_name) > 2 and
+            entity_name not in ENTITY_BLOCKLIST and
+            len(entity_name) <= MAX_ENTITY_LENGTH and
+            not entity_name.startswith('#'))
+
+
+def _filter_entities(entities) -> Set[str]:
+    """ Keeps relevant, salient entity names from an analyzeEntities response. """
+    extracted_entities: Set[str] = set()
+    for entity in entities:
+        if entity.type_ in RELEVANT_ENTITY_TYPES and entity.salience >= MIN_SALIENCE:
+            entity_name = entity.name.lower().strip()
+            if is_relevant_entity_name(entity_name):
+                extracted_entities.add(entity_name)
+    return extracted_entities
+
+
+def _entity_cache_key(text_blob: str) -> str:
+    return hashlib.sha256(text_blob.encode("utf-8")).hexdigest()
+
+
+def _get_cached_entities(text_blob: str) -> Optional[Dict[str, List[str]]]:
+    cached = _entity_cache.get(_entity_cache_key(text_blob))
+    if cached is None:
+        return None
+    print(f"DEBUG: Entity cache hit for text blob (length: {len(text_blob)})")
+    return {"keywords_entities": list(cached)}
+
+
+def _store_entities(text_blob: str, extracted_entities: Set[str]) -> Dict[str, List[str]]:
+    keywords_entities = sorted(extracted_entities)
+    _entity_cache.set(_entity_cache_key(text_blob), keywords_entities)
+    return {"keywords_entities": list(keywords_entities)}
+
+
+def _get_async_client() -> Optional[language_v1.LanguageServiceAsyncClient]:
+    """ Lazily creates the async Language client inside the running event loop. """
+    global async_client
+    if async_client is None and credentials is not None:
+        try:
+            async_client = language_v1.LanguageServiceAsyncClient(credentials=credentials)
+            print("DEBUG: Google Cloud Language async client initialized successfully.")
+        except Exception as e:
+            print(f"ERROR: Failed to initialize Google Cloud Language async client: {e}")
+    return async_client
+
+
 # --- Service Function ---
 
 def analyze_profile_text(text_blob: str) -> Dict[str, List[str]]:
     """
     Analyzes text blob using Google Cloud Natural Language API (analyzeEntities)
     to extract relevant keywords/entities.
-    (Implementation details omitted for brevity - assume it's the same as your provided code)
+    Blocking; async endpoints should await analyze_profile_text_async instead.
     """
     if client is None:
         print(f"ERROR in analyze_profile_text: Language client was not initialized. Initialization error was: {initialization_error}")
@@ -63,51 +155,156 @@ def analyze_profile_text(text_blob: str) -> Dict[str, List[str]]:
         print("Warning: Text blob provided to analyze_profile_text was empty.")
         return {"keywords_entities": []}
 
-    # --- Filtering Configuration ---
-    RELEVANT_ENTITY_TYPES = {
-        language_v1.Entity.Type.ORGANIZATION, language_v1.Entity.Type.CONSUMER_GOOD,
-        language_v1.Entity.Type.WORK_OF_ART, language_v1.Entity.Type.OTHER,
-    }
-    MIN_SALIENCE = 0.008 # Adjusted based on user code
-    ENTITY_BLOCKLIST = {
-        "developer", "engineer", "engineering", "software", "experience", "experienced",
-        "proficiency", "proficient", "knowledge", "understanding", "technology",
-        "technologies", "tool", "tools", "platform", "platforms", "system", "systems",
-        "service", "services", "api", "apis", "contributor", "contribution",
-        "open-source", "library", "framework", "cloud", "machine", "learning",
-        "using", "like", "with", "and", "the", "for", "etc", "movie data",
-        "telegram file", "## license mit license", "## 📝", "ai 3", "license",
-        "mit license",
-    }
-    MAX_ENTITY_LENGTH = 50
-    # --- End Filtering Configuration ---
+    cached = _get_cached_entities(text_blob)
+    if cached is not None:
+        return cached
 
     document = language_v1.Document(content=text_blob, type_=language_v1.Document.Type.PLAIN_TEXT)
-    extracted_entities: Set[str] = set()
     try:
         print(f"DEBUG: Sending text blob (length: {len(text_blob)}) to Cloud NLP Analyze Entities...")
         response = client.analyze_entities(document=document, encoding_type=language_v1.EncodingType.UTF8)
         print(f"DEBUG: Received {len(response.entities)} entities from Cloud NLP.")
+        extracted_entities = _filter_entities(response.entities)
+
+    except google_exceptions.PermissionDenied as e:
+         print(f"ERROR: Cloud NLP API call failed - Permission Denied: {e}")
+         print("Ensure the service account used has the 'Cloud Natural Language API User' role or equivalent permissions.")
+         return {"keywords_entities": []}
+    except google_exceptions.GoogleAPICallError as e:
+        print(f"ERROR: Cloud NLP API call failed: {e}")
+        return {"keywords_entities": []}
+    except Exception as e:
+        print(f"ERROR: Unexpected error during NLP analysis: {e}")
+        return {"keywords_entities": []}
+
+    print(f"DEBUG: Final extracted entities count: {len(extracted_entities)}")
+    return _store_entities(text_blob, extracted_entities)
 
-        for entity in response.entities:
-            if entity.type_ in RELEVANT_ENTITY_TYPES and entity.salience >= MIN_SALIENCE:
-                entity_name = entity.name.lower().strip()
-                if (len(entity_name) > 2 and
-                        entity_name not in ENTITY_BLOCKLIST and
-                        len(entity_name) <= MAX_ENTITY_LENGTH and
-                        not entity_name.startswith('#')):
-                    extracted_entities.add(entity_name)
+
+async def analyze_profile_text_async(text_blob: str) -> Dict[str, List[str]]:
+    """
+    Non-blocking variant of analyze_profile_text using the async Language client.
+    Results are cached per text hash (already filtered), and at most
+    NLP_MAX_CONCURRENT_REQUESTS RPCs are in flight per worker.
+    """
+    if not text_blob:
+        print("Warning: Text blob provided to analyze_profile_text_async was empty.")
+        return {"keywords_entities": []}
+
+    cached = await asyncio.to_thread(_get_cached_entities, text_blob)
+    if cached is not None:
+        return cached
+
+    nlp_client = _get_async_client()
+    if nlp_client is None:
+        print(f"ERROR in analyze_profile_text_async: Language client was not initialized. Initialization error was: {initialization_error}")
+        return {"keywords_entities": []}
+
+    document = language_v1.Document(content=text_blob, type_=language_v1.Document.Type.PLAIN_TEXT)
+    try:
+        async with _nlp_semaphore:
+            print(f"DEBUG: Sending text blob (length: {len(text_blob)}) to Cloud NLP Analyze Entities (async)...")
+            response = await nlp_client.analyze_entities(document=document, encoding_type=language_v1.EncodingType.UTF8)
+        print(f"DEBUG: Received {len(response.entities)} entities from Cloud NLP.")
+        extracted_entities = _filter_entities(response.entities)
 
     except google_exceptions.PermissionDenied as e:
          print(f"ERROR: Cloud NLP API call failed - Permission Denied: {e}")
          print("Ensure the service account used has the 'Cloud Natural Language API User' role or equivalent permissions.")
+         return {"keywords_entities": []}
     except google_exceptions.GoogleAPICallError as e:
         print(f"ERROR: Cloud NLP API call failed: {e}")
+        return {"keywords_entities": []}
     except Exception as e:
         print(f"ERROR: Unexpected error during NLP analysis: {e}")
+        return {"keywords_entities": []}
 
     print(f"DEBUG: Final extracted entities count: {len(extracted_entities)}")
-    return {"keywords_entities": sorted(list(extracted_entities))}
+    return await asyncio.to_thread(_store_entities, text_blob, extracted_entities)
+
+
+async def analyze_profile_texts_async(text_blobs: List[str]) -> List[Dict[str, List[str]]]:
+    """
+    Analyzes a batch of text blobs concurrently (bounded by the shared semaphore).
+    Identical texts in the batch are analyzed once.
+    """
+    unique_texts = list(dict.fromkeys(text_blobs))
+    results = await asyncio.gather(*(analyze_profile_text_async(text) for text in unique_texts))
+    by_text = dict(zip(unique_texts, results))
+    return [{"keywords_entities": list(by_text[text]["keywords_entities"])} for text in text_blobs]
+
+
+def _request_query_variation(prompt: str, generation_config: Dict[str, Any], i: int) -> Optional[str]:
+    """ Sends one prompt variation to Gemini and returns the parsed query string, or None if it was unusable. """
+    response: GenerationResponse = gen_model.generate_content(
+        prompt,
+        generation_config=generation_config,
+        stream=False,
+    )
+
+    print(f"DEBUG: Received Gen AI response for variation {i+1}. Finish reason: {response.candidates[0].finish_reason}")
+
+    # --- Parse the Response ---
+    if response.candidates and response.candidates[0].content.parts:
+        if response.candidates[0].finish_reason != Candidate.FinishReason.SAFETY:
+            generated_query = response.text.strip()
+            if generated_query and len(generated_query) > 10: # Basic check
+                print(f"DEBUG: Successfully generated query variation {i+1}: {generated_query}")
+                return generated_query
+            else:
+                print(f"WARN: Gen AI returned an empty or short response for variation {i+1}: '{generated_query}'")
+        else:
+            print(f"ERROR: Gen AI response blocked due to safety settings for variation {i+1}. Finish Reason: {response.candidates[0].finish_reason}")
+            if response.candidates[0].safety_ratings:
+                 for rating in response.candidates[0].safety_ratings:
+                     print(f" - Safety Rating: {rating.category}, Probability: {rating.probability.name}")
+    else:
+        print(f"ERROR: Gen AI response was empty or malformed for variation {i+1}.")
+        if response.prompt_feedback and response.prompt_feedback.block_reason:
+             print(f"ERROR: Prompt may have been blocked. Reason: {response.prompt_feedback.block_reason}")
+             if response.prompt_feedback.safety_ratings:
+                  for rating in response.prompt_feedback.safety_ratings:
+                       print(f" - Safety Rating: {rating.category}, Probability: {rating.probability.name}")
+    return None
+
+
+def _generate_query_variation(prompt: str, generation_config: Dict[str, Any], i: int) -> Optional[str]:
+    """
+    Returns the generated query for a rendered prompt + generation config, using the persistent
+    response cache and coalescing identical in-flight requests into a single Gemini call.
+    API errors propagate to the caller (and to any coalesced waiters).
+    """
+    cache_key = hashlib.sha256(json.dumps(
+        {"model": GEMINI_MODEL_NAME, "prompt": prompt, "config": generation_config}, sort_keys=True
+    ).encode("utf-8")).hexdigest()
+
+    cached_query = _gemini_cache.get(cache_key)
+    if cached_query:
+        print(f"DEBUG: Gen AI cache hit for variation {i+1}: {cached_query}")
+        return cached_query
+
+    with _gemini_inflight_lock:
+        future = _gemini_inflight.get(cache_key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _gemini_inflight[cache_key] = future
+    if not is_leader:
+        print(f"DEBUG: Waiting for identical in-flight Gen AI request for variation {i+1}...")
+        return future.result()
+
+    try:
+        generated_query = _request_query_variation(prompt, generation_config, i)
+        if generated_query:
+            _gemini_cache.set(cache_key, generated_query)
+        future.set_result(generated_query)
+        return generated_query
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _gemini_inflight_lock:
+            _gemini_inflight.pop(cache_key, None)
 
 
 # --- NEW FUNCTION for Gen AI Query Generation ---
@@ -204,35 +401,9 @@ Generated Query String:"""
                 "temperature": 0.3 + (i * 0.1), # Slightly increase temp for variety
                 "max_output_tokens": 256,
             }
-            response: GenerationResponse = gen_model.generate_content(
-                prompt,
-                generation_config=generation_config,
-                stream=False,
-            )
-
-            print(f"DEBUG: Received Gen AI response for variation {i+1}. Finish reason: {response.candidates[0].finish_reason}")
-
-            # --- Parse the Response ---
-            if response.candidates and response.candidates[0].content.parts:
-                if response.candidates[0].finish_reason != Candidate.FinishReason.SAFETY:
-                    generated_query = response.text.strip()
-                    if generated_query and len(generated_query) > 10: # Basic check
-                        print(f"DEBUG: Successfully generated query variation {i+1}: {generated_query}")
-                        generated_queries.append(generated_query) # Add to list
-                    else:
-                        print(f"WARN: Gen AI returned an empty or short response for variation {i+1}: '{generated_query}'")
-                else:
-                    print(f"ERROR: Gen AI response blocked due to safety settings for variation {i+1}. Finish Reason: {response.candidates[0].finish_reason}")
-                    if response.candidates[0].safety_ratings:
-                         for rating in response.candidates[0].safety_ratings:
-                             print(f" - Safety Rating: {rating.category}, Probability: {rating.probability.name}")
-            else:
-                print(f"ERROR: Gen AI response was empty or malformed for variation {i+1}.")
-                if response.prompt_feedback and response.prompt_feedback.block_reason:
-                     print(f"ERROR: Prompt may have been blocked. Reason: {response.prompt_feedback.block_reason}")
-                     if response.prompt_feedback.safety_ratings:
-                          for rating in response.prompt_feedback.safety_ratings:
-                               print(f" - Safety Rating: {rating.category}, Probability: {rating.probability.name}")
+            generated_query = _generate_query_variation(prompt, generation_config, i)
+            if generated_query:
+                generated_queries.append(generated_query) # Add to list
 
         except google_exceptions.GoogleAPICallError as e:
             print(f"ERROR: Vertex AI API call failed for variation {i+1}: {e}")
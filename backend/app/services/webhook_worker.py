@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .faiss_search import embed_texts_async, ensure_model_async
+from .index_snapshot import snapshot_manager
+from .issue_delta import delta_index, get_live_issues, issue_delta_store
+from .issue_embedding import issue_embed_text
+from .issue_record import slim_issue_item
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- GitHub Webhook Worker ---
+# /webhooks/github verifies and enqueues `issues` and `label` deliveries; a single background task
+# drains the queue in small batches. Within a batch the last event per issue wins: open, unassigned
+# issues are upserted into the issue delta (re-embedded only when their text changed), everything
+# else (closed, deleted, transferred, assigned) is tombstoned. Label renames and deletions rewrite
+# the labels of that repo's indexed issues without re-embedding them.
+HANDLED_EVENTS = ("issues", "label")
+DELETE_ACTIONS = ("closed", "deleted", "transferred")
+WEBHOOK_QUEUE_SIZE = 10000  # Deliveries are refused (503) beyond this backlog
+WEBHOOK_BATCH_SIZE = 32
+WEBHOOK_BATCH_WAIT_SECONDS = 1.0  # How long a partial batch waits for more events
+WEBHOOK_DRAIN_TIMEOUT_SECONDS = 10.0  # How long shutdown waits for queued events before dropping them
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """ Checks an X-Hub-Signature-256 header ("sha256=<hex hmac of the body>") in constant time. """
+    if not secret or not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
+
+
+def _issue_item(issue: Dict[str, Any], repository: Dict[str, Any]) -> Dict[str, Any]:
+    """ Slims a webhook issue, attaching the repository's star count (search items lack it). """
+    return slim_issue_item({**issue, "repository": {"stargazers_count": repository.get("stargazers_count")}})
+
+
+def _issue_change(payload: Dict[str, Any]) -> Optional[Tuple[int, Optional[Dict[str, Any]]]]:
+    """ Maps an `issues` delivery to (issue id, slim item to upsert or None to delete). """
+    issue = payload.get("issue") or {}
+    if issue.get("id") is None:
+        return None
+    if (payload.get("action") in DELETE_ACTIONS or issue.get("state") != "open"
+            or issue.get("assignee") or issue.get("assignees") or issue.get("pull_request")):
+        return issue["id"], None
+    return issue["id"], _issue_item(issue, payload.get("repository") or {})
+
+
+def _label_change(payload: Dict[str, Any]) -> Optional[Tuple[str, str, Optional[str]]]:
+    """ Maps a `label` delivery to (repository url, old label name, new name or None if deleted), if it affects issues. """
+    action = payload.get("action")
+    label = (payload.get("label") or {}).get("name")
+    repository_url = (payload.get("repository") or {}).get("url")
+    if not label or not repository_url:
+        return None
+    if action == "deleted":
+        return repository_url, label, None
+    old_name = ((payload.get("changes") or {}).get("name") or {}).get("from")
+    if action == "edited" and old_name:
+        return repository_url, old_name, label
+    return None
+
+
+def _relabel(issue: Dict[str, Any], old_name: str, new_name: Optional[str]) -> Optional[Dict[str, Any]]:
+    """ Returns the issue with a label renamed (or removed), or None if it doesn't carry the label. """
+    labels = issue.get("labels") or []
+    kept = [label for label in labels if label.get("name") != old_name]
+    if len(kept) == len(labels):
+        return None
+    return {**issue, "labels": kept + ([{"name": new_name}] if new_name else [])}
+
+
+def _indexed_repo_issues(repository_url: str) -> List[Tuple[int, Dict[str, Any]]]:
+    """ Returns (id, item) of the live indexed issues of a repo, from the delta and a byte scan of the snapshot. """
+    snapshot = snapshot_manager.current()
+    candidate_ids = delta_index.upserted_ids()
+    if snapshot is not None:
+        needle = json.dumps(repository_url).encode("utf-8")
+        candidate_ids += [int(snapshot.store.ids[position]) for position in snapshot.find_positions(needle)]
+    candidate_ids = list(dict.fromkeys(candidate_ids))
+    return [(issue_id, issue) for issue_id, issue in zip(candidate_ids, get_live_issues(snapshot, candidate_ids))
+            if issue and issue.get("repository_url") == repository_url]
+
+
+def _existing_vector(issue_id: int, embed_text: str) -> Optional[np.ndarray]:
+    """ Returns the stored embedding of an issue if it was embedded from the same text. """
+    row = delta_index.get(issue_id)
+    if row is not None:
+        return row[1] if issue_embed_text(row[0]) == embed_text else None
+    snapshot = snapshot_manager.current()
+    if snapshot is None or issue_id in delta_index:
+        return None
+    position = snapshot.position_of(issue_id)
+    if position < 0 or issue_embed_text(snapshot.get_issue_at(position)) != embed_text:
+        return None
+    return snapshot.store.vectors(position, position + 1)[0]
+
+
+def _refresh_delta() -> None:
+    """ Brings the delta mirror up to date against the live snapshot (blocking: SQLite, locks, snapshot loads). """
+    delta_index.refresh(force=True, snapshot=snapshot_manager.current())
+
+
+async def process_events(events: List[Event]) -> Tuple[int, int]:
+    """
+    Applies a batch of webhook deliveries to the issue delta.
+
+    Returns:
+        Tuple of (issues upserted, issues deleted)
+    """
+    await asyncio.to_thread(_refresh_delta)
+    changes: Dict[int, Optional[Dict[str, Any]]] = {}
+    for event, payload in events:
+        if event == "issues":
+            change = _issue_change(payload)
+            if change is not None:
+                changes[change[0]] = change[1]
+        elif event == "label":
+            label_change = _label_change(payload)
+            if label_change is None:
+                continue
+            repository_url, old_name, new_name = label_change
+            # Issues changed earlier in this batch are relabelled in place, the rest as indexed
+            pending = [(issue_id, item) for issue_id, item in changes.items()
+                       if item is not None and item.get("repository_url") == repository_url]
+            indexed = await asyncio.to_thread(_indexed_repo_issues, repository_url)
+            for issue_id, item in pending + [(issue_id, item) for issue_id, item in indexed if issue_id not in changes]:
+                relabelled = _relabel(item, old_name, new_name)
+                if relabelled is not None:
+                    changes[issue_id] = relabelled
+    if not changes:
+        return 0, 0
+
+    deletes = [issue_id for issue_id, item in changes.items() if item is None]
+    upserts: List[Tuple[int, Dict[str, Any], np.ndarray]] = []
+    to_embed: List[Tuple[int, Dict[str, Any], str]] = []
+    for issue_id, item in changes.items():
+        if item is None:
+            continue
+        embed_text = issue_embed_text(item)
+        vector = await asyncio.to_thread(_existing_vector, issue_id, embed_text)
+        if vector is not None:
+            upserts.append((issue_id, item, vector))
+        else:
+            to_embed.append((issue_id, item, embed_text))
+    if to_embed:
+        model = await ensure_model_async()
+        embeddings = await embed_texts_async([text for _, _, text in to_embed], model)
+        upserts += [(issue_id, item, embeddings[i]) for i, (issue_id, item, _) in enumerate(to_embed)]
+
+    await asyncio.to_thread(issue_delta_store.apply, upserts, deletes)
+    await asyncio.to_thread(_refresh_delta)
+    logger.info(f"Applied {len(events)} webhook events: {len(upserts)} upserts ({len(to_embed)} re-embedded), {len(deletes)} deletes")
+    return len(upserts), len(deletes)
+
+
+class WebhookWorker:
+    """ The webhook queue and the background task draining it (see module comment). """
+
+    def __init__(self, batch_size: int = WEBHOOK_BATCH_SIZE, batch_wait: float = WEBHOOK_BATCH_WAIT_SECONDS,
+                 drain_timeout: float = WEBHOOK_DRAIN_TIMEOUT_SECONDS):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.drain_timeout = drain_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """ Processes the events still queued (for at most drain_timeout seconds), then stops the task. """
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Webhook queue not drained within {self.drain_timeout:g}s, dropping {self._queue.qsize()} queued events")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def enqueue(self, event: str, payload: Dict[str, Any]) -> bool:
+        """ Queues a verified delivery; returns False if the worker isn't running or the queue is full. """
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait((event, payload))
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def _next_batch(self) -> List[Event]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await process_events(batch)
+            except Exception as e:
+                logger.error(f"Error applying {len(batch)} webhook events: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+webhook_worker = WebhookWorker()
+
+
+def load_recorded_events(path: str) -> List[Event]:
+    """
+    Reads recorded deliveries: {"event": <X-GitHub-Event>, "payload": {...}} records, one per line
+    in .jsonl files, or a single record (or a list of them) in .json files.
+    """
+    with open(path) as f:
+        if path.endswith(".jsonl"):
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            records = json.load(f)
+            records = records if isinstance(records, list) else [records]
+    return [(record["event"], record["payload"]) for record in records if record.get("event") in HANDLED_EVENTS]
+
+
+async def replay(paths: List[str], batch_size: int = WEBHOOK_BATCH_SIZE) -> None:
+    """ Applies recorded deliveries to the issue delta in order, batched like the live worker. """
+    events = [event for path in paths for event in load_recorded_events(path)]
+    for start in range(0, len(events), batch_size):
+        upserted, deleted = await process_events(events[start:start + batch_size])
+        print(f"Events {start}-{start + min(batch_size, len(events) - start)}: {upserted} upserted, {deleted} deleted")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded GitHub webhook deliveries into the issue delta")
+    parser.add_argument("paths", nargs="+", help='JSON/JSONL files of {"event": ..., "payload": ...} records')
+    parser.add_argument("--batch-size", type=int, default=WEBHOOK_BATCH_SIZE)
+    args = parser.parse_args()
+    asyncio.run(replay(args.paths, args.batch_size))